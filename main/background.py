@@ -0,0 +1,56 @@
+"""
+In-process queue for work that shouldn't hold up the response, e.g. notification batches.
+
+Jobs run on a small thread pool with their own database connections, which are
+closed when the job finishes. Under test they run inline so results are deterministic.
+
+The queue lives in the worker's memory. A worker that exits normally (a uWSGI
+reload or ``max-requests`` recycle) finishes its queued jobs first, but one that is
+killed loses them, so only enqueue work that is fine to lose or is redone later:
+emails and image variants, never the only copy of data. Under uWSGI the pool
+needs Python threads, i.e. ``enable-threads = true`` (or ``threads``), which is
+checked when this module is imported.
+"""
+
+import atexit
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+
+try:
+    import uwsgi
+except ImportError:
+    uwsgi = None
+
+logger = logging.getLogger(__name__)
+
+# Without threads enabled uWSGI never lets the pool run, and jobs pile up silently.
+if uwsgi is not None and not (uwsgi.opt.get("enable-threads") or uwsgi.opt.get("threads")):
+    raise ImproperlyConfigured("Background jobs need Python threads, run uWSGI with enable-threads = true.")
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="background")
+# uWSGI runs atexit hooks when a worker exits, but skips the interpreter's own wait for these threads.
+atexit.register(_executor.shutdown, wait=True)
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Background job %s failed", func.__qualname__)
+    finally:
+        connections.close_all()
+
+
+def enqueue(func, *args, **kwargs) -> Future:
+    if settings.TESTING:
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+    return _executor.submit(_run, func, args, kwargs)
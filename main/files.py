@@ -0,0 +1,129 @@
+"""
+Serving static and media files without streaming them through Python.
+
+Files go out as ``FileResponse``s, which WSGI servers hand to ``sendfile()``
+through ``wsgi.file_wrapper`` (uWSGI, gunicorn). With ``FILE_ACCEL_REDIRECT_PREFIX``
+set, the response is empty instead and its ``X-Accel-Redirect`` header has nginx
+send the file from an ``internal`` location. Static files whose names are
+content-hashed (see ``main.storage``) are cached for a year, and served from
+their pre-compressed variant when the client accepts it. Nothing is served
+unless ``SERVE_FILES`` is on.
+"""
+
+import mimetypes
+import re
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+from .storage import ENCODINGS
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@lru_cache(maxsize=None)
+def hashed_static_names():
+    return frozenset(getattr(staticfiles_storage, "hashed_files", {}).values())
+
+
+@receiver(setting_changed)
+def reset_hashed_static_names(setting, **kwargs):
+    if setting in ("STORAGES", "STATIC_ROOT"):
+        hashed_static_names.cache_clear()
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = part.partition(";")
+        if params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def serve_file(request, root, path, location, max_age, immutable=False, encodings=False):
+    """
+    Respond with the file at ``path`` under ``root``.
+
+    ``location`` names the directory under ``FILE_ACCEL_REDIRECT_PREFIX`` nginx
+    serves ``root`` from. ``encodings`` allows sending a pre-compressed variant.
+    """
+    if not settings.SERVE_FILES:
+        raise Http404("File not found")
+    try:
+        full_path = Path(safe_join(root, path))
+    except SuspiciousFileOperation:
+        raise Http404("File not found")
+    if not full_path.is_file():
+        raise Http404("File not found")
+
+    mtime = full_path.stat().st_mtime
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type = mimetypes.guess_type(full_path.name)[0] or "application/octet-stream"
+        if settings.FILE_ACCEL_REDIRECT_PREFIX:
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = quote(f"{settings.FILE_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{location}/{path}")
+        else:
+            variant, encoding = full_path, None
+            if encodings:
+                accepted = _accepted_encodings(request)
+                for name, (suffix, _) in ENCODINGS.items():
+                    candidate = full_path.with_name(full_path.name + suffix)
+                    if name in accepted and candidate.is_file():
+                        variant, encoding = candidate, name
+                        break
+            response = FileResponse(variant.open("rb"), content_type=content_type)
+            if encoding:
+                response["Content-Encoding"] = encoding
+        response["Last-Modified"] = http_date(mtime)
+
+    if encodings:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE if immutable else max_age)
+    if immutable:
+        patch_cache_control(response, immutable=True)
+    return response
+
+
+@require_safe
+def serve_static(request, path):
+    return serve_file(
+        request,
+        settings.STATIC_ROOT,
+        path,
+        "static",
+        settings.STATIC_FILES_MAX_AGE,
+        immutable=path in hashed_static_names(),
+        encodings=True,
+    )
+
+
+@require_safe
+def serve_media(request, path):
+    return serve_file(request, settings.MEDIA_ROOT, path, "media", settings.MEDIA_FILES_MAX_AGE)
+
+
+def file_urlpatterns():
+    """
+    URL patterns for ``STATIC_URL`` and ``MEDIA_URL``, unless they point at another host.
+    """
+    patterns = []
+    for prefix, view in ((settings.STATIC_URL, serve_static), (settings.MEDIA_URL, serve_media)):
+        if prefix and not urlsplit(prefix).netloc:
+            patterns.append(re_path(r"^%s(?P<path>.*)$" % re.escape(prefix.lstrip("/")), view))
+    return patterns
@@ -0,0 +1,94 @@
+"""
+Replay of stored responses for requests carrying an ``Idempotency-Key`` header.
+
+The first request with a key runs the view and its response is cached for
+``IDEMPOTENCY_KEY_TTL`` seconds; retries with the same key and body get the stored
+response back without running the view again. Keys are scoped per user and path.
+"""
+
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import response, status
+
+from . import metrics
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+_IN_PROGRESS = "in-progress"
+
+
+def _cache_key(request, key):
+    scope = f"{request.user.pk or 'anonymous'}:{request.path}:{key}"
+    return "idempotency:" + hashlib.sha256(scope.encode()).hexdigest()
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def idempotent(view_method):
+    """
+    Decorate an ``APIView`` handler (e.g. ``create``) so it honours ``Idempotency-Key``.
+
+    Requests without the header are handled as usual. Server errors are not stored,
+    so the client may retry them with the same key.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return response.Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request)
+        if cache.add(cache_key, {"fingerprint": fingerprint, "state": _IN_PROGRESS}, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            metrics.CACHE_LOOKUPS.inc(cache="idempotency", result="miss")
+            try:
+                result = view_method(self, request, *args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+            if result.status_code >= 500:
+                cache.delete(cache_key)
+            else:
+                stored = {
+                    "fingerprint": fingerprint,
+                    "status": result.status_code,
+                    "data": json.loads(json.dumps(result.data, cls=DjangoJSONEncoder)),
+                }
+                cache.set(cache_key, stored, settings.IDEMPOTENCY_KEY_TTL)
+            return result
+
+        stored = cache.get(cache_key)
+        metrics.CACHE_LOOKUPS.inc(cache="idempotency", result="miss" if stored is None else "hit")
+        if stored is None:
+            # Expired between add() and get(), let the client retry.
+            return response.Response(
+                {"detail": "A request with this idempotency key is being processed."}, status=status.HTTP_409_CONFLICT
+            )
+        if stored["fingerprint"] != fingerprint:
+            return response.Response(
+                {"detail": f"{IDEMPOTENCY_HEADER} was already used with a different request body."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if stored.get("state") == _IN_PROGRESS:
+            return response.Response(
+                {"detail": "A request with this idempotency key is being processed."}, status=status.HTTP_409_CONFLICT
+            )
+        return response.Response(stored["data"], status=stored["status"], headers={REPLAYED_HEADER: "true"})
+
+    return wrapper
@@ -0,0 +1,62 @@
+"""
+Resized copies ("variants") of uploaded images.
+
+Variants are rendered off the request, stored next to the original in the same
+storage (the filesystem or the media bucket) and their names recorded on the row,
+so building their URLs never has to ask the storage whether they exist.
+"""
+
+import io
+import logging
+import posixpath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+def variant_name(name, label):
+    root, _ = posixpath.splitext(name)
+    return f"{root}.{label}.webp"
+
+
+def expected_variants(name):
+    return {label: variant_name(name, label) for label in settings.MEDIA_IMAGE_VARIANTS}
+
+
+def render_variants(storage, name):
+    """
+    Write every size in ``MEDIA_IMAGE_VARIANTS`` of the image ``name`` as WebP and
+    return their storage names by label.
+    """
+    with storage.open(name, "rb") as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    variants = {}
+    for label, size in settings.MEDIA_IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        resized.save(buffer, format="WEBP", quality=80, method=4)
+        target = variant_name(name, label)
+        # Replace a stale copy rather than getting a suffixed name next to it.
+        if storage.exists(target):
+            storage.delete(target)
+        variants[label] = storage.save(target, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def refresh_image_variants(model, pk, name):
+    """
+    Render the variants of the ``image`` of ``model`` row ``pk`` and record them in
+    its ``image_variants``, unless the image was replaced in the meantime.
+    """
+    storage = model._meta.get_field("image").storage
+    variants = render_variants(storage, name)
+    if not model._base_manager.filter(pk=pk, image=name).update(image_variants=variants):
+        logger.info("%s %s changed its image while variants of %s were rendered", model._meta.label, pk, name)
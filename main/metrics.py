@@ -0,0 +1,311 @@
+"""
+Counters, gauges and histograms exposed in the Prometheus text format.
+
+Metrics are module-level objects, declared next to the code that updates them::
+
+    ORDERS_CREATED = metrics.counter("kaveri_orders_created_total", "Orders placed.")
+    ORDERS_CREATED.inc()
+
+An update is a dict update under a lock. Each process keeps its own values; with
+``METRICS_DIR`` set (uwsgi and other pre-forking servers) they are also written
+to ``<pid>.json`` there at most every ``METRICS_FLUSH_INTERVAL`` seconds and at
+exit, and ``metrics_view`` adds up the files of all processes. Counters and
+histograms of exited workers keep counting towards the totals; gauges only count
+for live processes. The directory must be emptied when the server (re)starts.
+"""
+
+import atexit
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self._next_flush = 0.0
+
+    def register(self, metric):
+        existing = self.metrics.setdefault(metric.name, metric)
+        if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+            raise ValueError(f"Metric {metric.name} is already registered differently.")
+        return existing
+
+    def updated(self):
+        # Called after every update, hence the cheap check first.
+        if settings.METRICS_DIR and time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: {"type": metric.type, "samples": [[list(key), value] for key, value in metric.values.items()]}
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self):
+        """
+        Write this process' values to ``METRICS_DIR``.
+        """
+        if not settings.METRICS_DIR:
+            return
+        self._next_flush = time.monotonic() + settings.METRICS_FLUSH_INTERVAL
+        directory = Path(settings.METRICS_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{os.getpid()}.json"
+        temporary = directory / f"{os.getpid()}.{threading.get_ident()}.tmp"
+        temporary.write_text(json.dumps(self.snapshot()))
+        os.replace(temporary, path)
+
+    def reset(self):
+        # Also runs right after a fork, where another thread of the parent may have held the lock.
+        self.lock = threading.Lock()
+        self._next_flush = 0.0
+        for metric in self.metrics.values():
+            metric.values.clear()
+
+    def collect(self):
+        """
+        The values of every process (only this one without ``METRICS_DIR``), added up.
+        """
+        totals = {name: {} for name in self.metrics}
+        snapshots = [self.snapshot()]
+        if settings.METRICS_DIR:
+            for path in Path(settings.METRICS_DIR).glob("*.json"):
+                try:
+                    pid = int(path.stem)
+                    if pid == os.getpid():
+                        continue
+                    snapshot = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue  # Not ours, or removed meanwhile.
+                if not _is_alive(pid):
+                    snapshot = {name: data for name, data in snapshot.items() if data["type"] != "gauge"}
+                snapshots.append(snapshot)
+
+        for snapshot in snapshots:
+            for name, data in snapshot.items():
+                if name not in totals:
+                    continue
+                samples = totals[name]
+                for key, value in data["samples"]:
+                    key = tuple(key)
+                    if isinstance(value, list):
+                        current = samples.get(key) or [0] * len(value)
+                        samples[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        samples[key] = samples.get(key, 0) + value
+        return totals
+
+    def exposition(self):
+        """
+        All metrics in the Prometheus text format.
+        """
+        lines = []
+        for name, samples in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {_escape(metric.documentation, quote=False)}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted(samples.items()):
+                lines.extend(metric.sample_lines(key, value))
+        return "\n".join(lines) + "\n"
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value, quote=True):
+    value = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return value.replace('"', '\\"') if quote else value
+
+
+def _format(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.registry = registry or REGISTRY
+
+    def key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labelnames) or 'none'}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def labels_text(self, key, extra=()):
+        pairs = [*zip(self.labelnames, key), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def sample_lines(self, key, value):
+        yield f"{self.name}{self.labels_text(key)} {_format(value)}"
+
+    def get(self, **labels):
+        """
+        The value in this process.
+        """
+        return self.values.get(self.key(labels), 0)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.updated()
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = value
+        self.registry.updated()
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+        self.registry.updated()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Values are kept as a count per bucket (the last one unbounded), then the sum.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = (*sorted(buckets), float("inf"))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self.registry.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * len(self.buckets) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+        self.registry.updated()
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def timed(self, **labels):
+        """
+        Decorator observing the duration of every call.
+        """
+
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.time(**labels):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def sample_lines(self, key, value):
+        cumulative = 0
+        for bound, count in zip(self.buckets, value):
+            cumulative += count
+            yield f"{self.name}_bucket{self.labels_text(key, [('le', _format(bound))])} {_format(cumulative)}"
+        yield f"{self.name}_sum{self.labels_text(key)} {_format(value[-1])}"
+        yield f"{self.name}_count{self.labels_text(key)} {_format(cumulative)}"
+
+    def get(self, **labels):
+        """
+        The number of observations in this process.
+        """
+        return sum(self.values.get(self.key(labels), [0])[:-1])
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+# A forked worker starts from zero rather than counting what its parent did again.
+os.register_at_fork(after_in_child=REGISTRY.reset)
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# Shared by the callers of the cache, e.g. cache="throttle" for the throttle buckets.
+CACHE_LOOKUPS = counter("kaveri_cache_lookups_total", "Lookups in the shared cache by caller and outcome.", ["cache", "result"])
+
+
+def _allowed_address(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:  # Missing or empty, e.g. behind some proxies or over a Unix socket.
+        return False
+    return any(address in ipaddress.ip_network(network) for network in settings.METRICS_ALLOWED_NETWORKS)
+
+
+def metrics_view(request):
+    """
+    The metrics of all processes, for Prometheus to scrape from ``METRICS_ALLOWED_NETWORKS``
+    with ``METRICS_TOKEN`` as the bearer token. Without a token they're only served when
+    ``METRICS_REQUIRE_TOKEN`` is off.
+    """
+    if not _allowed_address(request.META.get("REMOTE_ADDR", "")):
+        raise Http404
+    if settings.METRICS_TOKEN:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {settings.METRICS_TOKEN}"):
+            raise Http404
+    elif settings.METRICS_REQUIRE_TOKEN:
+        raise Http404
+    return HttpResponse(REGISTRY.exposition(), content_type=CONTENT_TYPE)
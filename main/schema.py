@@ -0,0 +1,83 @@
+"""
+The OpenAPI schema, served from the file ``manage.py generate_schema`` writes.
+
+Generating it introspects every view and serializer, too slow to do on each hit
+from client codegen tools. The file is generated at build time, committed, and
+read once per process; responses carry an ETag of its content so clients
+revalidate with a 304 instead of downloading it again.
+"""
+
+import hashlib
+import json
+from functools import lru_cache
+
+import yaml
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition, require_safe
+
+CONTENT_TYPES = {
+    "yaml": "application/vnd.oai.openapi; charset=utf-8",
+    "json": "application/vnd.oai.openapi+json; charset=utf-8",
+}
+
+
+def generate() -> bytes:
+    """
+    Introspect the API and render its schema as YAML.
+    """
+    from drf_spectacular.generators import SchemaGenerator
+    from drf_spectacular.renderers import OpenApiYamlRenderer
+
+    import user.schema  # noqa: F401, registers the authentication extension
+
+    schema = SchemaGenerator().get_schema(request=None, public=True)
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+@lru_cache(maxsize=None)
+def load(schema_format):
+    """
+    The schema file rendered in ``schema_format`` and its ETag, or None if it wasn't generated.
+    """
+    try:
+        content = settings.API_SCHEMA_FILE.read_bytes()
+    except FileNotFoundError:
+        return None
+    if schema_format == "json":
+        content = json.dumps(yaml.safe_load(content), separators=(",", ":")).encode()
+    return content, hashlib.sha256(content).hexdigest()
+
+
+@receiver(setting_changed)
+def reset_schema(setting, **kwargs):
+    if setting == "API_SCHEMA_FILE":
+        load.cache_clear()
+
+
+def _format(request):
+    requested = request.GET.get("format")
+    if requested in CONTENT_TYPES:
+        return requested
+    return "json" if "json" in request.headers.get("Accept", "") else "yaml"
+
+
+def _etag(request):
+    loaded = load(_format(request))
+    return loaded and loaded[1]
+
+
+@require_safe
+@condition(etag_func=_etag)
+def schema_view(request):
+    schema_format = _format(request)
+    loaded = load(schema_format)
+    if loaded is None:
+        raise Http404("The API schema hasn't been generated, run manage.py generate_schema.")
+    response = HttpResponse(loaded[0], content_type=CONTENT_TYPES[schema_format])
+    patch_cache_control(response, public=True, max_age=settings.API_SCHEMA_MAX_AGE)
+    patch_vary_headers(response, ["Accept"])
+    return response
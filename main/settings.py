@@ -10,6 +10,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 import os
 import sys
+from datetime import timedelta
 from pathlib import Path
 
 import environ
@@ -39,8 +40,54 @@ env = environ.Env(
     # -- File System
     DJANGO_STATIC_ROOT=(str, os.path.join(BASE_DIR, "assets/static")),
     DJANGO_MEDIA_ROOT=(str, os.path.join(BASE_DIR, "assets/media")),
+    # -- Internal nginx location the static and media roots are aliased under (Optional)
+    DJANGO_FILE_ACCEL_REDIRECT_PREFIX=(str, None),
+    # -- Whether Django serves the static and media roots itself (default: with DEBUG or the prefix above)
+    DJANGO_SERVE_FILES=(bool, None),
+    # -- Media storage: filesystem | s3 (any S3-compatible service, e.g. MinIO with an endpoint URL)
+    DJANGO_MEDIA_STORAGE=(str, "filesystem"),
+    DJANGO_MEDIA_S3_BUCKET=(str, None),
+    DJANGO_MEDIA_S3_ENDPOINT_URL=(str, None),
+    DJANGO_MEDIA_S3_REGION=(str, None),
+    DJANGO_MEDIA_S3_ACCESS_KEY=(str, None),
+    DJANGO_MEDIA_S3_SECRET_KEY=(str, None),
+    DJANGO_MEDIA_URL_EXPIRY=(int, 60 * 60),
     # Testing
     PYTEST_XDIST_WORKER=(str, None),
+    # Authentication
+    DJANGO_STATELESS_JWT_AUTH=(bool, True),
+    # Throttling: reverse proxies in front of the app, whose X-Forwarded-For entries are trusted
+    DJANGO_NUM_PROXIES=(int, 0),
+    DJANGO_THROTTLE_LOGIN_RATE=(str, "20/min"),
+    DJANGO_THROTTLE_LOGIN_ACCOUNT_RATE=(str, "5/min"),
+    DJANGO_THROTTLE_RECOVERY_ACCOUNT_RATE=(str, "3/hour"),
+    DJANGO_THROTTLE_REGISTRATION_RATE=(str, "10/hour"),
+    DJANGO_THROTTLE_FORM_SUBMISSION_RATE=(str, "10/hour"),
+    # Password hashing
+    DJANGO_PASSWORD_HASHER=(str, "pbkdf2"),
+    DJANGO_PASSWORD_PBKDF2_ITERATIONS=(int, None),
+    DJANGO_PASSWORD_ARGON2_TIME_COST=(int, None),
+    DJANGO_PASSWORD_ARGON2_MEMORY_COST=(int, None),
+    DJANGO_PASSWORD_ARGON2_PARALLELISM=(int, None),
+    # Order tracking events
+    DJANGO_ORDER_EVENTS_BACKEND=(str, "local"),
+    # Idempotency keys
+    DJANGO_IDEMPOTENCY_KEY_TTL=(int, 24 * 60 * 60),
+    # Payment gateway webhooks
+    DJANGO_PAYMENT_WEBHOOK_SECRET=(str, None),
+    # Worker profile: full | lean
+    DJANGO_WORKER_PROFILE=(str, "full"),
+    # Metrics: a directory shared by all worker processes (required with several), and a scrape token
+    DJANGO_METRICS_DIR=(str, None),
+    DJANGO_METRICS_TOKEN=(str, None),
+    DJANGO_METRICS_REQUIRE_TOKEN=(bool, True),
+    DJANGO_METRICS_ALLOWED_NETWORKS=(list, ["127.0.0.0/8", "::1/128"]),
+    # Sentry: errors are reported and requests traced only with a DSN, or when capturing locally
+    SENTRY_DSN=(str, None),
+    SENTRY_ENVIRONMENT=(str, "production"),
+    SENTRY_RELEASE=(str, None),
+    SENTRY_TRACES_SAMPLE_RATE=(float, 0.0),
+    SENTRY_CAPTURE_LOCALLY=(bool, False),
 )
 
 # Quick-start development settings - unsuitable for production
@@ -81,6 +128,24 @@ INSTALLED_APPS = [
     "product",
 ]
 
+# Apps that only the admin, its forms or the email tracking webhooks use. "lean" workers,
+# which serve the API alone, leave them out: they start faster and import email backends,
+# storages and such on first use. Run the admin and `manage.py` commands on "full" ones.
+# Use `manage.py profile_imports` and `manage.py benchmark_cold_start` to compare them.
+ADMIN_ONLY_APPS = [
+    "django.contrib.admin",
+    "django.contrib.messages",
+    "reversion",
+    "admin_auto_filters",
+    "django_premailer",
+    "storages",
+    "tinymce",
+    "anymail",
+]
+WORKER_PROFILE = env("DJANGO_WORKER_PROFILE")
+if WORKER_PROFILE == "lean":
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ADMIN_ONLY_APPS]
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -91,6 +156,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+if WORKER_PROFILE == "lean":
+    MIDDLEWARE.remove("django.contrib.messages.middleware.MessageMiddleware")
 
 ROOT_URLCONF = "main.urls"
 
@@ -111,6 +178,8 @@ TEMPLATES = [
         },
     },
 ]
+if WORKER_PROFILE == "lean":
+    TEMPLATES[0]["OPTIONS"]["context_processors"].remove("django.contrib.messages.context_processors.messages")
 
 WSGI_APPLICATION = "main.wsgi.application"
 
@@ -120,7 +189,7 @@ WSGI_APPLICATION = "main.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": "django.contrib.gis.db.backends.postgis",
         "HOST": env("DB_HOST"),
         "PORT": env("DB_PORT"),
         "NAME": env("DB_NAME"),
@@ -149,6 +218,35 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# The selected hasher encodes new passwords, the others stay listed so existing hashes
+# keep verifying and get re-encoded with the selected hasher/cost on the next login.
+# Unset costs use Django's defaults. Use `manage.py benchmark_password_hashers` to pick them.
+
+PASSWORD_HASHER = env("DJANGO_PASSWORD_HASHER")  # pbkdf2 | argon2 (requires argon2-cffi)
+PASSWORD_PBKDF2_ITERATIONS = env("DJANGO_PASSWORD_PBKDF2_ITERATIONS")
+PASSWORD_ARGON2_TIME_COST = env("DJANGO_PASSWORD_ARGON2_TIME_COST")
+PASSWORD_ARGON2_MEMORY_COST = env("DJANGO_PASSWORD_ARGON2_MEMORY_COST")
+PASSWORD_ARGON2_PARALLELISM = env("DJANGO_PASSWORD_ARGON2_PARALLELISM")
+
+PASSWORD_HASHERS = {
+    "pbkdf2": [
+        "user.hashers.TunablePBKDF2PasswordHasher",
+        "user.hashers.TunableArgon2PasswordHasher",
+    ],
+    "argon2": [
+        "user.hashers.TunableArgon2PasswordHasher",
+        "user.hashers.TunablePBKDF2PasswordHasher",
+    ],
+}[PASSWORD_HASHER] + [
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+# Password recovery tokens older than this are rejected and purged by `manage.py purge_recoveries`
+PASSWORD_RECOVERY_TOKEN_TTL = timedelta(hours=24)
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -167,19 +265,57 @@ USE_TZ = True
 STATIC_URL = env("DJANGO_STATIC_URL")
 MEDIA_URL = env("DJANGO_MEDIA_URL")
 
-# Default
-STORAGES = {
-    "default": {
+MEDIA_STORAGE = env("DJANGO_MEDIA_STORAGE")  # filesystem | s3 (requires boto3)
+MEDIA_STORAGE_BACKENDS = {
+    "filesystem": {
         "BACKEND": "django.core.files.storage.FileSystemStorage",
     },
+    # Media URLs are signed locally (no request to the bucket) and stay valid for DJANGO_MEDIA_URL_EXPIRY seconds.
+    "s3": {
+        "BACKEND": "storages.backends.s3.S3Storage",
+        "OPTIONS": {
+            "bucket_name": env("DJANGO_MEDIA_S3_BUCKET"),
+            "endpoint_url": env("DJANGO_MEDIA_S3_ENDPOINT_URL"),
+            "region_name": env("DJANGO_MEDIA_S3_REGION"),
+            "access_key": env("DJANGO_MEDIA_S3_ACCESS_KEY"),
+            "secret_key": env("DJANGO_MEDIA_S3_SECRET_KEY"),
+            "signature_version": "s3v4",
+            "addressing_style": "path" if env("DJANGO_MEDIA_S3_ENDPOINT_URL") else None,
+            "querystring_auth": True,
+            "querystring_expire": env("DJANGO_MEDIA_URL_EXPIRY"),
+            "default_acl": "private",
+            "file_overwrite": False,
+            "object_parameters": {"CacheControl": "private, max-age=%d" % env("DJANGO_MEDIA_URL_EXPIRY")},
+        },
+    },
+}
+
+STORAGES = {
+    "default": MEDIA_STORAGE_BACKENDS[MEDIA_STORAGE],
     "staticfiles": {
-        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+        # Content-hashed names plus .gz (and .br, when the optional brotli package is installed) variants.
+        "BACKEND": "main.storage.CompressedManifestStaticFilesStorage",
     },
 }
 
 STATIC_ROOT = env("DJANGO_STATIC_ROOT")
 MEDIA_ROOT = env("DJANGO_MEDIA_ROOT")
 
+# Served by main.files. Hashed static files are cached for a year regardless.
+STATIC_FILES_MAX_AGE = 60 * 60
+MEDIA_FILES_MAX_AGE = 24 * 60 * 60
+# With a prefix, e.g. "/protected/", workers only answer with an X-Accel-Redirect and nginx sends the file:
+#   location /protected/static/ { internal; alias <STATIC_ROOT>/; gzip_static on; }
+#   location /protected/media/ { internal; alias <MEDIA_ROOT>/; }
+FILE_ACCEL_REDIRECT_PREFIX = env("DJANGO_FILE_ACCEL_REDIRECT_PREFIX")
+# Off by default in production without the prefix, where the web server sends the files.
+SERVE_FILES = env("DJANGO_SERVE_FILES")
+if SERVE_FILES is None:
+    SERVE_FILES = DEBUG or bool(FILE_ACCEL_REDIRECT_PREFIX)
+
+# Resized copies written in the background after an image is uploaded: label -> longest side in pixels.
+MEDIA_IMAGE_VARIANTS = {"thumbnail": 200, "medium": 800}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -233,11 +369,100 @@ TESTING = (
     or env("PYTEST_XDIST_WORKER") is not None
 )
 
+# Shared cache (throttle buckets, ...) with a per-process fallback
+CACHE_REDIS_URL = env("TEST_DJANGO_CACHE_REDIS_URL") if TESTING else env("DJANGO_CACHE_REDIS_URL", default=None)
+
+CACHES = {
+    "default": (
+        {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": CACHE_REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                "SOCKET_CONNECT_TIMEOUT": 1,
+                "SOCKET_TIMEOUT": 1,
+            },
+        }
+        if CACHE_REDIS_URL
+        else {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    ),
+    "local": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "local",
+    },
+}
+
+# Live order tracking events: "local" only reaches watchers in the publishing process,
+# use "redis" when running more than one ASGI worker.
+ORDER_EVENTS_BACKEND = env("DJANGO_ORDER_EVENTS_BACKEND")
+ORDER_EVENTS_REDIS_URL = env("DJANGO_ORDER_EVENTS_REDIS_URL", default=None) or CACHE_REDIS_URL
+# Seconds between keep-alive comments, and before a stream is closed for the client to reconnect.
+ORDER_EVENTS_HEARTBEAT = 15
+ORDER_EVENTS_MAX_STREAM_SECONDS = 300
+
+# Seconds a response stored for an Idempotency-Key is replayed, and the longest a
+# request holding a key may run before a retry with the same key is let through.
+IDEMPOTENCY_KEY_TTL = env("DJANGO_IDEMPOTENCY_KEY_TTL")
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Pricing rules as (minimum total quantity in the cart, value) pairs, see product.pricing.
+PRICING_DELIVERY_CHARGES = [(0, "19.99"), (25, "0.00")]
+PRICING_FREE_CASES = [(0, 0), (25, 1), (40, 2), (50, 3)]
+
+# Prometheus metrics, see main.metrics. Served at /internal/metrics/, which the public proxy must not route.
+METRICS_DIR = env("DJANGO_METRICS_DIR")
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = env("DJANGO_METRICS_TOKEN")
+# Without a token the metrics are only served when this is explicitly turned off.
+METRICS_REQUIRE_TOKEN = env("DJANGO_METRICS_REQUIRE_TOKEN")
+METRICS_ALLOWED_NETWORKS = env("DJANGO_METRICS_ALLOWED_NETWORKS")
+
+# Sentry, see main.tracing. Requests are traced at the rate for their URL name, or SENTRY_TRACES_SAMPLE_RATE.
+SENTRY_DSN = env("SENTRY_DSN")
+SENTRY_TRACES_SAMPLE_RATE = env("SENTRY_TRACES_SAMPLE_RATE")
+SENTRY_ROUTE_SAMPLE_RATES = {
+    "create-order": 1.0,
+    "cart-checkout": 1.0,
+    "payment-list": 1.0,
+    "product-list": 0.01,
+    "product-detail": 0.01,
+}
+# Keep the events in memory instead of sending them anywhere, see main.tracing.CapturingTransport.
+SENTRY_CAPTURE_LOCALLY = env("SENTRY_CAPTURE_LOCALLY")
+if SENTRY_CAPTURE_LOCALLY or (SENTRY_DSN and not TESTING):
+    from main import tracing
+
+    tracing.init(
+        dsn=SENTRY_DSN,
+        environment=env("SENTRY_ENVIRONMENT"),
+        release=env("SENTRY_RELEASE"),
+        default_rate=SENTRY_TRACES_SAMPLE_RATE,
+        route_rates=SENTRY_ROUTE_SAMPLE_RATES,
+        capture_locally=SENTRY_CAPTURE_LOCALLY,
+    )
+
+# How long checkout holds stock for a cart before release_stale_reservations puts it back.
+STOCK_RESERVATION_TTL = timedelta(minutes=30)
+
+# Shared secret the payment gateway signs webhooks with, and how old (in seconds)
+# a signed delivery may be before it is rejected as a replay.
+PAYMENT_WEBHOOK_SECRET = env("DJANGO_PAYMENT_WEBHOOK_SECRET")
+PAYMENT_WEBHOOK_TOLERANCE = 300
+
 AUTH_USER_MODEL = 'user.User'
 
+# Build request.user from the access token claims instead of loading the User row per request
+STATELESS_JWT_AUTH = env("DJANGO_STATELESS_JWT_AUTH")
+SIMPLE_JWT = {
+    # Reloads the user on refresh, so new access tokens carry its current state.
+    "TOKEN_REFRESH_SERIALIZER": "user.authentication.UserTokenRefreshSerializer",
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.StatelessJWTAuthentication'
+        if STATELESS_JWT_AUTH
+        else 'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 100,
@@ -246,8 +471,31 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ),
+    # Client addresses for throttling: REMOTE_ADDR, or the X-Forwarded-For entry added by the outermost of
+    # this many proxies. Leaving it unset would trust the whole header, which clients can spoof.
+    "NUM_PROXIES": env("DJANGO_NUM_PROXIES"),
+    # Token bucket sizes for user.throttling, refilled evenly over the period
+    "DEFAULT_THROTTLE_RATES": {
+        "login": env("DJANGO_THROTTLE_LOGIN_RATE"),
+        "login-account": env("DJANGO_THROTTLE_LOGIN_ACCOUNT_RATE"),
+        "recovery-account": env("DJANGO_THROTTLE_RECOVERY_ACCOUNT_RATE"),
+        "registration": env("DJANGO_THROTTLE_REGISTRATION_RATE"),
+        "form-submission": env("DJANGO_THROTTLE_FORM_SUBMISSION_RATE"),
+    },
+    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+}
+
+SPECTACULAR_SETTINGS = {
+    "TITLE": "Kaveri API",
+    "VERSION": "1.0.0",
+    "SERVE_INCLUDE_SCHEMA": False,
 }
 
+# The OpenAPI schema is generated at build time with `manage.py generate_schema` into this
+# file, which /api-docs/ serves with an ETag and this max-age (seconds).
+API_SCHEMA_FILE = BASE_DIR / "main" / "openapi.yaml"
+API_SCHEMA_MAX_AGE = 60 * 60
+
 
 TINYMCE_DEFAULT_CONFIG = {
     "entity_encoding": "raw",
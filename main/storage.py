@@ -0,0 +1,64 @@
+"""
+Static files storage that content-hashes file names and pre-compresses them.
+
+``collectstatic`` writes ``app.css`` as ``app.<hash>.css`` (the manifest maps one
+to the other, so ``{% static %}`` links change with the content and can be cached
+forever), then a ``.gz`` and, when the ``brotli`` package is installed, a ``.br``
+next to each hashed text asset. ``main.files.serve_static`` picks the variant the
+client accepts.
+"""
+
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".mjs", ".map", ".json", ".svg", ".txt", ".html", ".xml", ".ico", ".ttf", ".eot"}
+# Variants that don't save at least this share of the original aren't kept.
+MIN_SAVING = 0.05
+
+
+def _gzip(content):
+    # mtime=0 so the same file always compresses to the same bytes.
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+ENCODINGS = {"gzip": (".gz", _gzip)}
+if brotli is not None:
+    ENCODINGS = {"br": (".br", lambda content: brotli.compress(content, quality=11)), **ENCODINGS}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Files missing from the manifest (or all of them, before ``collectstatic`` ran) are
+    # linked under their plain names, so a missing file is a 404 rather than a 500.
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:  # Not collected, so there is nothing to hash.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for hashed_name in set(self.hashed_files.values()):
+            if os.path.splitext(hashed_name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            with self.open(hashed_name) as file:
+                content = file.read()
+            for suffix, compress in ENCODINGS.values():
+                # A hashed name always has the same content, so an existing variant is current.
+                if self.exists(hashed_name + suffix):
+                    continue
+                compressed = compress(content)
+                if len(compressed) <= len(content) * (1 - MIN_SAVING):
+                    self._save(hashed_name + suffix, ContentFile(compressed))
+                    yield hashed_name, hashed_name + suffix, True
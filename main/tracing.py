@@ -0,0 +1,87 @@
+"""
+Sentry error reporting and performance tracing.
+
+Requests are traced at the rate set for their URL name in ``SENTRY_ROUTE_SAMPLE_RATES``
+(``SENTRY_TRACES_SAMPLE_RATE`` for the others), or as the caller's trace decided.
+Traced requests get spans for database queries and cache calls (from the Django
+integration), for turning top-level serializers into data, and for email sends.
+
+With ``SENTRY_CAPTURE_LOCALLY`` the events are kept in memory by ``CapturingTransport``
+instead of being sent, for tests and ``benchmark_tracing``.
+"""
+
+from functools import lru_cache
+
+import sentry_sdk
+from django.urls import Resolver404, resolve
+from rest_framework import serializers
+from sentry_sdk.integrations.django import DjangoIntegration
+from sentry_sdk.transport import Transport
+
+
+class CapturingTransport(Transport):
+    """
+    Keeps the envelopes Sentry would send in ``envelopes``.
+    """
+
+    def __init__(self, options=None):
+        super().__init__(options)
+        self.envelopes = []
+
+    def capture_envelope(self, envelope):
+        self.envelopes.append(envelope)
+
+    def transactions(self):
+        return [
+            item.payload.json for envelope in self.envelopes for item in envelope.items if item.type == "transaction"
+        ]
+
+
+@lru_cache(maxsize=1024)
+def url_name(path):
+    try:
+        return resolve(path).url_name
+    except Resolver404:
+        return None
+
+
+def make_traces_sampler(default_rate, route_rates):
+    def traces_sampler(sampling_context):
+        if sampling_context.get("parent_sampled") is not None:
+            return sampling_context["parent_sampled"]
+        environ = sampling_context.get("wsgi_environ")
+        if environ is None:
+            return default_rate
+        return route_rates.get(url_name(environ.get("PATH_INFO", "")), default_rate)
+
+    return traces_sampler
+
+
+def _trace_serializers():
+    # Only .data is wrapped, which nested serializers don't go through: one span per response.
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if getattr(cls.data.fget, "traced", False):
+            continue
+
+        def data(self, fget=cls.data.fget):
+            with sentry_sdk.start_span(op="serialize", name=type(self).__name__):
+                return fget(self)
+
+        data.traced = True
+        cls.data = property(data)
+
+
+def init(dsn, environment, default_rate, route_rates, capture_locally=False, release=None):
+    """
+    Start the Sentry client, called at the end of the settings.
+    """
+    sentry_sdk.init(
+        dsn=dsn,
+        environment=environment,
+        release=release,
+        transport=CapturingTransport() if capture_locally else None,
+        traces_sampler=make_traces_sampler(default_rate, route_rates),
+        integrations=[DjangoIntegration(middleware_spans=False, signals_spans=False, cache_spans=True)],
+        send_default_pii=False,
+    )
+    _trace_serializers()
@@ -15,17 +15,14 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, re_path as url, include
 from django.conf import settings
-from django.conf.urls.static import static
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
+from main.files import file_urlpatterns
+from main.metrics import metrics_view
+from main.schema import schema_view
 from user import views as user_views
 from product import views as product_views
 
@@ -36,28 +33,47 @@ router.register(r"cart", product_views.CartViewSet, basename="cart")
 router.register(r"product-category", product_views.ProductCatgeoryViewSet, basename="product-category")
 router.register(r'orders', product_views.OrderReadOnlyViewSet, basename='order')
 router.register(r'stores', product_views.StoreViewSet, basename="store")
+router.register(r"payments", product_views.PaymentViewSet, basename="payment")
+router.register(r"wishlist", product_views.WishlistViewSet, basename="wishlist")
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
     path("api/v1/", include(router.urls)),
     url(r"^api/register", user_views.RegistrationView.as_view()),
     url(r"^change_password", user_views.ChangePasswordView.as_view()),
+    url(r"^recover_password", user_views.RecoverPasswordView.as_view()),
     url(r"^change_recover_password", user_views.ChangeRecoverPasswordView.as_view()),
     url(r"^api/login", user_views.LoginView.as_view()),
-    path("docs/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
-    path("api-docs/", SpectacularAPIView.as_view(), name="schema"),
-    path("api-docs/swagger-ui/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    path("api-docs/", schema_view, name="schema"),
+    path("internal/metrics/", metrics_view, name="metrics"),
     path('api/v1/beer-club/signup/', user_views.beer_club_signup, name='beer_club_signup'),
     path('api/v1/contact-us/signup/', user_views.contact_message_create, name='contact_message_create'),
     path("api/v1/shipping/", product_views.ShippingView.as_view(), name="shipping"),
     path("api/v1/shipping/<int:cart_id>/", product_views.ShippingView.as_view(), name="get-shipping"),
     path("api/v1/order/", product_views.OrderView.as_view(), name="create-order"),
     path("api/v1/order/<int:order_id>/", product_views.OrderView.as_view(), name="get-order"),
+    path("api/v1/order/<int:order_id>/status/", product_views.OrderStatusView.as_view(), name="order-status"),
+    path("api/v1/order/<int:order_id>/events/", product_views.order_events, name="order-events"),
+    path("api/v1/order-export/", product_views.OrderExportView.as_view(), name="order-export"),
+    path("api/v1/order-status/bulk/", product_views.OrderStatusBulkUpdateView.as_view(), name="order-status-bulk"),
+    path("api/v1/payment-webhook/", product_views.PaymentWebhookView.as_view(), name="payment-webhook"),
     path('api/token/', user_views.UserLoginView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/v1/profile/', user_views.ProfileView.as_view(), name="profile"),
     path('api/order-stats/', product_views.OrderStatsView.as_view(), name='order-stats'),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
-urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
+# Lean workers serve the API only, see ADMIN_ONLY_APPS.
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.append(path("admin/", admin.site.urls))
+
+if settings.WORKER_PROFILE == "full":
+    from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+    urlpatterns += [
+        path("docs/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+        path("api-docs/swagger-ui/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    ]
+
+urlpatterns += file_urlpatterns()
@@ -1,6 +1,11 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.gis.admin import GISModelAdmin
+from django.utils import timezone
 from django.utils.html import format_html
 
+from .exports import export_response
+from .tracking import bulk_transition_orders, can_transition
 from .models import (
     Product,
     ProductCategory,
@@ -38,7 +43,7 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter: tuple[str] = ("category", "stock_status", "featured")
     search_fields: tuple[str] = ("name", "description")
     ordering: tuple[str] = ("name",)
-    readonly_fields: tuple[str] = ("image_preview",)
+    readonly_fields: tuple[str, str] = ("image_preview", "stock_status")
 
     fieldsets: tuple = (
         (
@@ -115,12 +120,24 @@ class ReviewPhotoInline(admin.TabularInline):
 
 
 class ReviewAdmin(admin.ModelAdmin):
-    list_display = ("product", "name", "rating", "created_at", "updated_at")
-    list_filter = ("rating", "created_at")
+    list_display = ("product", "name", "rating", "status", "created_at", "updated_at")
+    list_filter = ("status", "rating", "created_at")
     search_fields = ("name", "email", "review_text", "product__name")
     ordering = ("-created_at",)
     readonly_fields = ("created_at", "updated_at")
+    list_select_related = ("product",)
     inlines = [ReviewPhotoInline]
+    actions = ["approve", "reject"]
+
+    @admin.action(description="Approve selected reviews")
+    def approve(self, request, queryset):
+        updated = queryset.update(status=Review.Status.APPROVED, updated_at=timezone.now())
+        self.message_user(request, f"Approved {updated} reviews.")
+
+    @admin.action(description="Reject selected reviews")
+    def reject(self, request, queryset):
+        updated = queryset.update(status=Review.Status.REJECTED, updated_at=timezone.now())
+        self.message_user(request, f"Rejected {updated} reviews.")
 
 
 class ReviewPhotoAdmin(admin.ModelAdmin):
@@ -135,25 +152,67 @@ class ShippingAdmin(admin.ModelAdmin):
     search_fields = ("first_name", "last_name", "email", "city", "state")
 
 
+class OrderAdminForm(forms.ModelForm):
+    class Meta:
+        model = Order
+        fields = "__all__"
+
+    def clean_order_status(self):
+        new_status = self.cleaned_data["order_status"]
+        current_status = self.instance.order_status
+        if self.instance.pk and new_status != current_status and not can_transition(current_status, new_status):
+            raise forms.ValidationError(f"An order can't go from {current_status} to {new_status}.")
+        return new_status
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    form = OrderAdminForm
     list_display = ("id", "cart", "total_price", "delivery_charge", "order_status", "created_at")
     list_filter = ("order_status",)
     search_fields = ("cart__id", "shipping__first_name", "shipping__last_name")
+    actions = ("mark_shipped", "mark_delivered", "export_csv", "export_ndjson")
+
+    def transition(self, request, queryset, new_status):
+        updated, rejected = bulk_transition_orders(
+            queryset.values_list("id", flat=True), new_status, request.user.username
+        )
+        if updated:
+            self.message_user(request, f"{len(updated)} orders marked as {new_status}.", messages.SUCCESS)
+        if rejected:
+            self.message_user(
+                request, f"{len(rejected)} orders can't be marked as {new_status} from their status.", messages.WARNING
+            )
+
+    @admin.action(description="Mark selected orders as Shipped")
+    def mark_shipped(self, request, queryset):
+        self.transition(request, queryset, OrderTracking.Status.SHIPPED)
+
+    @admin.action(description="Mark selected orders as Delivered")
+    def mark_delivered(self, request, queryset):
+        self.transition(request, queryset, OrderTracking.Status.DELIVERED)
+
+    @admin.action(description="Export selected orders as CSV")
+    def export_csv(self, request, queryset):
+        return export_response(queryset, "csv")
+
+    @admin.action(description="Export selected orders as NDJSON")
+    def export_ndjson(self, request, queryset):
+        return export_response(queryset, "ndjson")
 
     def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
         if 'order_status' in form.changed_data:
-            # Add tracking record for the status change
+            # Add tracking record for the status change, this also moves the order's latest tracking pointer
             OrderTracking.objects.create(
                 order=obj,
                 status=obj.order_status,
                 updated_by=request.user.username
             )
-        super().save_model(request, obj, form, change)
 
 
 @admin.register(Store)
-class StoreAdmin(admin.ModelAdmin):
+class StoreAdmin(GISModelAdmin):
     list_display = ('name', 'address', 'link')
     search_fields = ('name', 'address')
 
@@ -1,12 +1,39 @@
-from django.core.mail import send_mail
+import sentry_sdk
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
 
+from main import metrics
+from .models import Order, Payment
 
-def send_order_status_email(order):
+EMAILS_SENT = metrics.counter("kaveri_emails_sent_total", "Emails handed to the email backend.", ["kind"])
+EMAIL_FAILURES = metrics.counter("kaveri_email_failures_total", "Emails the email backend failed to send.", ["kind"])
+EMAIL_SEND_SECONDS = metrics.histogram(
+    "kaveri_email_send_seconds", "Time spent sending a batch of emails (one connection).", ["kind"]
+)
+
+
+def send_messages(kind, messages):
     """
-    Sends an email notification to the customer when the order status changes.
+    Sends ``messages`` over one connection and records how it went under ``kind``.
+    """
+    if not messages:
+        return 0
+    try:
+        with EMAIL_SEND_SECONDS.time(kind=kind), sentry_sdk.start_span(op="email.send", name=kind) as span:
+            span.set_data("messages", len(messages))
+            sent = get_connection().send_messages(messages)
+    except Exception:
+        EMAIL_FAILURES.inc(len(messages), kind=kind)
+        raise
+    EMAILS_SENT.inc(sent or 0, kind=kind)
+    return sent
+
+
+def build_order_status_email(order):
+    """
+    Builds the status update email for an order (expects ``order.shipping`` to be loaded).
     """
     subject = f"Order #{order.id} Status Update"
     recipient_email = order.shipping.email
@@ -18,18 +45,30 @@ def send_order_status_email(order):
     html_message = render_to_string('order_status_email.html', context)
     plain_message = strip_tags(html_message)
 
-    send_mail(
-        subject,
-        plain_message,
-        settings.DEFAULT_FROM_EMAIL,
-        [recipient_email],
-        html_message=html_message,
-    )
+    message = EmailMultiAlternatives(subject, plain_message, settings.DEFAULT_FROM_EMAIL, [recipient_email])
+    message.attach_alternative(html_message, "text/html")
+    return message
 
 
-def send_payment_success_email(payment):
+def send_order_status_email(order):
     """
-    Sends an email notification to the customer when the payment is completed.
+    Sends an email notification to the customer when the order status changes.
+    """
+    send_messages("order_status", [build_order_status_email(order)])
+
+
+def send_order_status_emails(order_ids):
+    """
+    Sends the status update emails for several orders, loaded in one query
+    and sent over a single connection.
+    """
+    orders = Order.objects.filter(id__in=order_ids).select_related("shipping")
+    send_messages("order_status", [build_order_status_email(order) for order in orders])
+
+
+def build_payment_success_email(payment):
+    """
+    Builds the payment confirmation email (expects ``payment.order.shipping`` to be loaded).
     """
     subject = f"Payment for Order #{payment.order.id} Successful"
     recipient_email = payment.order.shipping.email
@@ -42,10 +81,22 @@ def send_payment_success_email(payment):
     html_message = render_to_string('payment_success_email.html', context)
     plain_message = strip_tags(html_message)
 
-    send_mail(
-        subject,
-        plain_message,
-        settings.DEFAULT_FROM_EMAIL,
-        [recipient_email],
-        html_message=html_message,
-    )
+    message = EmailMultiAlternatives(subject, plain_message, settings.DEFAULT_FROM_EMAIL, [recipient_email])
+    message.attach_alternative(html_message, "text/html")
+    return message
+
+
+def send_payment_success_email(payment):
+    """
+    Sends an email notification to the customer when the payment is completed.
+    """
+    send_messages("payment_success", [build_payment_success_email(payment)])
+
+
+def send_payment_success_emails(payment_ids):
+    """
+    Sends the payment confirmation emails for several payments, loaded in one
+    query and sent over a single connection.
+    """
+    payments = Payment.objects.filter(id__in=payment_ids).select_related("order__shipping")
+    send_messages("payment_success", [build_payment_success_email(payment) for payment in payments])
@@ -0,0 +1,184 @@
+"""
+Live order tracking events.
+
+Every ``OrderTracking`` insert is published once its transaction commits. Watchers
+(the server-sent events stream) subscribe per order; inside a process all watchers
+of one order share a single subscription, so with the Redis backend there is one
+channel subscription per order and worker however many browser tabs are open.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+def tracking_event(tracking):
+    return {
+        "order": tracking.order_id,
+        "tracking_id": tracking.id,
+        "status": tracking.status,
+        "updated_at": tracking.updated_at,
+        "updated_by": tracking.updated_by,
+    }
+
+
+def _offer(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        logger.warning("Dropping order event for a watcher that is not keeping up")
+
+
+class LocalBroker:
+    """
+    In-process pub/sub. Only reaches watchers served by the publishing process.
+    """
+
+    watcher_queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._watchers = defaultdict(set)
+
+    def publish(self, order_id, event):
+        """
+        Publish an event for an order. Safe to call from sync code in any thread.
+        """
+        self._fan_out(order_id, json.loads(json.dumps(event, cls=DjangoJSONEncoder)))
+
+    def _fan_out(self, order_id, event):
+        with self._lock:
+            watchers = list(self._watchers.get(order_id, ()))
+        for loop, queue in watchers:
+            loop.call_soon_threadsafe(_offer, queue, event)
+
+    async def subscribe(self, order_id) -> asyncio.Queue:
+        """
+        Returns the queue the order's events are put on, from the moment this returns.
+        """
+        queue = asyncio.Queue(maxsize=self.watcher_queue_size)
+        with self._lock:
+            first = not self._watchers[order_id]
+            self._watchers[order_id].add((asyncio.get_running_loop(), queue))
+        try:
+            if first:
+                await self.on_first_watcher(order_id)
+            await self.wait_subscribed(order_id)
+        except BaseException:
+            await self.unsubscribe(order_id, queue)
+            raise
+        return queue
+
+    async def unsubscribe(self, order_id, queue):
+        with self._lock:
+            watchers = self._watchers[order_id]
+            watchers.discard((asyncio.get_running_loop(), queue))
+            last = not watchers
+            if last:
+                del self._watchers[order_id]
+        if last:
+            await self.on_last_watcher(order_id)
+
+    async def on_first_watcher(self, order_id):
+        pass
+
+    async def wait_subscribed(self, order_id):
+        pass
+
+    async def on_last_watcher(self, order_id):
+        pass
+
+
+class RedisBroker(LocalBroker):
+    """
+    Pub/sub over Redis channels, so events reach watchers on every worker.
+    """
+
+    def __init__(self, url):
+        super().__init__()
+        self.url = url
+        self._publisher = None
+        self._listeners = {}
+        self._subscribed = {}
+
+    @staticmethod
+    def channel(order_id):
+        return f"order-tracking:{order_id}"
+
+    def publish(self, order_id, event):
+        import redis
+
+        if self._publisher is None:
+            self._publisher = redis.Redis.from_url(self.url)
+        self._publisher.publish(self.channel(order_id), json.dumps(event, cls=DjangoJSONEncoder))
+
+    async def on_first_watcher(self, order_id):
+        # Both are set before anything is awaited, so later watchers find them.
+        subscribed = self._subscribed[order_id] = asyncio.get_running_loop().create_future()
+        self._listeners[order_id] = asyncio.create_task(self._listen(order_id, subscribed))
+
+    async def wait_subscribed(self, order_id):
+        # Until Redis confirms the subscription, events published meanwhile don't reach us.
+        subscribed = self._subscribed.get(order_id)
+        if subscribed is not None:
+            await asyncio.shield(subscribed)
+
+    async def on_last_watcher(self, order_id):
+        self._subscribed.pop(order_id, None)
+        listener = self._listeners.pop(order_id, None)
+        if listener is not None:
+            listener.cancel()
+
+    async def _listen(self, order_id, subscribed):
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        try:
+            try:
+                await pubsub.subscribe(self.channel(order_id))
+                # subscribe() only sends the command, the confirmation is the first message.
+                await pubsub.get_message(timeout=None)
+            except Exception as exc:
+                if not subscribed.done():
+                    subscribed.set_exception(exc)
+                raise
+            subscribed.set_result(None)
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self._fan_out(order_id, json.loads(message["data"]))
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> LocalBroker:
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            if settings.ORDER_EVENTS_BACKEND == "redis":
+                _broker = RedisBroker(settings.ORDER_EVENTS_REDIS_URL)
+            else:
+                _broker = LocalBroker()
+    return _broker
+
+
+def publish_tracking_events(trackings):
+    broker = get_broker()
+    for tracking in trackings:
+        try:
+            broker.publish(tracking.order_id, tracking_event(tracking))
+        except Exception:
+            # Watchers fall back to polling, a broker outage must not fail the status update.
+            logger.exception("Could not publish the tracking event for order %s", tracking.order_id)
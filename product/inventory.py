@@ -0,0 +1,120 @@
+"""
+Stock reservations.
+
+Checkout takes a cart's quantities off ``Product.stock`` with one conditional
+``UPDATE ... WHERE stock >= quantity`` over all of the cart's products, so
+concurrent checkouts can't oversell: a checkout either reserves every line or
+nothing. ``stock_status`` is derived in the same statement.
+"""
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import CartItem, Product, StockReservation
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Not enough stock for products {self.product_ids}")
+
+
+def _adjust_stock(quantities, reserve):
+    """
+    Take (``reserve``) or put back quantities per product id in one UPDATE.
+
+    Returns the ids of the products updated; when reserving, products without
+    enough stock are left out.
+    """
+    if not quantities:
+        return set()
+    table = connection.ops.quote_name(Product._meta.db_table)
+    values = ", ".join(["(%s, %s)"] * len(quantities))
+    params = [param for product_id, quantity in quantities.items() for param in (product_id, quantity)]
+    sign, condition = ("-", f"AND {table}.stock >= v.quantity") if reserve else ("+", "")
+    sql = (
+        f"WITH v (id, quantity) AS (VALUES {values}) "
+        f"UPDATE {table} SET stock = {table}.stock {sign} v.quantity, "
+        f"stock_status = ({table}.stock {sign} v.quantity) > 0 "
+        f"FROM v WHERE {table}.id = v.id {condition} "
+        f"RETURNING {table}.id"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def _lock(product_ids):
+    # Lock in id order so checkouts of overlapping carts can't deadlock.
+    list(Product.objects.select_for_update().filter(id__in=product_ids).order_by("id").values_list("id", flat=True))
+
+
+def release(reservations):
+    """
+    Put the stock held by the given reservations back and delete them.
+
+    Returns
+    -------
+    int
+        The number of reservations released.
+    """
+    with transaction.atomic():
+        quantities = {}
+        reservation_ids = []
+        for reservation_id, product_id, quantity in reservations.select_for_update().values_list(
+            "id", "product_id", "quantity"
+        ):
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+            reservation_ids.append(reservation_id)
+        if not reservation_ids:
+            return 0
+        _lock(quantities)
+        _adjust_stock(quantities, reserve=False)
+        StockReservation.objects.filter(id__in=reservation_ids).delete()
+    return len(reservation_ids)
+
+
+def reserve_cart(cart):
+    """
+    Reserve stock for every line of the cart, replacing what it held before.
+
+    Raises
+    ------
+    InsufficientStock
+        If any product lacks the quantity; nothing is reserved then.
+    """
+    with transaction.atomic():
+        release(StockReservation.objects.filter(cart=cart))
+        quantities = dict(
+            CartItem.objects.filter(cart=cart, quantity__gt=0)
+            .values("product_id")
+            .annotate(total=Sum("quantity"))
+            .values_list("product_id", "total")
+        )
+        _lock(quantities)
+        reserved = _adjust_stock(quantities, reserve=True)
+        if len(reserved) != len(quantities):
+            raise InsufficientStock(set(quantities) - reserved)
+        StockReservation.objects.bulk_create(
+            StockReservation(cart=cart, product_id=product_id, quantity=quantity)
+            for product_id, quantity in quantities.items()
+        )
+    return quantities
+
+
+def commit_cart(cart):
+    """
+    Keep the cart's stock taken for its order: reserve it afresh (the cart may
+    have changed since checkout) and drop the reservations so they aren't released.
+    """
+    with transaction.atomic():
+        quantities = reserve_cart(cart)
+        StockReservation.objects.filter(cart=cart).delete()
+    return quantities
+
+
+def stale_reservations():
+    cutoff = timezone.now() - settings.STOCK_RESERVATION_TTL
+    return StockReservation.objects.filter(created_at__lt=cutoff, cart__is_order_created=False)
@@ -0,0 +1,64 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from product.inventory import InsufficientStock, reserve_cart
+from product.models import Cart, CartItem, Product, ProductCategory, StockReservation
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Run concurrent checkouts against one SKU and check that stock is never oversold."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checkouts", type=int, default=100, help="Concurrent checkouts of the SKU.")
+        parser.add_argument("--stock", type=int, default=50, help="Starting stock of the SKU.")
+        parser.add_argument("--quantity", type=int, default=1, help="Quantity each checkout asks for.")
+
+    def handle(self, *args, **options):
+        checkouts = options["checkouts"]
+        category = ProductCategory.objects.create(name="benchmark-checkout")
+        product = Product.objects.create(
+            name="benchmark-checkout", description="", price=10, category=category, stock=options["stock"]
+        )
+        user = User.objects.create_user(email="benchmark-checkout@example.com", username="benchmark-checkout", password=None)
+        carts = Cart.objects.bulk_create(Cart(user=user) for _ in range(checkouts))
+        CartItem.objects.bulk_create(CartItem(cart=cart, product=product, quantity=options["quantity"]) for cart in carts)
+
+        def checkout(cart):
+            started = time.perf_counter()
+            try:
+                reserve_cart(cart)
+                reserved = True
+            except InsufficientStock:
+                reserved = False
+            finally:
+                connection.close()
+            return reserved, time.perf_counter() - started
+
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=checkouts) as pool:
+                results = list(pool.map(checkout, carts))
+            elapsed = time.perf_counter() - started
+
+            product.refresh_from_db()
+            reserved = sum(1 for ok, _ in results if ok)
+            held = sum(StockReservation.objects.filter(product=product).values_list("quantity", flat=True))
+            latencies = sorted(latency * 1000 for _, latency in results)
+            self.stdout.write(
+                f"{checkouts} checkouts in {elapsed:.2f}s: {reserved} reserved, {checkouts - reserved} out of stock"
+            )
+            self.stdout.write(
+                f"latency ms: p50 {statistics.median(latencies):.1f}"
+                f" p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} max {latencies[-1]:.1f}"
+            )
+            self.stdout.write(f"stock left {product.stock}, reserved {held}, in stock {product.stock_status}")
+            if product.stock < 0 or product.stock + held != options["stock"]:
+                raise CommandError("Stock was oversold or lost")
+        finally:
+            category.delete()
+            user.delete()
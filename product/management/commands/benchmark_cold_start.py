@@ -0,0 +1,62 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .profile_imports import run_fresh
+
+# What a WSGI server does in a fresh worker: load the application, then serve a first request.
+WORKER = """
+import io, json, sys, time
+started = time.perf_counter()
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+ready = time.perf_counter()
+host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": %(path)r, "QUERY_STRING": "", "SERVER_NAME": host, "SERVER_PORT": "80",
+    "HTTP_HOST": host, "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr, "wsgi.url_scheme": "http",
+}
+status = []
+b"".join(application(environ, lambda code, headers, exc_info=None: status.append(code)))
+print(json.dumps({"setup": ready - started, "response": time.perf_counter() - started, "status": status[0]}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Measure how long fresh workers of each profile take to load the application and answer a first request."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Workers started per profile.")
+        parser.add_argument("--profile", choices=["full", "lean"], action="append", help="Defaults to both.")
+        # Answered by validation alone, so the database doesn't add to the measurement.
+        parser.add_argument("--path", default="/api/v1/stores/nearest/", help="First request served.")
+        parser.add_argument(
+            "--target", type=float, default=1000, help="Fail when the lean median to first response exceeds this (ms)."
+        )
+
+    def handle(self, *args, **options):
+        medians = {}
+        for profile in options["profile"] or ["full", "lean"]:
+            samples = []
+            for _ in range(options["runs"]):
+                started = time.perf_counter()
+                result = run_fresh(WORKER % {"path": options["path"]}, profile)
+                sample = json.loads(result.stdout.splitlines()[-1])
+                sample["process"] = time.perf_counter() - started
+                samples.append(sample)
+            medians[profile] = {
+                key: statistics.median(sample[key] for sample in samples) * 1000 for key in ("setup", "response", "process")
+            }
+            self.stdout.write(
+                f"{profile:<5} setup {medians[profile]['setup']:7.1f} ms"
+                f"  first response {medians[profile]['response']:7.1f} ms"
+                f"  process {medians[profile]['process']:7.1f} ms"
+                f"  (median of {options['runs']}, status {samples[-1]['status']})"
+            )
+
+        if "lean" in medians and medians["lean"]["response"] > options["target"]:
+            lean = medians["lean"]["response"]
+            raise CommandError(f"Lean workers take {lean:.0f} ms to respond, over the {options['target']:.0f} ms target")
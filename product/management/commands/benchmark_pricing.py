@@ -0,0 +1,63 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from product.models import Cart, CartItem, Product, ProductCategory
+from product.pricing import quote, quote_cart
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = "Measure pricing a large cart, in memory and from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=1000, help="Line items in the cart.")
+        parser.add_argument("--iterations", type=int, default=200, help="Quotes per measurement.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def report(self, name, elapsed, iterations, queries=None):
+        line = f"{name:<10} {elapsed / iterations * 1e3:8.3f} ms/quote"
+        if queries is not None:
+            line += f" {queries / iterations:5.2f} queries/quote"
+        self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        total_lines, iterations = options["lines"], options["iterations"]
+
+        lines = [(Decimal(rng.randint(100, 10000)) / 100, rng.randint(1, 5)) for _ in range(total_lines)]
+        started = time.perf_counter()
+        for _ in range(iterations):
+            result = quote(lines)
+        self.report("in-memory", time.perf_counter() - started, iterations)
+
+        # The benchmark catalogue and cart only live inside this transaction.
+        with transaction.atomic():
+            category = ProductCategory.objects.create(name="benchmark-pricing")
+            products = Product.objects.bulk_create(
+                Product(name=f"benchmark-pricing-{i}", description="", price=price, category=category, stock=0)
+                for i, (price, _) in enumerate(lines)
+            )
+            user = User.objects.create_user(email="benchmark-pricing@example.com", username="benchmark-pricing", password=None)
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.bulk_create(
+                CartItem(cart=cart, product=product, quantity=quantity) for product, (_, quantity) in zip(products, lines)
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                for _ in range(iterations):
+                    assert quote_cart(cart) == result
+                elapsed = time.perf_counter() - started
+            self.report("database", elapsed, iterations, len(queries))
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"{result.item_count} items, subtotal {result.subtotal}, delivery {result.delivery_charge},"
+            f" {result.free_cases} free cases"
+        )
@@ -0,0 +1,60 @@
+import random
+import time
+
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from product.models import Store
+
+
+class Command(BaseCommand):
+    help = "Measure nearest-store lookups over synthetic stores, KNN index ordering against sorting by distance."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stores", type=int, default=50000, help="Synthetic stores to create.")
+        parser.add_argument("--queries", type=int, default=200, help="Lookups per measurement.")
+        parser.add_argument("-k", type=int, default=5, help="Stores returned per lookup.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        k, queries = options["k"], options["queries"]
+
+        def random_point():
+            # Roughly the continental US.
+            return Point(rng.uniform(-124, -67), rng.uniform(25, 49), srid=4326)
+
+        points = [random_point() for _ in range(queries)]
+
+        # The synthetic stores only live inside this transaction.
+        with transaction.atomic():
+            Store.objects.bulk_create(
+                (
+                    Store(name=f"benchmark-store-{i}", address="", link="https://example.com", location=random_point())
+                    for i in range(options["stores"])
+                ),
+                batch_size=5000,
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(Store._meta.db_table)}")
+
+            strategies = {
+                "knn": lambda point: Store.objects.nearest(point, k),
+                "sort": lambda point: Store.objects.filter(location__isnull=False)
+                .annotate(distance=Distance("location", point))
+                .order_by("distance")[:k],
+            }
+            results = {}
+            for name, lookup in strategies.items():
+                started = time.perf_counter()
+                results[name] = [[store.id for store in lookup(point)] for point in points]
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{name:<5} {elapsed / queries * 1e3:8.3f} ms/lookup")
+
+            mismatched = sum(1 for knn, sort in zip(results["knn"], results["sort"]) if knn != sort)
+            self.stdout.write(f"{mismatched} of {queries} lookups ordered differently")
+            self.stdout.write(Store.objects.nearest(points[0], k).explain(analyze=True))
+
+            transaction.set_rollback(True)
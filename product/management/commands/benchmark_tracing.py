@@ -0,0 +1,84 @@
+import io
+import statistics
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import sentry_sdk
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from main import tracing
+
+
+def duration(item):
+    # Events carry ISO 8601 timestamps.
+    return (datetime.fromisoformat(item["timestamp"]) - datetime.fromisoformat(item["start_timestamp"])).total_seconds()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what tracing a route costs, by requesting it through the WSGI application with Sentry off, with "
+        "every request sampled out and with every request traced into memory, and break the traced time down by "
+        "span operation."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/v1/products/", help="GET path to request.")
+        parser.add_argument("--requests", type=int, default=300, help="Requests per measurement.")
+        parser.add_argument("--warmup", type=int, default=20, help="Requests before measuring.")
+
+    def handle(self, *args, **options):
+        if sentry_sdk.get_client().is_active():
+            raise CommandError("Sentry is already initialised, unset SENTRY_DSN and SENTRY_CAPTURE_LOCALLY.")
+        application = get_wsgi_application()
+        host = next((host.lstrip(".") for host in settings.ALLOWED_HOSTS if host != "*"), "localhost")
+
+        def request():
+            environ = {
+                "REQUEST_METHOD": "GET", "PATH_INFO": options["path"], "QUERY_STRING": "", "SERVER_NAME": host,
+                "SERVER_PORT": "80", "HTTP_HOST": host, "wsgi.input": io.BytesIO(), "wsgi.errors": sys.stderr,
+                "wsgi.url_scheme": "http",
+            }
+            status = []
+            started = time.perf_counter()
+            body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+            b"".join(body)
+            body.close()
+            elapsed = time.perf_counter() - started
+            if not status[0].startswith("200"):
+                raise CommandError(f"GET {options['path']} answered {status[0]}")
+            return elapsed
+
+        def measure():
+            for _ in range(options["warmup"]):
+                request()
+            return sorted(request() for _ in range(options["requests"]))
+
+        timings = {"untraced": measure()}
+        # Sampled out: what every request not picked by the sample rate pays.
+        for name, rate in (("unsampled", 0.0), ("traced", 1.0)):
+            tracing.init(dsn=None, environment="benchmark", default_rate=rate, route_rates={}, capture_locally=True)
+            timings[name] = measure()
+        transport = sentry_sdk.get_client().transport
+
+        untraced = statistics.median(timings["untraced"])
+        for name, values in timings.items():
+            median = statistics.median(values)
+            self.stdout.write(
+                f"{name:<10} median {median * 1e3:7.2f} ms  p95 {values[int(len(values) * 0.95)] * 1e3:7.2f} ms"
+                f"  {median / untraced - 1:+7.1%}"
+            )
+
+        transactions = transport.transactions()[options["warmup"]:]
+        by_op = defaultdict(float)
+        for event in transactions:
+            for span in event["spans"]:
+                by_op[span["op"]] += duration(span)
+        total = sum(duration(event) for event in transactions)
+        # Spans nest (queries run while serializing), so the shares overlap.
+        self.stdout.write(f"\n{len(transactions)} transactions, {total / len(transactions) * 1e3:.2f} ms each")
+        for op, seconds in sorted(by_op.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {op:<24} {seconds / len(transactions) * 1e3:7.2f} ms {seconds / total:6.1%}")
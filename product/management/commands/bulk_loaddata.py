@@ -0,0 +1,69 @@
+from django.core.management.base import CommandError
+from django.core.management.commands import loaddata
+from django.db import router
+
+from main.bulkload import BulkWriter
+
+
+class Command(loaddata.Command):
+    help = (
+        "Install fixtures like loaddata, but with one COPY or INSERT per table and batch instead of a save() "
+        "per object, and without signals. Objects are only ever inserted: their keys must not exist yet."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument("--batch-size", type=int, default=5000, help="Objects written per statement.")
+
+    def handle(self, *fixture_labels, **options):
+        self.batch_size = options["batch_size"]
+        self.writer = BulkWriter(options["database"])
+        self.pending = {}
+        super().handle(*fixture_labels, **options)
+        if self.verbosity >= 1:
+            for line in self.writer.report():
+                self.stdout.write(line)
+
+    def save_obj(self, obj):
+        model = type(obj.object)
+        if model._meta.app_config in self.excluded_apps or model in self.excluded_models:
+            return False
+        if not router.allow_migrate_model(self.using, model):
+            return False
+        if obj.deferred_fields:
+            raise CommandError(f"{model._meta.label} has forward references by natural key, load it with loaddata.")
+
+        if obj.object.pk is None:
+            obj.object.pk = self.writer.next_id(model)
+        self.queue(model, obj.object)
+        for name, targets in (obj.m2m_data or {}).items():
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            if not through._meta.auto_created:
+                continue
+            for target in targets:
+                self.queue(
+                    through,
+                    through(
+                        pk=self.writer.next_id(through),
+                        **{f"{field.m2m_field_name()}_id": obj.object.pk, f"{field.m2m_reverse_field_name()}_id": target},
+                    ),
+                )
+        return True
+
+    def queue(self, model, instance):
+        self.models.add(model)
+        batch = self.pending.setdefault(model, [])
+        batch.append(instance)
+        if len(batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # Models are written in the order they were first seen, so m2m rows follow the rows they join.
+        for model, batch in self.pending.items():
+            self.writer.write(model, batch)
+            batch.clear()
+
+    def load_label(self, fixture_label):
+        super().load_label(fixture_label)
+        self.flush()
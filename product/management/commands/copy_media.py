@@ -0,0 +1,76 @@
+import posixpath
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.management.base import BaseCommand, CommandError
+
+
+def walk(storage, path=""):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from walk(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the media files of a local directory (assets/media by default) to the media storage, e.g. an S3 "
+        "bucket after switching DJANGO_MEDIA_STORAGE, with several uploads in flight. Names are kept as they are."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=settings.MEDIA_ROOT, help="Directory to copy from.")
+        parser.add_argument("--storage", default="default", help="Alias in STORAGES to copy to.")
+        parser.add_argument("--workers", type=int, default=16, help="Files copied at the same time.")
+        parser.add_argument("--overwrite", action="store_true", help="Also copy files the storage already has.")
+
+    def handle(self, *args, **options):
+        self.source = FileSystemStorage(location=options["source"])
+        self.target = storages[options["storage"]]
+        self.overwrite = options["overwrite"]
+        if not self.source.exists(""):
+            raise CommandError(f"{options['source']} doesn't exist.")
+
+        copied = skipped = size = 0
+        failed = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"], thread_name_prefix="copy_media") as executor:
+            futures = {executor.submit(self.copy, name): name for name in walk(self.source)}
+            for future in as_completed(futures):
+                try:
+                    written = future.result()
+                except Exception as exc:
+                    failed.append((futures[future], exc))
+                    continue
+                if written is None:
+                    skipped += 1
+                else:
+                    copied += 1
+                    size += written
+        seconds = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{copied} files ({size / 2**20:.1f} MiB) copied, {skipped} already there, in {seconds:.1f}s "
+            f"({copied / seconds if seconds else 0:.0f} files/s)"
+        )
+        for name, exc in failed:
+            self.stderr.write(f"{name}: {exc}")
+        if failed:
+            raise CommandError(f"{len(failed)} files weren't copied.")
+
+    def copy(self, name):
+        """
+        Copy one file under the same name and return its size, or None if the target already has it.
+        """
+        if self.target.exists(name):
+            if not self.overwrite:
+                return None
+            self.target.delete(name)
+        with self.source.open(name, "rb") as file:
+            saved = self.target.save(name, file)
+        if saved != name:
+            raise CommandError(f"stored as {saved}, the name was taken meanwhile")
+        return self.source.size(name)
@@ -0,0 +1,87 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from product.models import Order
+from product.webhooks import SIGNATURE_HEADER, TIMESTAMP_HEADER, sign
+
+
+class Command(BaseCommand):
+    help = (
+        "Act as the payment gateway: send a burst of signed webhooks for unpaid orders"
+        " (pending then succeeded, plus redeliveries) and report the ingest latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url", default="http://localhost:8000/api/v1/payment-webhook/", help="The webhook endpoint to call."
+        )
+        parser.add_argument("--orders", type=int, default=100, help="Unpaid orders to send payments for.")
+        parser.add_argument("--concurrency", type=int, default=20, help="Deliveries in flight at once.")
+        parser.add_argument("--redeliveries", type=int, default=1, help="Extra deliveries of every event.")
+        parser.add_argument("--payment-method", default="Credit Card")
+
+    def handle(self, *args, **options):
+        if not settings.PAYMENT_WEBHOOK_SECRET:
+            raise CommandError("Set DJANGO_PAYMENT_WEBHOOK_SECRET to the secret the server verifies with.")
+
+        orders = Order.objects.filter(payment__isnull=True).values_list("id", "total_price")[: options["orders"]]
+        bodies = []
+        for order_id, total_price in orders:
+            data = {
+                "order": order_id,
+                "payment_method": options["payment_method"],
+                "transaction_id": f"fake_{uuid.uuid4().hex}",
+                "amount": str(total_price),
+            }
+            for event_type in ("payment.pending", "payment.succeeded"):
+                body = json.dumps({"id": f"evt_{uuid.uuid4().hex}", "type": event_type, "data": data}).encode()
+                bodies.extend([body] * (1 + options["redeliveries"]))
+        if not bodies:
+            raise CommandError("There are no unpaid orders to pay for.")
+
+        def deliver(body):
+            timestamp = int(time.time())
+            request = urllib.request.Request(
+                options["url"],
+                data=body,
+                method="POST",
+                headers={
+                    "Content-Type": "application/json",
+                    TIMESTAMP_HEADER: str(timestamp),
+                    SIGNATURE_HEADER: sign(body, timestamp),
+                },
+            )
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    status = response.status
+            except urllib.error.HTTPError as exc:
+                status = exc.code
+            return status, time.perf_counter() - started
+
+        # Deliveries are sent in order, so the pending event of a payment goes out before its success.
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(deliver, bodies))
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(latency * 1000 for _, latency in results)
+        failed = sum(1 for status, _ in results if status != 200)
+        self.stdout.write(
+            f"{len(results)} deliveries for {len(orders)} orders in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s),"
+            f" {failed} failed"
+        )
+        self.stdout.write(
+            f"latency ms: p50 {statistics.median(latencies):.1f}"
+            f" p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f}"
+            f" p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f}"
+            f" max {latencies[-1]:.1f}"
+        )
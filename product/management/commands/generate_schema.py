@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.schema import generate
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema served at /api-docs/ into API_SCHEMA_FILE."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only fail if the file is out of date.")
+
+    def handle(self, *args, **options):
+        path = settings.API_SCHEMA_FILE
+        schema = generate()
+        current = path.read_bytes() if path.exists() else None
+        if options["check"]:
+            if schema != current:
+                raise CommandError(f"{path} is out of date, run manage.py generate_schema")
+            return
+        if schema == current:
+            self.stdout.write(f"{path} is up to date")
+            return
+        path.write_bytes(schema)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {path}"))
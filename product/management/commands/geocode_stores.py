@@ -0,0 +1,77 @@
+import csv
+import json
+import re
+from pathlib import Path
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+
+from product.models import Store
+
+FIXTURES = Path(__file__).resolve().parents[2] / "fixtures"
+ZIP_RE = re.compile(r"\b(\d{5})(?:-\d{4})?\b")
+
+
+def load_centroids(path):
+    with open(path, newline="") as f:
+        return {row["zip"]: Point(float(row["longitude"]), float(row["latitude"]), srid=4326) for row in csv.DictReader(f)}
+
+
+def locate(address, centroids):
+    # The ZIP comes last, after the street number which can also be five digits.
+    zips = ZIP_RE.findall(address)
+    return centroids.get(zips[-1]) if zips else None
+
+
+class Command(BaseCommand):
+    help = "Set store locations from the ZIP code in their address, using an offline table of ZIP centroids."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--centroids", default=FIXTURES / "zip_centroids.csv", help="CSV of zip, latitude, longitude."
+        )
+        parser.add_argument(
+            "--fixture", help="Geocode the stores of this fixture file in place instead of those in the database."
+        )
+        parser.add_argument("--overwrite", action="store_true", help="Also relocate stores that have a location.")
+
+    def handle(self, *args, **options):
+        centroids = load_centroids(options["centroids"])
+        if options["fixture"]:
+            located, missing = self.geocode_fixture(Path(options["fixture"]), centroids, options["overwrite"])
+        else:
+            located, missing = self.geocode_database(centroids, options["overwrite"])
+        self.stdout.write(f"{located} stores located")
+        for name, address in missing:
+            self.stderr.write(f"No centroid for {name!r}: {address}")
+
+    def geocode_database(self, centroids, overwrite):
+        stores = Store.objects.all() if overwrite else Store.objects.filter(location__isnull=True)
+        located, missing = [], []
+        for store in stores:
+            store.location = locate(store.address, centroids)
+            if store.location is None:
+                missing.append((store.name, store.address))
+            else:
+                located.append(store)
+        Store.objects.bulk_update(located, ["location"], batch_size=1000)
+        return len(located), missing
+
+    def geocode_fixture(self, path, centroids, overwrite):
+        try:
+            objects = json.loads(path.read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+        located, missing = 0, []
+        for obj in objects:
+            fields = obj["fields"]
+            if obj["model"] != "product.store" or (fields.get("location") and not overwrite):
+                continue
+            point = locate(fields["address"], centroids)
+            if point is None:
+                missing.append((fields["name"], fields["address"]))
+                continue
+            fields["location"] = point.ewkt
+            located += 1
+        path.write_text(json.dumps(objects, indent=2, ensure_ascii=False) + "\n")
+        return located, missing
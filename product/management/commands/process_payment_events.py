@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from product.webhooks import PROCESS_BATCH_SIZE, process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Apply pending payment webhook events to payments, in batches and in arrival order."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PROCESS_BATCH_SIZE, help="Events applied per transaction.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds to wait when the queue is drained.")
+        parser.add_argument("--once", action="store_true", help="Drain the queue once and exit instead of polling.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        total = 0
+        try:
+            while True:
+                close_old_connections()
+                started = time.perf_counter()
+                processed = process_pending_events(batch_size)
+                total += processed
+                if processed:
+                    self.stdout.write(f"Processed {processed} events in {time.perf_counter() - started:.3f}s")
+                if processed < batch_size:
+                    if options["once"]:
+                        break
+                    time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} events"))
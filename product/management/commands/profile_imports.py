@@ -0,0 +1,59 @@
+import os
+import re
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+
+
+def run_fresh(script, profile, python_flags=()):
+    """
+    Run ``script`` in a new interpreter with these settings and the given worker profile.
+    """
+    env = {**os.environ, "DJANGO_WORKER_PROFILE": profile}
+    result = subprocess.run(
+        [sys.executable, *python_flags, "-c", script], env=env, cwd=settings.BASE_DIR, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise CommandError(f"The {profile} worker failed to start:\n{result.stderr[-2000:]}")
+    return result
+
+
+class Command(BaseCommand):
+    help = "Report what django.setup() spends importing, per module or package, using python -X importtime."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profile", choices=["full", "lean"], help="Worker profile, the current one by default.")
+        parser.add_argument("--urls", action="store_true", help="Also load the URLconf, as the first request does.")
+        parser.add_argument("--by", choices=["module", "package"], default="package")
+        parser.add_argument("--top", type=int, default=30)
+
+    def handle(self, *args, **options):
+        profile = options["profile"] or settings.WORKER_PROFILE
+        script = "import django; django.setup()"
+        if options["urls"]:
+            script += "; from django.urls import get_resolver; get_resolver().url_patterns"
+        result = run_fresh(script, profile, ["-X", "importtime"])
+
+        own, cumulative = Counter(), {}
+        for line in result.stderr.splitlines():
+            match = IMPORT_TIME.match(line)
+            if not match:
+                continue
+            self_us, cumulative_us, module = int(match[1]), int(match[2]), match[3]
+            key = module if options["by"] == "module" else module.split(".")[0]
+            own[key] += self_us
+            cumulative[module] = cumulative_us
+
+        total = sum(own.values())
+        self.stdout.write(f"{profile} worker: {len(cumulative)} modules imported in {total / 1e3:.1f} ms")
+        self.stdout.write(f"{'self ms':>9} {'share':>6}  " + ("cumulative ms  " if options["by"] == "module" else ""))
+        for key, self_us in own.most_common(options["top"]):
+            line = f"{self_us / 1e3:9.1f} {self_us / total:6.1%}  "
+            if options["by"] == "module":
+                line += f"{cumulative[key] / 1e3:13.1f}  "
+            self.stdout.write(line + key)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from product.inventory import release, stale_reservations
+
+
+class Command(BaseCommand):
+    help = "Put back the stock held by reservations of carts abandoned at checkout."
+
+    def handle(self, *args, **options):
+        released = release(stale_reservations())
+        self.stdout.write(self.style.SUCCESS(f"Released {released} stale reservations"))
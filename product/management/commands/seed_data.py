@@ -0,0 +1,417 @@
+import random
+import time
+from datetime import datetime, time as datetime_time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from main.bulkload import BulkWriter
+from product.models import (
+    Cart,
+    CartItem,
+    Order,
+    OrderTracking,
+    Payment,
+    PaymentEvent,
+    Product,
+    ProductCategory,
+    Review,
+    ReviewPhoto,
+    Shipping,
+    StockReservation,
+    Store,
+    Wishlist,
+)
+from product.pricing import quote
+from user.models import BeerClubMember, ContactMessage, Profile, Recovery, User
+
+FIRST_NAMES = ["James", "Maria", "Robert", "Linda", "Michael", "Priya", "David", "Sofia", "Daniel", "Aisha", "Kenji", "Emma"]
+LAST_NAMES = ["Smith", "Garcia", "Johnson", "Nguyen", "Brown", "Patel", "Miller", "Lopez", "Wilson", "Kim", "Moore", "Khan"]
+STYLES = ["Lager", "Pilsner", "IPA", "Stout", "Porter", "Wheat", "Sour", "Amber", "Saison", "Bock", "Pale Ale", "Cider"]
+ADJECTIVES = ["Golden", "Hazy", "Imperial", "Session", "Smoked", "Barrel Aged", "Dry Hopped", "Crisp", "Dark", "Citrus"]
+CITIES = [("Dallas", "75201"), ("Austin", "78702"), ("Houston", "77002"), ("Irving", "75062"), ("Euless", "76039")]
+PAYMENT_METHODS = ["card", "paypal", "ach"]
+# Orders advance through these statuses; each one reached gets a tracking entry.
+TRACKING_STATUSES = [OrderTracking.Status.PENDING, OrderTracking.Status.SHIPPED, OrderTracking.Status.DELIVERED]
+PAYMENT_EVENT_TYPES = {
+    Payment.PaymentStatus.PENDING: "payment.pending",
+    Payment.PaymentStatus.COMPLETED: "payment.succeeded",
+    Payment.PaymentStatus.FAILED: "payment.failed",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic catalog, customers and order history for performance testing. "
+        "The same --seed and --until give the same data. Rows are written with COPY on PostgreSQL "
+        "(batched INSERTs elsewhere), without save() or signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=1000)
+        parser.add_argument("--orders", type=int, default=10000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--categories", type=int, default=20)
+        parser.add_argument("--stores", type=int, default=100)
+        parser.add_argument("--days", type=int, default=365, help="Days of history the orders are spread over.")
+        parser.add_argument("--until", type=parse_date, help="Last day of the history, today by default.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10000, help="Rows written per statement.")
+        parser.add_argument("--method", choices=["copy", "insert"], help="Defaults to copy on PostgreSQL.")
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        if options["products"] < 1 or options["users"] < 1 or options["categories"] < 1:
+            raise CommandError("At least one product, user and category is needed.")
+        self.writer = BulkWriter(options["database"], options["method"])
+        if self.writer.method == "copy" and self.writer.connection.vendor != "postgresql":
+            raise CommandError("COPY needs a PostgreSQL database.")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.using = options["database"]
+        until = options["until"] or datetime.now(dt_timezone.utc).date()
+        self.until = datetime.combine(until, datetime_time.max, tzinfo=dt_timezone.utc)
+        self.span = timedelta(days=options["days"]).total_seconds()
+
+        started = time.perf_counter()
+        category_ids = self.write(ProductCategory, self.categories(options["categories"]))
+        products = list(self.products(options["products"], category_ids))
+        self.product_ids = [product.pk for product in products]
+        self.prices = {product.pk: product.price for product in products}
+        self.user_ids = user_ids = self.write(User, self.users(options["users"]))
+
+        # Open carts hold reservations, so their stock comes off the products before those are written.
+        open_carts, open_items, reservations = self.open_carts(len(user_ids) // 5, products)
+        self.write(Product, products)
+        self.write(Cart, open_carts)
+        self.write(CartItem, open_items)
+        self.write(StockReservation, reservations)
+
+        self.write(Profile, self.profiles(user_ids))
+        self.write(Store, self.stores(options["stores"]))
+        self.write_reviews(options["products"] * 2)
+        self.write_wishlists(len(user_ids) // 2)
+        self.write(Recovery, self.recoveries(len(user_ids) // 100))
+        self.write(BeerClubMember, self.beer_club_members(len(user_ids) // 20))
+        self.write(ContactMessage, self.contact_messages(len(user_ids) // 20))
+        self.write_orders(options["orders"])
+
+        with transaction.atomic(using=self.using):
+            self.writer.reset_sequences()
+        elapsed = time.perf_counter() - started
+
+        for line in self.writer.report():
+            self.stdout.write(line)
+        total = sum(rows for rows, _ in self.writer.stats.values())
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded {total} rows in {elapsed:.1f}s, {total / elapsed if elapsed else 0:.0f} rows/s")
+        )
+
+    def write(self, model, instances):
+        """
+        Write the instances in batches, each in its own transaction, and return their ids.
+        """
+        ids, batch = [], []
+        for instance in instances:
+            batch.append(instance)
+            if len(batch) >= self.batch_size:
+                ids.extend(self.flush({model: batch}))
+                batch = []
+        ids.extend(self.flush({model: batch}))
+        return ids
+
+    def flush(self, batches):
+        with transaction.atomic(using=self.using):
+            for model, batch in batches.items():
+                self.writer.write(model, batch)
+        return [instance.pk for batch in batches.values() for instance in batch]
+
+    def moment(self, after=None):
+        if after is None:
+            return self.until - timedelta(seconds=self.rng.uniform(0, self.span))
+        return min(after + timedelta(hours=self.rng.uniform(1, 72)), self.until)
+
+    def person(self):
+        return self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+
+    def phone(self):
+        return f"214555{self.rng.randrange(10000):04d}"
+
+    def new(self, model, **fields):
+        return model(pk=self.writer.next_id(model), **fields)
+
+    def categories(self, count):
+        for _ in range(count):
+            category = self.new(ProductCategory, description="Synthetic category.", image=None)
+            category.name = f"{self.rng.choice(STYLES)} {category.pk}"
+            yield category
+
+    def products(self, count, category_ids):
+        for _ in range(count):
+            stock = 0 if self.rng.random() < 0.05 else self.rng.randint(1, 500)
+            yield self.new(
+                Product,
+                name=f"{self.rng.choice(ADJECTIVES)} {self.rng.choice(STYLES)}",
+                description="<p>Synthetic product.</p>",
+                price=Decimal(self.rng.randint(300, 6000)) / 100,
+                category_id=self.rng.choice(category_ids),
+                stock=stock,
+                stock_status=stock > 0,
+                image="products/seed.png",
+                featured=self.rng.random() < 0.05,
+            )
+
+    def users(self, count):
+        for _ in range(count):
+            first_name, last_name = self.person()
+            user = self.new(
+                User,
+                password=UNUSABLE_PASSWORD_PREFIX,
+                first_name=first_name,
+                last_name=last_name,
+                full_name=f"{first_name} {last_name}",
+                is_verified=self.rng.random() < 0.8,
+                date_joined=self.moment(),
+            )
+            user.username = user.email = f"seed-user-{user.pk}@example.com"
+            yield user
+
+    def profiles(self, user_ids):
+        for user_id in user_ids:
+            city, zip_code = self.rng.choice(CITIES)
+            now = self.moment()
+            yield self.new(
+                Profile,
+                user_id=user_id,
+                business_name=f"{self.rng.choice(LAST_NAMES)} {self.rng.choice(['Liquor', 'Market', 'Grill', 'Bar'])}",
+                business_address=f"{self.rng.randint(100, 9999)} Main St",
+                business_city=city,
+                business_state="TX",
+                business_zip=zip_code,
+                business_phone=self.phone(),
+                license_number=f"TX-{self.rng.randrange(10**8):08d}",
+                created_at=now,
+                updated_at=now,
+            )
+
+    def stores(self, count):
+        for _ in range(count):
+            city, zip_code = self.rng.choice(CITIES)
+            store = self.new(
+                Store,
+                address=f"{self.rng.randint(100, 9999)} Main St, {city}, TX {zip_code}, United States",
+                link="https://maps.example.com/",
+                # Somewhere in Texas.
+                location=Point(self.rng.uniform(-104, -94), self.rng.uniform(26, 36), srid=4326),
+            )
+            store.name = f"Store {store.pk}"
+            yield store
+
+    def cart_lines(self, cart):
+        items = []
+        for product_id in self.rng.sample(self.product_ids, min(len(self.product_ids), self.rng.randint(1, 5))):
+            quantity = self.rng.randint(1, 6)
+            items.append(self.new(CartItem, cart_id=cart.pk, product_id=product_id, quantity=quantity))
+        return items
+
+    def open_carts(self, count, products):
+        by_id = {product.pk: product for product in products}
+        carts, items, reservations = [], [], []
+        for _ in range(count):
+            created_at = self.moment()
+            cart = self.new(Cart, user_id=self.rng.choice(self.user_ids), created_at=created_at, is_order_created=False)
+            lines = self.cart_lines(cart)
+            cart.free_cases = quote((self.prices[item.product_id], item.quantity) for item in lines).free_cases
+            carts.append(cart)
+            items.extend(lines)
+            # About a third went through checkout and still hold stock.
+            if self.rng.random() < 0.3 and all(by_id[item.product_id].stock >= item.quantity for item in lines):
+                for item in lines:
+                    product = by_id[item.product_id]
+                    product.stock -= item.quantity
+                    product.stock_status = product.stock > 0
+                    reservations.append(
+                        self.new(
+                            StockReservation,
+                            cart_id=cart.pk,
+                            product_id=item.product_id,
+                            quantity=item.quantity,
+                            created_at=created_at,
+                        )
+                    )
+        return carts, items, reservations
+
+    def write_reviews(self, count):
+        reviews, photos, links = [], [], []
+        through = Review.photos.through
+        for _ in range(count):
+            first_name, last_name = self.person()
+            created_at = self.moment()
+            review = self.new(
+                Review,
+                product_id=self.rng.choice(self.product_ids),
+                rating=self.rng.choices(range(1, 6), weights=[1, 1, 3, 6, 8])[0],
+                review_text="Synthetic review.",
+                name=f"{first_name} {last_name}",
+                email=f"{first_name.lower()}.{last_name.lower()}@example.com",
+                status=Review.Status.APPROVED if self.rng.random() < 0.9 else Review.Status.PENDING,
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            reviews.append(review)
+            if self.rng.random() < 0.1:
+                photo = self.new(ReviewPhoto, image="review_photos/seed.png", uploaded_at=created_at)
+                photos.append(photo)
+                links.append(self.new(through, review_id=review.pk, reviewphoto_id=photo.pk))
+            if len(reviews) >= self.batch_size:
+                self.flush({Review: reviews, ReviewPhoto: photos, through: links})
+                reviews, photos, links = [], [], []
+        self.flush({Review: reviews, ReviewPhoto: photos, through: links})
+
+    def write_wishlists(self, count):
+        through = Wishlist.products.through
+        wishlists, links = [], []
+        for user_id in self.rng.sample(self.user_ids, count):
+            wishlist = self.new(Wishlist, user_id=user_id, session_key=None)
+            wishlists.append(wishlist)
+            for product_id in self.rng.sample(self.product_ids, min(len(self.product_ids), self.rng.randint(1, 8))):
+                links.append(self.new(through, wishlist_id=wishlist.pk, product_id=product_id))
+            if len(wishlists) >= self.batch_size:
+                self.flush({Wishlist: wishlists, through: links})
+                wishlists, links = [], []
+        self.flush({Wishlist: wishlists, through: links})
+
+    def recoveries(self, count):
+        for user_id in self.rng.sample(self.user_ids, count):
+            recovery = self.new(Recovery, user_id=user_id, created_at=self.moment())
+            recovery.token_digest = Recovery.digest(f"seed-recovery-{recovery.pk}")
+            yield recovery
+
+    def beer_club_members(self, count):
+        for _ in range(count):
+            first_name, last_name = self.person()
+            member = self.new(
+                BeerClubMember,
+                first_name=first_name,
+                last_name=last_name,
+                phone=self.phone(),
+                address=None,
+                message="Sign me up.",
+                created_at=self.moment(),
+            )
+            member.email = f"seed-member-{member.pk}@example.com"
+            member.content_hash = member.compute_content_hash()
+            member.notified_at = member.created_at
+            yield member
+
+    def contact_messages(self, count):
+        for _ in range(count):
+            first_name, last_name = self.person()
+            message = self.new(
+                ContactMessage,
+                name=f"{first_name} {last_name}",
+                phone=self.phone(),
+                created_at=self.moment(),
+            )
+            message.email = f"seed-contact-{message.pk}@example.com"
+            message.message = f"Synthetic message {message.pk}."
+            message.content_hash = message.compute_content_hash()
+            message.notified_at = message.created_at
+            yield message
+
+    def write_orders(self, count):
+        batches = {model: [] for model in (Cart, CartItem, Shipping, Order, OrderTracking, Payment, PaymentEvent)}
+        for _ in range(count):
+            self.order(batches)
+            if len(batches[Order]) >= self.batch_size:
+                self.flush(batches)
+                batches = {model: [] for model in batches}
+        self.flush(batches)
+
+    def order(self, batches):
+        created_at = self.moment()
+        user_id = self.rng.choice(self.user_ids)
+        cart = self.new(Cart, user_id=user_id, session_key=None, created_at=created_at, is_order_created=True)
+        items = self.cart_lines(cart)
+        pricing = quote((self.prices[item.product_id], item.quantity) for item in items)
+        cart.free_cases = pricing.free_cases
+
+        first_name, last_name = self.person()
+        city, zip_code = self.rng.choice(CITIES)
+        shipping = self.new(
+            Shipping,
+            cart_id=cart.pk,
+            first_name=first_name,
+            last_name=last_name,
+            email=f"seed-user-{user_id}@example.com",
+            phone=self.phone(),
+            address=f"{self.rng.randint(100, 9999)} Main St",
+            city=city,
+            state="TX",
+            postal_code=zip_code,
+            country="United States",
+            created_at=created_at,
+        )
+
+        order = self.new(
+            Order,
+            cart_id=cart.pk,
+            shipping_id=shipping.pk,
+            total_price=pricing.total,
+            delivery_charge=pricing.delivery_charge,
+            created_at=created_at,
+        )
+        tracking, updated_at = [], created_at
+        for status in TRACKING_STATUSES[: self.rng.randint(1, len(TRACKING_STATUSES))]:
+            updated_at = self.moment(after=updated_at) if tracking else created_at
+            tracking.append(
+                self.new(OrderTracking, order_id=order.pk, status=status, updated_at=updated_at, updated_by="seed")
+            )
+        order.order_status = tracking[-1].status
+        order.latest_tracking_id = tracking[-1].pk
+        order.status_updated_at = order.updated_at = updated_at
+
+        batches[Cart].append(cart)
+        batches[CartItem].extend(items)
+        batches[Shipping].append(shipping)
+        batches[Order].append(order)
+        batches[OrderTracking].extend(tracking)
+
+        if self.rng.random() < 0.95:
+            payment_status = self.rng.choices(list(PAYMENT_EVENT_TYPES), weights=[2, 95, 3])[0]
+            payment = self.new(
+                Payment,
+                order_id=order.pk,
+                payment_status=payment_status,
+                payment_method=self.rng.choice(PAYMENT_METHODS),
+                payment_date=created_at,
+                amount=pricing.total,
+            )
+            payment.transaction_id = f"seed-{payment.pk}"
+            event = self.new(
+                PaymentEvent,
+                event_type=PAYMENT_EVENT_TYPES[payment_status],
+                payment_method=payment.payment_method,
+                transaction_id=payment.transaction_id,
+                received_at=created_at,
+                processed_at=created_at,
+                error="",
+            )
+            event.event_id = f"seed-event-{event.pk}"
+            event.payload = {
+                "id": event.event_id,
+                "type": event.event_type,
+                "data": {
+                    "order": order.pk,
+                    "amount": str(payment.amount),
+                    "payment_method": payment.payment_method,
+                    "transaction_id": payment.transaction_id,
+                },
+            }
+            batches[Payment].append(payment)
+            batches[PaymentEvent].append(event)
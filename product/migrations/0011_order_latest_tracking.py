@@ -0,0 +1,44 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:46
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_latest_tracking(apps, schema_editor):
+    Order = apps.get_model("product", "Order")
+    OrderTracking = apps.get_model("product", "OrderTracking")
+    latest = OrderTracking.objects.filter(order=OuterRef("pk")).order_by("-updated_at", "-id")
+    Order.objects.filter(pk__in=OrderTracking.objects.values("order_id")).update(
+        latest_tracking=Subquery(latest.values("pk")[:1]),
+        status_updated_at=Subquery(latest.values("updated_at")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0010_order_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ordertracking',
+            options={'ordering': ['-updated_at', '-id']},
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='latest_tracking',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='product.ordertracking', verbose_name='Latest Tracking'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='status_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Status Updated At'),
+        ),
+        migrations.AddIndex(
+            model_name='ordertracking',
+            index=models.Index(fields=['order', '-updated_at', '-id'], name='ordertracking_order_latest_idx'),
+        ),
+        migrations.RunPython(backfill_latest_tracking, migrations.RunPython.noop),
+    ]
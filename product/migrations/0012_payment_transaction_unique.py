@@ -0,0 +1,33 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_payments(apps, schema_editor):
+    # Gateway retries recorded the same transaction more than once, keep the first row.
+    Payment = apps.get_model("product", "Payment")
+    duplicates = (
+        Payment.objects.values("payment_method", "transaction_id")
+        .annotate(first_id=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        Payment.objects.filter(
+            payment_method=duplicate["payment_method"], transaction_id=duplicate["transaction_id"]
+        ).exclude(id=duplicate["first_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0011_order_latest_tracking'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_payments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(fields=('payment_method', 'transaction_id'), name='payment_method_transaction_unique'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0012_payment_transaction_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=255, unique=True, verbose_name='Event ID')),
+                ('event_type', models.CharField(max_length=100, verbose_name='Event Type')),
+                ('payment_method', models.CharField(max_length=50, verbose_name='Payment Method')),
+                ('transaction_id', models.CharField(max_length=100, verbose_name='Transaction ID')),
+                ('payload', models.JSONField(verbose_name='Payload')),
+                ('received_at', models.DateTimeField(auto_now_add=True, verbose_name='Received At')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Processed At')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='paymentevent_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:55
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def derive_stock_status(apps, schema_editor):
+    # stock_status was set by hand until now. A product marked out of stock stays so; one marked
+    # in stock without a count goes out of stock, rather than selling an invented quantity, until
+    # staff enter its real stock.
+    Product = apps.get_model("product", "Product")
+    Product.objects.filter(stock_status=False).exclude(stock=0).update(stock=0)
+    Product.objects.filter(stock__lt=0).update(stock=0)
+    Product.objects.update(stock_status=models.Q(stock__gt=0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0013_paymentevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Quantity')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Created At')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='stock_status',
+            field=models.BooleanField(default=True, editable=False, help_text='Indicates if the product is available in stock, kept in sync with the stock quantity.', verbose_name='In Stock'),
+        ),
+        migrations.RunPython(derive_stock_status, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(check=models.Q(('stock__gte', 0)), name='product_stock_non_negative'),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='cart',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='product.cart', verbose_name='Cart'),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='product.product', verbose_name='Product'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockreservation',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='stockreservation_cart_product_unique'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:56
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    # Fold repeated lines of a product into the cart's first line for it, adding up the quantities.
+    CartItem = apps.get_model("product", "CartItem")
+    duplicates = (
+        CartItem.objects.values("cart_id", "product_id")
+        .annotate(first_id=Min("id"), total=Sum("quantity"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        CartItem.objects.filter(id=duplicate["first_id"]).update(quantity=duplicate["total"])
+        CartItem.objects.filter(cart_id=duplicate["cart_id"], product_id=duplicate["product_id"]).exclude(
+            id=duplicate["first_id"]
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0014_stock_reservation'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'product'), name='cartitem_cart_product_unique'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:58
+
+from django.db import migrations, models
+
+
+def approve_existing_reviews(apps, schema_editor):
+    # Reviews written before moderation were already public.
+    Review = apps.get_model("product", "Review")
+    Review.objects.update(status="approved")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0015_cartitem_unique_product'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected')], default='pending', help_text='The moderation status; only approved reviews are shown on the site.', max_length=10, verbose_name='Status'),
+        ),
+        migrations.RunPython(approve_existing_reviews, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['product', '-created_at'], name='review_approved_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('status', 'approved')), fields=['product', '-rating'], name='review_approved_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.17 on 2026-10-19 06:20
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0016_review_moderation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='store',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, geography=True, null=True, srid=4326),
+        ),
+    ]
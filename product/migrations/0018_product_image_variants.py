@@ -0,0 +1,18 @@
+# Generated by Django 4.2.17 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0017_store_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Storage names of the resized copies of the image, rendered in the background after upload.', verbose_name='Image Variants'),
+        ),
+    ]
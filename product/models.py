@@ -1,10 +1,16 @@
 from typing import Optional
 from decimal import Decimal
 from datetime import datetime
+from functools import cached_property
 from tinymce.models import HTMLField
-from django.db import models
+from django.contrib.gis.db import models as gis_models
+from django.contrib.gis.db.models.functions import Distance, GeometryDistance
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce
 from user.models import User
 
+from .pricing import Quote, quote_cart
+
 
 class ProductCategory(models.Model):
     """
@@ -57,10 +63,14 @@ class Product(models.Model):
     category : str
         The category of the product. Possible values include:
         'adapters', 'data_cables', 'earbuds', 'headphones', 'power_banks', 'speakers'.
+    stock : int
+        The quantity available to sell; stock reserved for checkouts is already taken off.
     stock_status : bool
-        Availability of the product in stock.
+        Availability of the product in stock, derived from ``stock`` on every write.
     image : ImageField
         An image representing the product.
+    image_variants : dict
+        Storage names of the resized copies of ``image`` by size label, filled in after upload.
     featured : bool
         Indicates if the product is featured on the website.
     """
@@ -79,15 +89,30 @@ class Product(models.Model):
     )
     stock: int = models.IntegerField(verbose_name="stock", help_text="Available quantity of the product")
     stock_status: bool = models.BooleanField(
-        default=True, verbose_name="In Stock", help_text="Indicates if the product is available in stock."
+        default=True,
+        editable=False,
+        verbose_name="In Stock",
+        help_text="Indicates if the product is available in stock, kept in sync with the stock quantity.",
     )
     image: Optional[models.ImageField] = models.ImageField(
         upload_to="products/", verbose_name="Product Image", help_text="An image of the product."
     )
+    image_variants: dict = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Image Variants",
+        help_text="Storage names of the resized copies of the image, rendered in the background after upload.",
+    )
     featured: bool = models.BooleanField(
         default=False, verbose_name="Featured Product", help_text="Indicates if the product is featured on the website."
     )
 
+    class Meta:
+        constraints = [
+            models.CheckConstraint(check=models.Q(stock__gte=0), name="product_stock_non_negative"),
+        ]
+
     def __str__(self) -> str:
         """
         Returns
@@ -97,6 +122,21 @@ class Product(models.Model):
         """
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.stock_status = self.stock > 0
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "stock" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "stock_status"}
+        super().save(*args, **kwargs)
+
+
+class ReviewQuerySet(models.QuerySet):
+    def approved(self):
+        """
+        The reviews shown publicly; matches the partial indexes on approved reviews.
+        """
+        return self.filter(status=Review.Status.APPROVED)
+
 
 class Review(models.Model):
     """
@@ -116,12 +156,19 @@ class Review(models.Model):
         The name of the reviewer.
     email : str
         The email address of the reviewer.
+    status : str
+        The moderation status; only approved reviews are served publicly.
     created_at : datetime
         The date and time when the review was created.
     updated_at : datetime
         The date and time when the review was last updated.
     """
 
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        APPROVED = "approved", "Approved"
+        REJECTED = "rejected", "Rejected"
+
     product: "Product" = models.ForeignKey(
         "Product",
         on_delete=models.CASCADE,
@@ -145,10 +192,34 @@ class Review(models.Model):
     created_at: "datetime" = models.DateTimeField(
         auto_now_add=True, verbose_name="Created At", help_text="The date and time when the review was created."
     )
+    status: str = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name="Status",
+        help_text="The moderation status; only approved reviews are shown on the site.",
+    )
     updated_at: "datetime" = models.DateTimeField(
         auto_now=True, verbose_name="Updated At", help_text="The date and time when the review was last updated."
     )
 
+    objects = ReviewQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Public review lists: approved only, newest or best rated first, usually for one product.
+            models.Index(
+                fields=["product", "-created_at"],
+                condition=models.Q(status="approved"),
+                name="review_approved_created_idx",
+            ),
+            models.Index(
+                fields=["product", "-rating"],
+                condition=models.Q(status="approved"),
+                name="review_approved_rating_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return f"Review of {self.product.name} by {self.name}"
 
@@ -220,22 +291,22 @@ class Cart(models.Model):
         else:
             return f"Cart for session {self.session_key}"
 
+    @cached_property
+    def pricing(self) -> Quote:
+        """
+        The cart's subtotal, delivery charge and free cases, computed once per instance.
+        """
+        return quote_cart(self)
+
+    def reset_pricing(self):
+        self.__dict__.pop("pricing", None)
+
     def update_free_cases(self):
         """
-        Updates the free_cases field based on the total quantity of items in the cart:
-          - 25 to 39 total items: 1 free case
-          - 40 to 49 total items: 2 free cases
-          - 50+ total items: 3 free cases
-        """
-        total_quantity = sum(item.quantity for item in self.cartitem_set.all())
-        if total_quantity >= 50:
-            self.free_cases = 3
-        elif total_quantity >= 40:
-            self.free_cases = 2
-        elif total_quantity >= 25:
-            self.free_cases = 1
-        else:
-            self.free_cases = 0
+        Updates the free_cases field from the pricing rules (``PRICING_FREE_CASES``).
+        """
+        self.reset_pricing()
+        self.free_cases = self.pricing.free_cases
         self.save(update_fields=["free_cases"])
 
     def get_total_price(self):
@@ -243,9 +314,9 @@ class Cart(models.Model):
         Calculates the total price of all items in the cart.
 
         Returns:
-            float: The total price of all items in the cart.
+            Decimal: The total price of all items in the cart.
         """
-        return sum(item.get_total_price() for item in self.cartitem_set.all())
+        return self.pricing.subtotal
 
 
 class CartItem(models.Model):
@@ -262,6 +333,11 @@ class CartItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Product")
     quantity = models.PositiveIntegerField(default=1, verbose_name="Quantity")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="cartitem_cart_product_unique"),
+        ]
+
     def __str__(self):
         return f"{self.quantity} x {self.product.name}"
 
@@ -292,6 +368,35 @@ class CartItem(models.Model):
         cart.update_free_cases()
 
 
+class StockReservation(models.Model):
+    """
+    Stock held for a cart between checkout and order placement.
+
+    The reserved quantity is taken off ``Product.stock`` when the reservation is
+    made; placing the order keeps it taken and deletes the reservation, while
+    abandoned carts have it put back by ``release_stale_reservations``.
+
+    Attributes:
+        cart (Cart): The cart the stock is held for.
+        product (Product): The product reserved.
+        quantity (int): The quantity reserved.
+        created_at (datetime): When the stock was reserved.
+    """
+
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name="reservations", verbose_name="Cart")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="reservations", verbose_name="Product")
+    quantity = models.PositiveIntegerField(verbose_name="Quantity")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Created At")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product"], name="stockreservation_cart_product_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} for cart {self.cart_id}"
+
+
 class Shipping(models.Model):
     """
     Represents the shipping information associated with a cart.
@@ -326,6 +431,33 @@ class Shipping(models.Model):
         return f"Shipping for Cart #{self.cart.id} - {self.first_name} {self.last_name}"
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_summary(self):
+        """
+        Annotates item count and subtotal so order lists don't touch cart items row by row.
+        """
+        return self.select_related("shipping").annotate(
+            item_count=Coalesce(models.Sum("cart__cartitem__quantity"), 0),
+            subtotal=Coalesce(
+                models.Sum(
+                    models.F("cart__cartitem__quantity") * models.F("cart__cartitem__product__price"),
+                    output_field=models.DecimalField(max_digits=12, decimal_places=2),
+                ),
+                Decimal("0.00"),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+
+    def with_line_items(self):
+        """
+        Loads everything ``OrderSerializer`` renders: cart, shipping and the cart items
+        with their product and category, in two queries.
+        """
+        return self.select_related("cart", "shipping").prefetch_related(
+            models.Prefetch("cart__cartitem_set", queryset=CartItem.objects.select_related("product__category"))
+        )
+
+
 class Order(models.Model):
     """
     Represents an order associated with a cart and shipping information.
@@ -336,6 +468,8 @@ class Order(models.Model):
         total_price (Decimal): The total price of the order, including delivery charges.
         delivery_charge (Decimal): The delivery charge for the order.
         order_status (str): The status of the order (e.g., Pending, Shipped, Delivered).
+        latest_tracking (OrderTracking): The most recent tracking entry, kept in sync on every tracking insert.
+        status_updated_at (datetime): When the latest tracking entry was recorded.
         created_at (datetime): The date and time the order was created.
         updated_at (datetime): The date and time the order was last updated.
     """
@@ -350,31 +484,53 @@ class Order(models.Model):
         default="Pending",
         verbose_name="Order Status",
     )
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created At")
+    latest_tracking = models.ForeignKey(
+        "OrderTracking",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+        verbose_name="Latest Tracking",
+    )
+    status_updated_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Status Updated At")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Created At")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Updated At")
 
+    objects = OrderQuerySet.as_manager()
+
     def __str__(self):
         return f"Order #{self.id} - Cart #{self.cart.id}"
 
-    def calculate_delivery_charge(self):
+    def status_at(self, when):
         """
-        Calculates the delivery charge based on the total quantity of items in the cart.
-          - 0 to 24 items: 19.99
-          - 25+ items: Free delivery
+        Returns the status the order had at ``when``.
+
+        Answered from the denormalized latest status when possible, otherwise with
+        a single lookup on the (order, updated_at) tracking index.
         """
-        total_quantity = sum(item.quantity for item in self.cart.cartitem_set.all())
+        if when < self.created_at:
+            return None
+        if self.status_updated_at is not None and when >= self.status_updated_at:
+            return self.order_status
+        status = self.tracking.filter(updated_at__lte=when).values_list("status", flat=True).first()
+        return status or OrderTracking.Status.PENDING
 
-        if total_quantity >= 25:
-            self.delivery_charge = 0.00
-        else:
-            self.delivery_charge = 19.99
+    def calculate_delivery_charge(self):
+        """
+        Prices the order from its cart with the pricing rules (``PRICING_DELIVERY_CHARGES``).
+        """
+        pricing = self.cart.pricing
+        self.delivery_charge = pricing.delivery_charge
+        self.total_price = pricing.total
 
     def save(self, *args, **kwargs):
         """
-        Override save to calculate delivery charge before saving the order.
+        Override save to price the order when it is placed. Later saves keep the
+        placed price, even if product prices or rules have changed since.
         """
-        self.calculate_delivery_charge()
-        self.total_price = self.cart.get_total_price() + Decimal(self.delivery_charge)
+        if self._state.adding:
+            self.calculate_delivery_charge()
         super().save(*args, **kwargs)
 
 
@@ -409,9 +565,61 @@ class OrderTracking(models.Model):
     updated_at = models.DateTimeField(auto_now_add=True, verbose_name="Updated At")
     updated_by = models.CharField(max_length=100, verbose_name="Updated By")
 
+    class Meta:
+        ordering = ["-updated_at", "-id"]
+        indexes = [
+            models.Index(fields=["order", "-updated_at", "-id"], name="ordertracking_order_latest_idx"),
+        ]
+
     def __str__(self):
         return f"Order #{self.order.id} Status Update: {self.status} by {self.updated_by}"
 
+    def save(self, *args, **kwargs):
+        """
+        Override save to move the order's status and latest tracking pointer
+        in the same transaction as the insert.
+        """
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Order.objects.filter(pk=self.order_id).update(
+                    order_status=self.status, latest_tracking=self, status_updated_at=self.updated_at
+                )
+
+        if adding and OrderTracking.order.is_cached(self):
+            # Keep a loaded order in sync so saving it later doesn't write stale values back.
+            self.order.order_status = self.status
+            self.order.latest_tracking = self
+            self.order.status_updated_at = self.updated_at
+
+
+class PaymentQuerySet(models.QuerySet):
+    def record(self, payment_method, transaction_id, **fields):
+        """
+        Insert a payment, or return the one already recorded for the same gateway
+        transaction or, failing that, for the same order.
+
+        The unique (payment_method, transaction_id) and order indexes settle concurrent
+        retries: the losing inserts fail and read back the winner's row.
+
+        Returns
+        -------
+        tuple[Payment, bool]
+            The payment, and whether it was created by this call.
+        """
+        try:
+            with transaction.atomic():
+                return self.create(payment_method=payment_method, transaction_id=transaction_id, **fields), True
+        except IntegrityError:
+            existing = (
+                self.filter(payment_method=payment_method, transaction_id=transaction_id).first()
+                or self.filter(order=fields["order"]).first()
+            )
+            if existing is None:
+                raise
+            return existing, False
+
 
 class Payment(models.Model):
     """
@@ -450,14 +658,88 @@ class Payment(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Amount")
     transaction_id = models.CharField(max_length=100, verbose_name="Transaction ID")
 
+    objects = PaymentQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["payment_method", "transaction_id"], name="payment_method_transaction_unique"),
+        ]
+
     def __str__(self):
         return f"Payment for Order #{self.order.id} - {self.payment_status}"
 
 
+class PaymentEvent(models.Model):
+    """
+    A payment gateway webhook delivery, stored verbatim before it is processed.
+
+    Rows are only ever inserted by the webhook and marked processed by the
+    ``process_payment_events`` worker, which applies them to ``Payment`` in
+    arrival order.
+
+    Attributes
+    ----------
+    event_id : str
+        The gateway's id for the event; redeliveries of one event are stored once.
+    event_type : str
+        The gateway event type (e.g. 'payment.succeeded').
+    payment_method : str
+        The payment method of the transaction the event is about.
+    transaction_id : str
+        The gateway transaction the event is about.
+    payload : dict
+        The raw event body.
+    received_at : datetime
+        When the webhook was received.
+    processed_at : Optional[datetime]
+        When the worker applied the event, or None while it is pending.
+    error : str
+        Why the worker couldn't apply the event, if it couldn't.
+    """
+
+    event_id = models.CharField(max_length=255, unique=True, verbose_name="Event ID")
+    event_type = models.CharField(max_length=100, verbose_name="Event Type")
+    payment_method = models.CharField(max_length=50, verbose_name="Payment Method")
+    transaction_id = models.CharField(max_length=100, verbose_name="Transaction ID")
+    payload = models.JSONField(verbose_name="Payload")
+    received_at = models.DateTimeField(auto_now_add=True, verbose_name="Received At")
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name="Processed At")
+    error = models.TextField(blank=True, verbose_name="Error")
+
+    class Meta:
+        indexes = [
+            # The worker's queue: pending events in arrival order.
+            models.Index(fields=["id"], condition=models.Q(processed_at__isnull=True), name="paymentevent_pending_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} {self.transaction_id} ({self.event_id})"
+
+
+class StoreQuerySet(models.QuerySet):
+    def nearest(self, point, k):
+        """
+        The ``k`` located stores closest to ``point``, nearest first, annotated
+        with their ``distance``. Ordering by ``<->`` lets PostGIS walk the GiST
+        index outwards from the point instead of measuring every store.
+        """
+        # A geography operand, so <-> isn't resolved against the geometry operator.
+        target = models.Value(point, output_field=gis_models.PointField(geography=True, srid=4326))
+        return (
+            self.filter(location__isnull=False)
+            .annotate(distance=Distance("location", point))
+            .order_by(GeometryDistance("location", target))[:k]
+        )
+
+
 class Store(models.Model):
     name = models.CharField(max_length=255)
     address = models.TextField()
     link = models.URLField()
+    # Geography so distances come out in metres; spatial_index gives it a GiST index.
+    location = gis_models.PointField(geography=True, srid=4326, null=True, blank=True)
+
+    objects = StoreQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -0,0 +1,94 @@
+"""
+Cart pricing: delivery charge and free-case promotions.
+
+The rule tables come from ``PRICING_DELIVERY_CHARGES`` and ``PRICING_FREE_CASES``,
+lists of ``(minimum total quantity, value)`` pairs. They are compiled once per
+process into sorted thresholds, so a quote is one pass over the cart lines to
+total them plus a bisect per table.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from decimal import Decimal
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+PRICING_SETTINGS = ("PRICING_DELIVERY_CHARGES", "PRICING_FREE_CASES")
+
+
+@dataclass(frozen=True)
+class RuleTable:
+    thresholds: Tuple[int, ...]
+    values: tuple
+
+    @classmethod
+    def compile(cls, rules, cast):
+        rules = sorted((int(minimum), cast(value)) for minimum, value in rules)
+        return cls(tuple(minimum for minimum, _ in rules), tuple(value for _, value in rules))
+
+    def lookup(self, quantity, default):
+        index = bisect_right(self.thresholds, quantity) - 1
+        return self.values[index] if index >= 0 else default
+
+
+@dataclass(frozen=True)
+class Quote:
+    item_count: int
+    subtotal: Decimal
+    delivery_charge: Decimal
+    free_cases: int
+
+    @property
+    def total(self) -> Decimal:
+        return self.subtotal + self.delivery_charge
+
+
+@lru_cache(maxsize=None)
+def get_rules() -> Tuple[RuleTable, RuleTable]:
+    return (
+        RuleTable.compile(settings.PRICING_DELIVERY_CHARGES, lambda value: Decimal(str(value))),
+        RuleTable.compile(settings.PRICING_FREE_CASES, int),
+    )
+
+
+@receiver(setting_changed)
+def reset_rules(setting, **kwargs):
+    if setting in PRICING_SETTINGS:
+        get_rules.cache_clear()
+
+
+def quote(lines: Iterable[Tuple[Decimal, int]]) -> Quote:
+    """
+    Price cart lines given as ``(unit price, quantity)`` pairs.
+    """
+    item_count = 0
+    subtotal = Decimal("0.00")
+    for unit_price, quantity in lines:
+        item_count += quantity
+        subtotal += unit_price * quantity
+
+    delivery_charges, free_cases = get_rules()
+    return Quote(
+        item_count=item_count,
+        subtotal=subtotal,
+        delivery_charge=delivery_charges.lookup(item_count, Decimal("0.00")),
+        free_cases=free_cases.lookup(item_count, 0),
+    )
+
+
+def cart_lines(cart):
+    """
+    The cart's ``(unit price, quantity)`` pairs, from prefetched items when the
+    cart was loaded with them (e.g. ``Order.objects.with_line_items()``), else in one query.
+    """
+    if "cartitem_set" in getattr(cart, "_prefetched_objects_cache", {}):
+        return [(item.product.price, item.quantity) for item in cart.cartitem_set.all()]
+    return cart.cartitem_set.values_list("product__price", "quantity")
+
+
+def quote_cart(cart) -> Quote:
+    return quote(cart_lines(cart))
@@ -1,5 +1,6 @@
 from django.utils.translation import gettext
 
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 from .models import (
     Product,
@@ -24,10 +25,21 @@ class ProductCategorySerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     category: ProductCategorySerializer = ProductCategorySerializer(read_only=True)
+    image_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ["id", "name", "description", "price", "category", "stock_status", "image", "featured"]
+        fields = ["id", "name", "description", "price", "category", "stock_status", "image", "image_variants", "featured"]
+
+    @extend_schema_field({"type": "object", "additionalProperties": {"type": "string", "format": "uri"}})
+    def get_image_variants(self, obj):
+        # Names are recorded once the variants exist, so no storage round trip is needed here.
+        request = self.context.get("request")
+        urls = {}
+        for label, name in obj.image_variants.items():
+            url = obj.image.storage.url(name)
+            urls[label] = request.build_absolute_uri(url) if request is not None else url
+        return urls
 
 
 class ReviewPhotoSerializer(serializers.ModelSerializer):
@@ -43,7 +55,8 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Review
-        fields = ["id", "product", "rating", "review_text", "photos", "name", "email", "created_at", "updated_at"]
+        fields = ["id", "product", "rating", "review_text", "photos", "name", "email", "status", "created_at", "updated_at"]
+        read_only_fields = ["status"]
 
     def validate_photos(self, photos):
         # Don't allow images more than MAX_NUMBER_OF_IMAGES
@@ -62,10 +75,25 @@ class CartItemSerializer(serializers.ModelSerializer):
 
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(source="cartitem_set", many=True, read_only=True)
+    # Preview of what placing the order will charge, from the same quote as the order itself.
+    get_total_price = serializers.DecimalField(source="pricing.subtotal", max_digits=12, decimal_places=2, read_only=True)
+    delivery_charge = serializers.DecimalField(source="pricing.delivery_charge", max_digits=10, decimal_places=2, read_only=True)
+    total_price = serializers.DecimalField(source="pricing.total", max_digits=12, decimal_places=2, read_only=True)
+    free_cases = serializers.IntegerField(source="pricing.free_cases", read_only=True)
 
     class Meta:
         model = Cart
-        fields = ["id", "session_key", "user", "created_at", "items", "get_total_price", "free_cases"]
+        fields = [
+            "id",
+            "session_key",
+            "user",
+            "created_at",
+            "items",
+            "get_total_price",
+            "delivery_charge",
+            "total_price",
+            "free_cases",
+        ]
 
 
 class ShippingSerializer(serializers.ModelSerializer):
@@ -89,6 +117,31 @@ class OrderSerializer(serializers.ModelSerializer):
         return instance
 
 
+class OrderSummarySerializer(serializers.ModelSerializer):
+    """
+    Order list representation, expects a queryset from ``Order.objects.with_summary()``.
+    """
+
+    shipping = ShippingSerializer(read_only=True)
+    item_count = serializers.IntegerField(read_only=True)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "cart",
+            "shipping",
+            "item_count",
+            "subtotal",
+            "total_price",
+            "delivery_charge",
+            "order_status",
+            "created_at",
+            "updated_at",
+        ]
+
+
 class OrderStatsSerializer(serializers.Serializer):
     total_orders = serializers.IntegerField()
     total_items = serializers.IntegerField()
@@ -108,10 +161,47 @@ class OrderTrackingSerializer(serializers.ModelSerializer):
         fields = ['id', 'order', 'status', 'updated_at', 'updated_by']
 
 
+class OrderStatusBulkUpdateSerializer(serializers.Serializer):
+    order_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=5000)
+    status = serializers.ChoiceField(choices=OrderTracking.Status.choices)
+
+
+class WishlistBulkAddSerializer(serializers.Serializer):
+    product_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+
+
 class PaymentCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
-        fields = ['payment_status', 'payment_method', 'payment_date', 'amount', 'transaction_id']
+        fields = ['id', 'order', 'payment_status', 'payment_method', 'payment_date', 'amount', 'transaction_id']
+        read_only_fields = ['id', 'payment_date']
+        # Replays of a recorded transaction are answered by the view, not rejected here.
+        validators = []
+        extra_kwargs = {'order': {'validators': []}}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not request.user.is_staff:
+            # Customers only announce a payment for the order's total; the signed webhook confirms it.
+            for name in ('payment_status', 'amount'):
+                fields[name].read_only = True
+        return fields
+
+    def validate_order(self, order):
+        user = self.context['request'].user
+        if not user.is_staff and order.cart.user_id != user.id:
+            raise serializers.ValidationError("Order not found.")
+        return order
+
+    def validate(self, attrs):
+        if 'amount' not in attrs:
+            attrs['amount'] = attrs['order'].total_price
+        return attrs
+
+    def create(self, validated_data):
+        payment, self.created = Payment.objects.record(**validated_data)
+        return payment
 
 
 # class OrderSerializer(serializers.ModelSerializer):
@@ -124,6 +214,31 @@ class PaymentCreateSerializer(serializers.ModelSerializer):
 
 
 class StoreSerializer(serializers.ModelSerializer):
+    latitude = serializers.SerializerMethodField()
+    longitude = serializers.SerializerMethodField()
+
     class Meta:
         model = Store
-        fields = ['id', 'name', 'address', 'link'] 
+        fields = ['id', 'name', 'address', 'link', 'latitude', 'longitude']
+
+    def get_latitude(self, obj):
+        return obj.location.y if obj.location else None
+
+    def get_longitude(self, obj):
+        return obj.location.x if obj.location else None
+
+
+class NearestStoreSerializer(StoreSerializer):
+    distance = serializers.SerializerMethodField(help_text="Distance from the requested point in metres.")
+
+    class Meta(StoreSerializer.Meta):
+        fields = StoreSerializer.Meta.fields + ['distance']
+
+    def get_distance(self, obj):
+        return round(obj.distance.m, 1)
+
+
+class NearestStoreQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    k = serializers.IntegerField(min_value=1, max_value=50, default=5)
@@ -0,0 +1,74 @@
+"""
+Moving an anonymous session's wishlist and cart over to the account that logs in.
+
+Each merge is a handful of set-based statements whatever the number of items:
+session rows are re-pointed at the user with an UPDATE when the user has nothing
+to merge into, otherwise copied with ``INSERT ... SELECT ... ON CONFLICT`` and
+the session rows deleted.
+"""
+
+from django.db import connection, transaction
+
+from .inventory import release
+from .models import Cart, CartItem, StockReservation, Wishlist
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def merge_wishlists(session_key, user):
+    session_wishlists = Wishlist.objects.filter(session_key=session_key, user__isnull=True)
+    target = Wishlist.objects.filter(user=user).order_by("id").first()
+    if target is None:
+        first = session_wishlists.order_by("id").first()
+        if first is None:
+            return
+        Wishlist.objects.filter(id=first.id).update(user=user, session_key=None)
+        target = first
+
+    through = Wishlist.products.through
+    table = _table(through)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (wishlist_id, product_id) "
+            f"SELECT %s, product_id FROM {table} "
+            f"WHERE wishlist_id IN (SELECT id FROM {_table(Wishlist)} WHERE session_key = %s AND user_id IS NULL) "
+            f"ON CONFLICT (wishlist_id, product_id) DO NOTHING",
+            [target.id, session_key],
+        )
+    session_wishlists.delete()
+
+
+def merge_carts(session_key, user):
+    session_cart = (
+        Cart.objects.filter(session_key=session_key, user__isnull=True, is_order_created=False).order_by("-id").first()
+    )
+    if session_cart is None:
+        return
+    target = Cart.objects.filter(user=user, is_order_created=False).order_by("-created_at").first()
+    if target is None:
+        Cart.objects.filter(id=session_cart.id).update(user=user, session_key=None)
+        return
+
+    # The merged cart goes through checkout again, hand back what the session cart held.
+    release(StockReservation.objects.filter(cart=session_cart))
+    table = _table(CartItem)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (cart_id, product_id, quantity) "
+            f"SELECT %s, product_id, quantity FROM {table} WHERE cart_id = %s "
+            f"ON CONFLICT (cart_id, product_id) DO UPDATE SET quantity = {table}.quantity + excluded.quantity",
+            [target.id, session_cart.id],
+        )
+    session_cart.delete()
+    target.update_free_cases()
+
+
+def merge_session(session_key, user):
+    """
+    Merge the wishlist and open cart of the anonymous session into the user's.
+    """
+    with transaction.atomic():
+        merge_wishlists(session_key, user)
+        merge_carts(session_key, user)
@@ -1,6 +1,12 @@
+from django.db import transaction
 from django.db.models.signals import post_save
 from django.dispatch import receiver
-from .models import Order
+from main.background import enqueue
+from main.media import expected_variants, refresh_image_variants
+from user.signals import token_obtained
+from .events import publish_tracking_events
+from .models import Order, OrderTracking, Product
+from .sessions import merge_session
 from django.core.mail import send_mail
 from django.conf import settings
 
@@ -180,3 +186,23 @@ def send_order_confirmation_email(sender, instance, created, **kwargs):
             fail_silently=False,
             html_message=html_message,
         )
+
+
+@receiver(post_save, sender=OrderTracking)
+def publish_order_tracking_event(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: publish_tracking_events([instance]))
+
+
+@receiver(post_save, sender=Product)
+def render_product_image_variants(sender, instance, raw=False, **kwargs):
+    name = instance.image.name
+    if name and not raw and instance.image_variants != expected_variants(name):
+        transaction.on_commit(lambda: enqueue(refresh_image_variants, Product, instance.pk, name))
+
+
+@receiver(token_obtained)
+def merge_session_on_login(sender, request, user, **kwargs):
+    session = getattr(request, "session", None)
+    if session is not None and session.session_key:
+        merge_session(session.session_key, user)
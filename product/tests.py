@@ -1,3 +1,1044 @@
-from django.test import TestCase
+import csv
+import gzip
+import importlib
+import io
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock, skipIf
+from decimal import Decimal
+from pathlib import Path
 
-# Create your tests here.
+import sentry_sdk
+from asgiref.sync import sync_to_async
+from django.contrib.gis.geos import Point
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import InMemoryStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import DataError, IntegrityError, close_old_connections, connection
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from drf_spectacular.drainage import GENERATOR_STATS
+from PIL import Image as PILImage
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase, force_authenticate
+
+from main import metrics, tracing
+from main.schema import generate
+from user.authentication import get_tokens_for_user
+from user.models import User
+from .models import (
+    Cart,
+    CartItem,
+    Order,
+    OrderTracking,
+    Payment,
+    PaymentEvent,
+    Product,
+    ProductCategory,
+    Review,
+    ReviewPhoto,
+    Shipping,
+    StockReservation,
+    Store,
+    Wishlist,
+)
+from . import views as product_views
+from .events import tracking_event
+from .inventory import InsufficientStock, commit_cart, release, reserve_cart, stale_reservations
+from .pricing import quote, quote_cart
+from .tracking import bulk_transition_orders
+from .webhooks import SIGNATURE_HEADER, TIMESTAMP_HEADER, process_pending_events, sign
+
+
+class OrderHistoryQueryBudgetTest(APITestCase):
+    """
+    The order history endpoints must issue a fixed number of queries,
+    however many orders and line items the user has.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="buyer@example.com", username="buyer", password=None)
+        category = ProductCategory.objects.create(name="Beer")
+        cls.products = [
+            Product.objects.create(
+                name=f"Lager {i}", description="", price=Decimal("10.00"), category=category, stock=100, image="products/beer.png"
+            )
+            for i in range(3)
+        ]
+
+    def create_order(self):
+        cart = Cart.objects.create(user=self.user)
+        for product in self.products:
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+        shipping = Shipping.objects.create(
+            cart=cart,
+            first_name="Buyer",
+            last_name="Example",
+            email="buyer@example.com",
+            phone="5550100",
+            address="1 Main St",
+            city="Irving",
+            state="TX",
+            postal_code="75062",
+        )
+        return Order.objects.create(cart=cart, shipping=shipping, total_price=0)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_query_budget(self):
+        for _ in range(5):
+            self.create_order()
+
+        # Count for the pagination plus the annotated page.
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/v1/orders/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 5)
+        summary = response.data["results"][0]
+        self.assertEqual(summary["item_count"], 6)
+        self.assertEqual(summary["subtotal"], "60.00")
+        self.assertNotIn("items", summary)
+
+    def test_detail_query_budget(self):
+        order = self.create_order()
+
+        # The order with cart and shipping, then the cart items with products and categories.
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/v1/orders/{order.id}/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["cart"]["items"]), 3)
+        self.assertEqual(response.data["cart"]["items"][0]["product_details"]["category"]["name"], "Beer")
+
+
+class OrderExportTest(APITestCase):
+    """
+    Staff export the orders of a date range as CSV or NDJSON, one row per line item.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(email="staff@example.com", username="staff", password=None, is_staff=True)
+        buyer = User.objects.create_user(email="buyer@example.com", username="buyer", password=None)
+        category = ProductCategory.objects.create(name="Beer")
+        cart = Cart.objects.create(user=buyer)
+        for name in ("Lager", "Stout"):
+            product = Product.objects.create(
+                name=name, description="", price=Decimal("10.00"), category=category, stock=10, image="products/beer.png"
+            )
+            CartItem.objects.create(cart=cart, product=product, quantity=2)
+        shipping = Shipping.objects.create(
+            cart=cart, first_name="Buyer", last_name="Example", email="buyer@example.com", phone="5550100",
+            address="1 Main St", city="Irving", state="TX", postal_code="75062",
+        )
+        cls.order = Order.objects.create(cart=cart, shipping=shipping, total_price=0)
+        cls.today = timezone.localdate().isoformat()
+
+    def export(self, **params):
+        return self.client.get("/api/v1/order-export/", {"start": self.today, "end": self.today, **params})
+
+    def test_formats(self):
+        self.client.force_authenticate(self.staff)
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([row["item_product_name"] for row in rows], ["Lager", "Stout"])
+        self.assertEqual(rows[0]["order_id"], str(self.order.id))
+
+        response = self.export(file_format="ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["item_quantity"] for row in rows], [2, 2])
+        self.assertEqual(rows[0]["order_total_price"], str(Order.objects.get(pk=self.order.pk).total_price))
+
+        response = self.export(start="2000-01-01", end="2000-01-31")
+        self.assertEqual(b"".join(response.streaming_content).decode().count("\n"), 1)
+
+    def test_bad_parameters(self):
+        self.client.force_authenticate(self.staff)
+        for params in ({"start": "2024-02-30"}, {"end": "yesterday"}, {"start": "2024-03-02", "end": "2024-03-01"}):
+            self.assertEqual(self.export(**params).status_code, 400, params)
+        self.assertEqual(self.export(file_format="xlsx").status_code, 400)
+
+    def test_staff_only(self):
+        self.assertEqual(self.export().status_code, 401)
+        self.client.force_authenticate(User.objects.get(username="buyer"))
+        self.assertEqual(self.export().status_code, 403)
+
+
+class OrderStatusTransitionTest(APITestCase):
+    """
+    Orders only move forward through their statuses, one by one or in bulk.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(email="staff@example.com", username="staff", password=None, is_staff=True)
+        buyer = User.objects.create_user(email="buyer@example.com", username="buyer", password=None)
+        cls.orders = []
+        for i in range(3):
+            cart = Cart.objects.create(user=buyer)
+            shipping = Shipping.objects.create(
+                cart=cart, first_name="Buyer", last_name=str(i), email="buyer@example.com", phone="5550100",
+                address="1 Main St", city="Irving", state="TX", postal_code="75062",
+            )
+            cls.orders.append(Order.objects.create(cart=cart, shipping=shipping, total_price=0))
+
+    def test_bulk_transition(self):
+        first, second, third = (order.id for order in self.orders)
+        Order.objects.filter(id=third).update(order_status=OrderTracking.Status.DELIVERED)
+
+        with mock.patch("product.tracking.send_order_status_emails") as send, self.captureOnCommitCallbacks(execute=True):
+            updated, rejected = bulk_transition_orders([second, first, third, 0], OrderTracking.Status.SHIPPED, "staff")
+
+        self.assertEqual(updated, [first, second])
+        self.assertEqual(rejected, {third: "Delivered", 0: None})
+        send.assert_called_once_with([first, second])
+        for order in Order.objects.filter(id__in=updated).select_related("latest_tracking"):
+            self.assertEqual(order.order_status, "Shipped")
+            self.assertEqual(order.latest_tracking.status, "Shipped")
+            self.assertEqual(order.status_updated_at, order.latest_tracking.updated_at)
+        self.assertFalse(OrderTracking.objects.filter(order_id=third).exists())
+
+        # Not twice, and not backwards.
+        self.assertEqual(bulk_transition_orders([first], OrderTracking.Status.SHIPPED, "staff")[0], [])
+        self.assertEqual(bulk_transition_orders([first], OrderTracking.Status.PENDING, "staff")[0], [])
+
+    def test_latest_tracking_and_status_at(self):
+        order = self.orders[0]
+        placed = Order.objects.get(id=order.id)
+        self.assertIsNone(placed.latest_tracking)
+        self.assertEqual(placed.status_at(placed.created_at), "Pending")
+
+        shipped = OrderTracking.objects.create(order=order, status="Shipped", updated_by="staff")
+        between = timezone.now()
+        bulk_transition_orders([order.id], OrderTracking.Status.DELIVERED, "staff")
+
+        order = Order.objects.get(id=order.id)
+        delivered = order.tracking.first()
+        self.assertEqual(order.latest_tracking, delivered)
+        self.assertEqual((order.order_status, order.status_updated_at), ("Delivered", delivered.updated_at))
+        self.assertIsNone(order.status_at(order.created_at - timedelta(seconds=1)))
+        # Before the last change it takes one index lookup each, afterwards none.
+        with self.assertNumQueries(2):
+            self.assertEqual(order.status_at(shipped.updated_at), "Shipped")
+            self.assertEqual(order.status_at(between), "Shipped")
+        with self.assertNumQueries(0):
+            self.assertEqual(order.status_at(timezone.now()), "Delivered")
+
+        # Saving a tracking entry keeps a loaded order in sync.
+        loaded = Order.objects.get(id=self.orders[1].id)
+        tracking = OrderTracking.objects.create(order=loaded, status="Shipped", updated_by="staff")
+        self.assertEqual((loaded.order_status, loaded.latest_tracking), ("Shipped", tracking))
+
+    def test_bulk_view(self):
+        self.client.force_authenticate(self.staff)
+        order = self.orders[0]
+        response = self.client.post(
+            "/api/v1/order-status/bulk/", {"order_ids": [order.id], "status": "Delivered"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"updated": [], "rejected": [{"id": order.id, "order_status": "Pending"}]})
+
+    def test_tracking_entry_checks_the_transition(self):
+        view = product_views.OrderTrackingViewSet.as_view({"post": "create"})
+        order = self.orders[0]
+
+        def post(data):
+            request = APIRequestFactory().post("/", data, format="json")
+            force_authenticate(request, self.staff)
+            return view(request)
+
+        response = post({"order": order.id, "status": "Delivered", "updated_by": "staff"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get(id=order.id).order_status, "Pending")
+
+        with mock.patch.object(product_views, "send_order_status_email") as send, self.captureOnCommitCallbacks(execute=True):
+            response = post({"order": order.id, "status": "Shipped", "updated_by": "staff"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get(id=order.id).order_status, "Shipped")
+        send.assert_called_once()
+
+        self.assertEqual(post({"order": "abc", "status": "Shipped", "updated_by": "staff"}).status_code, 404)
+
+
+class OrderLiveTrackingTest(APITestCase):
+    """
+    Watchers get the current status, then every change, by polling or over server-sent events.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.buyer = User.objects.create_user(email="buyer@example.com", username="buyer", password=None)
+        cart = Cart.objects.create(user=cls.buyer)
+        shipping = Shipping.objects.create(
+            cart=cart, first_name="Buyer", last_name="Example", email="buyer@example.com", phone="5550100",
+            address="1 Main St", city="Irving", state="TX", postal_code="75062",
+        )
+        cls.order = Order.objects.create(cart=cart, shipping=shipping, total_price=0)
+        cls.token = str(get_tokens_for_user(cls.buyer).access_token)
+
+    def test_status_not_modified(self):
+        self.client.force_authenticate(self.buyer)
+        url = f"/api/v1/order/{self.order.id}/status/"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_status"], "Pending")
+        etag = response["ETag"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        OrderTracking.objects.create(order=self.order, status="Shipped", updated_by="staff")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["order_status"], "Shipped")
+        self.assertNotEqual(response["ETag"], etag)
+
+        self.client.force_authenticate(User.objects.create_user(email="other@example.com", username="other", password=None))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    @staticmethod
+    def parse(chunk):
+        fields = dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines())
+        return fields["event"], json.loads(fields["data"])
+
+    async def test_event_stream(self):
+        url = f"/api/v1/order/{self.order.id}/events/"
+        self.assertEqual((await self.async_client.get(url)).status_code, 401)
+
+        # A change right after the access check still makes it into the first event.
+        get_watched_order = product_views._get_watched_order
+
+        def change_meanwhile(*args):
+            watched = get_watched_order(*args)
+            OrderTracking.objects.create(order=self.order, status="Shipped", updated_by="staff")
+            return watched
+
+        with mock.patch.object(product_views, "_get_watched_order", change_meanwhile):
+            response = await self.async_client.get(url, {"token": self.token})
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b"retry: "))
+        self.assertEqual(self.parse(await anext(chunks)), ("status", {"order": self.order.id, "status": "Shipped"}))
+
+        shipped = await OrderTracking.objects.aget(order=self.order)
+        delivered = await sync_to_async(OrderTracking.objects.create)(order=self.order, status="Delivered", updated_by="staff")
+        broker = product_views.get_broker()
+        # The entry already sent is skipped, the new one ends the stream.
+        for tracking in (shipped, delivered):
+            broker.publish(self.order.id, tracking_event(tracking))
+        event, data = self.parse(await anext(chunks))
+        self.assertEqual((event, data["status"], data["tracking_id"]), ("status", "Delivered", delivered.id))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(chunks)
+
+
+class PaymentIdempotencyTest(TransactionTestCase):
+    """
+    Gateway retries of one transaction must record a single payment, even when they race.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email="payer@example.com", username="payer", password=None)
+        cart = Cart.objects.create(user=self.user)
+        shipping = Shipping.objects.create(
+            cart=cart,
+            first_name="Payer",
+            last_name="Example",
+            email="payer@example.com",
+            phone="5550100",
+            address="1 Main St",
+            city="Irving",
+            state="TX",
+            postal_code="75062",
+        )
+        self.order = Order.objects.create(cart=cart, shipping=shipping, total_price=Decimal("60.00"))
+        self.payload = {
+            "order": self.order.id,
+            "payment_method": "Credit Card",
+            "amount": "60.00",
+            "transaction_id": "txn_0001",
+        }
+
+    def post_payment(self, headers=None):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.post("/api/v1/payments/", self.payload, format="json", headers=headers)
+        finally:
+            connection.close()
+
+    @skipIf(connection.vendor == "sqlite", "SQLite test databases don't allow concurrent writers")
+    def test_parallel_replays_record_one_payment(self):
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            responses = list(pool.map(lambda _: self.post_payment(), range(50)))
+
+        statuses = [response.status_code for response in responses]
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(200), 49, statuses)
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertEqual({response.data["id"] for response in responses}, {Payment.objects.get().id})
+
+    @skipIf(connection.vendor == "sqlite", "SQLite test databases don't allow concurrent writers")
+    def test_parallel_payments_for_one_order(self):
+        def post(i):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                return client.post("/api/v1/payments/", {**self.payload, "transaction_id": f"txn_{i}"}, format="json")
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            statuses = [response.status_code for response in pool.map(post, range(20))]
+
+        self.assertEqual(statuses.count(201), 1, statuses)
+        self.assertEqual(statuses.count(409), 19, statuses)
+        self.assertEqual(Payment.objects.count(), 1)
+
+    def test_second_payment_for_the_order_conflicts(self):
+        self.assertEqual(self.post_payment().status_code, 201)
+        self.payload["transaction_id"] = "txn_0002"
+        response = self.post_payment()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Payment.objects.get().transaction_id, "txn_0001")
+
+    def test_customers_cannot_set_status_or_amount(self):
+        self.payload.update(payment_status="Completed", amount="0.01")
+        response = self.post_payment()
+
+        self.assertEqual(response.status_code, 201)
+        payment = Payment.objects.get()
+        self.assertEqual(payment.payment_status, "Pending")
+        self.assertEqual(payment.amount, Order.objects.get().total_price)
+
+        staff = User.objects.create_user(email="staff@example.com", username="staff", password=None, is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        payment.delete()
+        response = client.post("/api/v1/payments/", {**self.payload, "amount": "12.50"}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data["payment_status"], response.data["amount"]), ("Completed", "12.50"))
+
+    def test_idempotency_key_replays_stored_response(self):
+        first = self.post_payment(headers={"Idempotency-Key": "checkout-1"})
+        replay = self.post_payment(headers={"Idempotency-Key": "checkout-1"})
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(replay.status_code, 201)
+        self.assertEqual(replay.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(replay.data, first.data)
+
+        self.payload["amount"] = "70.00"
+        self.assertEqual(self.post_payment(headers={"Idempotency-Key": "checkout-1"}).status_code, 422)
+
+
+@override_settings(PAYMENT_WEBHOOK_SECRET="webhook-secret")
+class PaymentWebhookTest(APITestCase):
+    """
+    Webhooks are only logged on receipt; the worker applies them in arrival order.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(email="gateway@example.com", username="gateway", password=None)
+        cart = Cart.objects.create(user=user)
+        shipping = Shipping.objects.create(
+            cart=cart,
+            first_name="Gateway",
+            last_name="Example",
+            email="gateway@example.com",
+            phone="5550100",
+            address="1 Main St",
+            city="Irving",
+            state="TX",
+            postal_code="75062",
+        )
+        cls.order = Order.objects.create(cart=cart, shipping=shipping, total_price=Decimal("60.00"))
+
+    def deliver(self, event_id, event_type, signature=None, order=None, transaction_id="txn_0001", amount="60.00"):
+        body = json.dumps(
+            {
+                "id": event_id,
+                "type": event_type,
+                "data": {
+                    "order": (order or self.order).id,
+                    "payment_method": "Credit Card",
+                    "transaction_id": transaction_id,
+                    "amount": amount,
+                },
+            }
+        ).encode()
+        timestamp = int(time.time())
+        headers = {TIMESTAMP_HEADER: str(timestamp), SIGNATURE_HEADER: signature or sign(body, timestamp)}
+        return self.client.post("/api/v1/payment-webhook/", body, content_type="application/json", headers=headers)
+
+    def test_rejects_bad_signature(self):
+        self.assertEqual(self.deliver("evt_1", "payment.succeeded", signature="0" * 64).status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_events_are_applied_in_order(self):
+        for event_id, event_type in [
+            ("evt_1", "payment.pending"),
+            ("evt_2", "payment.succeeded"),
+            ("evt_2", "payment.succeeded"),
+            ("evt_3", "payment.failed"),
+        ]:
+            self.assertEqual(self.deliver(event_id, event_type).status_code, 200)
+
+        self.assertEqual(PaymentEvent.objects.count(), 3)
+        self.assertFalse(Payment.objects.exists())
+
+        self.assertEqual(process_pending_events(), 3)
+        self.assertEqual(process_pending_events(), 0)
+        payment = Payment.objects.get()
+        self.assertEqual(payment.order, self.order)
+        # The late failure doesn't undo a completed payment.
+        self.assertEqual(payment.payment_status, Payment.PaymentStatus.COMPLETED)
+
+
+    def test_bad_event_does_not_hold_up_the_batch(self):
+        shipping = self.order.shipping
+        shipping.pk, shipping.cart = None, Cart.objects.create(user=self.order.cart.user)
+        shipping.save()
+        other = Order.objects.create(cart=shipping.cart, shipping=shipping, total_price=0)
+        self.deliver("evt_1", "payment.succeeded", amount="1e20")
+        self.deliver("evt_2", "payment.succeeded", order=other, transaction_id="txn_0002")
+        self.deliver("evt_3", "payment.succeeded", transaction_id="txn_0003")
+
+        save = Payment.save
+
+        def reject_txn_0002(payment, *args, **kwargs):
+            if payment.transaction_id == "txn_0002":
+                raise DataError("value too long")
+            return save(payment, *args, **kwargs)
+
+        # The database rejecting one event's row falls back to one savepoint per event.
+        with mock.patch.object(Payment.objects, "bulk_create", side_effect=IntegrityError("duplicate key")), \
+                mock.patch.object(Payment, "save", reject_txn_0002):
+            self.assertEqual(process_pending_events(), 3)
+
+        self.assertEqual(process_pending_events(), 0)
+        self.assertEqual(list(Payment.objects.values_list("transaction_id", "amount")), [("txn_0003", Decimal("60.00"))])
+        errors = dict(PaymentEvent.objects.values_list("event_id", "error"))
+        self.assertIn("valid amount", errors["evt_1"])
+        self.assertIn("value too long", errors["evt_2"])
+        self.assertEqual(errors["evt_3"], "")
+
+
+class WishlistSessionMergeTest(APITestCase):
+    """
+    An anonymous session's wishlist and cart move to the account on login.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="shopper@example.com", username="shopper", password="Sh0pper-pass!", is_verified=True
+        )
+        category = ProductCategory.objects.create(name="Cider")
+        cls.products = [
+            Product.objects.create(
+                name=f"Cider {i}", description="", price=Decimal("8.00"), category=category, stock=10, image="products/cider.png"
+            )
+            for i in range(3)
+        ]
+
+    def test_wishlist_endpoints(self):
+        ids = [product.id for product in self.products]
+        response = self.client.post("/api/v1/wishlist/bulk/", {"product_ids": ids + [0]}, format="json")
+        self.assertEqual(response.data, {"added": ids, "not_found": [0]})
+
+        self.assertEqual(self.client.delete(f"/api/v1/wishlist/{ids[0]}/").status_code, 204)
+        self.assertEqual(self.client.delete("/api/v1/wishlist/abc/").status_code, 404)
+        for product_id in ("abc", [ids[0]]):
+            self.assertEqual(self.client.post("/api/v1/wishlist/", {"product_id": product_id}, format="json").status_code, 404)
+        # The session's wishlist, the pagination count, then the products joined with their categories.
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/v1/wishlist/")
+        self.assertEqual([product["id"] for product in response.data["results"]], ids[1:])
+
+    def test_login_merges_session_wishlist_and_cart(self):
+        own_wishlist = Wishlist.objects.create(user=self.user)
+        own_wishlist.products.add(self.products[0])
+        own_cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=own_cart, product=self.products[0], quantity=1)
+
+        self.client.post("/api/v1/wishlist/bulk/", {"product_ids": [self.products[0].id, self.products[1].id]}, format="json")
+        session_key = self.client.session.session_key
+        session_cart = Cart.objects.create(session_key=session_key)
+        CartItem.objects.create(cart=session_cart, product=self.products[0], quantity=2)
+        CartItem.objects.create(cart=session_cart, product=self.products[2], quantity=1)
+
+        response = self.client.post("/api/login", {"email": self.user.email, "password": "Sh0pper-pass!"}, format="json")
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(set(own_wishlist.products.values_list("id", flat=True)), {self.products[0].id, self.products[1].id})
+        self.assertFalse(Wishlist.objects.filter(session_key=session_key).exists())
+        self.assertFalse(Cart.objects.filter(id=session_cart.id).exists())
+        self.assertEqual(
+            dict(own_cart.cartitem_set.values_list("product_id", "quantity")),
+            {self.products[0].id: 3, self.products[2].id: 1},
+        )
+
+
+class ReviewListTest(APITestCase):
+    """
+    Public review lists serve approved reviews only, with photos in one query.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        category = ProductCategory.objects.create(name="Stout")
+        cls.product = Product.objects.create(
+            name="Stout", description="", price=Decimal("12.00"), category=category, stock=10, image="products/stout.png"
+        )
+        for rating in (3, 5, 4):
+            review = Review.objects.create(
+                product=cls.product, rating=rating, review_text="Good", name="Reader", email="reader@example.com",
+                status=Review.Status.APPROVED,
+            )
+            review.photos.add(*ReviewPhoto.objects.bulk_create(ReviewPhoto(image="review_photos/stout.png") for _ in range(2)))
+        Review.objects.create(product=cls.product, rating=1, review_text="Spam", name="Spammer", email="spam@example.com")
+
+    def test_list_serves_approved_reviews_with_photos(self):
+        # The product filter's lookup, the pagination count, the page, then the photos of every review on it.
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/v1/review/", {"product": self.product.id, "ordering": "-rating"})
+
+        self.assertEqual([review["rating"] for review in response.data["results"]], [5, 4, 3])
+        self.assertTrue(all(len(review["photos"]) == 2 for review in response.data["results"]))
+
+    def test_new_reviews_await_moderation(self):
+        response = self.client.post(
+            "/api/v1/review/",
+            {"product": self.product.id, "rating": 5, "review_text": "Great", "name": "New", "email": "new@example.com"},
+            format="json",
+        )
+        self.assertEqual(response.data["status"], Review.Status.PENDING)
+        self.assertEqual(self.client.get(f"/api/v1/review/{response.data['id']}/").status_code, 404)
+
+
+    def test_only_staff_edit_reviews(self):
+        approved = Review.objects.approved().first()
+        for method in (self.client.patch, self.client.put, self.client.delete):
+            response = method(f"/api/v1/review/{approved.id}/", {"review_text": "Defaced"}, format="json")
+            self.assertIn(response.status_code, (401, 403))
+        self.assertEqual(Review.objects.get(id=approved.id).review_text, "Good")
+        photo = {"image": SimpleUploadedFile("photo.png", b"not checked here", content_type="image/png")}
+        self.assertEqual(self.client.post(f"/api/v1/review/{approved.id}/add_photo/", photo).status_code, 404)
+
+        self.client.force_authenticate(
+            User.objects.create_user(email="moderator@example.com", username="moderator", password=None, is_staff=True)
+        )
+        response = self.client.patch(f"/api/v1/review/{approved.id}/", {"review_text": "Edited"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.delete(f"/api/v1/review/{approved.id}/").status_code, 204)
+
+
+class StoreLocatorTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, lon, lat in (("Irving", -96.974, 32.847), ("Austin", -97.714, 30.263), ("Hurst", -97.176, 32.857)):
+            Store.objects.create(name=name, address="", link="https://example.com", location=Point(lon, lat, srid=4326))
+        Store.objects.create(name="Unlocated", address="", link="https://example.com")
+
+    @skipIf(connection.vendor != "postgresql", "KNN ordering needs PostGIS")
+    def test_nearest_orders_by_distance(self):
+        # Euless sits between Hurst and Irving, a little closer to Hurst; Austin is far off.
+        response = self.client.get("/api/v1/stores/nearest/", {"lat": 32.859, "lon": -97.083, "k": 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([store["name"] for store in response.data], ["Hurst", "Irving"])
+        self.assertLess(response.data[0]["distance"], response.data[1]["distance"])
+
+    def test_nearest_validates_the_point(self):
+        response = self.client.get("/api/v1/stores/nearest/", {"lat": 91, "lon": -97.083, "k": 100})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.data), {"lat", "k"})
+
+
+class InventoryTest(APITestCase):
+    """
+    Checkouts reserve every line of a cart or nothing, and stock_status follows the stock.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email="stocker@example.com", username="stocker", password=None)
+        category = ProductCategory.objects.create(name="Beer")
+        cls.lager, cls.stout = (
+            Product.objects.create(name=name, description="", price=Decimal("10.00"), category=category, stock=stock)
+            for name, stock in (("Lager", 5), ("Stout", 2))
+        )
+
+    def cart(self, **quantities):
+        cart = Cart.objects.create(user=self.user)
+        for name, quantity in quantities.items():
+            CartItem.objects.create(cart=cart, product=getattr(self, name), quantity=quantity)
+        return cart
+
+    def stock(self):
+        return dict(Product.objects.values_list("name", "stock")), dict(Product.objects.values_list("name", "stock_status"))
+
+    def test_reserve_all_or_nothing(self):
+        first = self.cart(lager=3, stout=2)
+        self.assertEqual(reserve_cart(first), {self.lager.id: 3, self.stout.id: 2})
+        self.assertEqual(self.stock(), ({"Lager": 2, "Stout": 0}, {"Lager": True, "Stout": False}))
+
+        second = self.cart(lager=1, stout=1)
+        with self.assertRaises(InsufficientStock) as raised:
+            reserve_cart(second)
+        self.assertEqual(raised.exception.product_ids, [self.stout.id])
+        self.assertEqual(self.stock()[0], {"Lager": 2, "Stout": 0})
+        self.assertFalse(StockReservation.objects.filter(cart=second).exists())
+
+        # Reserving again replaces what the cart held.
+        CartItem.objects.filter(cart=first, product=self.stout).update(quantity=1)
+        reserve_cart(first)
+        self.assertEqual(self.stock()[0], {"Lager": 2, "Stout": 1})
+        self.assertEqual(release(StockReservation.objects.filter(cart=first)), 2)
+        self.assertEqual(self.stock(), ({"Lager": 5, "Stout": 2}, {"Lager": True, "Stout": True}))
+
+    def test_commit_and_stale_reservations(self):
+        ordered, abandoned = self.cart(lager=1), self.cart(lager=2, stout=1)
+        reserve_cart(ordered)
+        reserve_cart(abandoned)
+        commit_cart(ordered)
+        self.assertFalse(StockReservation.objects.filter(cart=ordered).exists())
+        self.assertEqual(self.stock()[0], {"Lager": 2, "Stout": 1})
+
+        self.assertFalse(stale_reservations().exists())
+        StockReservation.objects.update(created_at=timezone.now() - settings.STOCK_RESERVATION_TTL - timedelta(seconds=1))
+        self.assertEqual(release(stale_reservations()), 2)
+        self.assertEqual(self.stock()[0], {"Lager": 4, "Stout": 2})
+
+    def test_migration_derives_stock_status_without_inventing_stock(self):
+        migration = importlib.import_module("product.migrations.0014_stock_reservation")
+        Product.objects.filter(pk=self.lager.pk).update(stock=0, stock_status=True)
+        Product.objects.filter(pk=self.stout.pk).update(stock=7, stock_status=False)
+
+        migration.derive_stock_status(django_apps, None)
+
+        self.assertEqual(self.stock(), ({"Lager": 0, "Stout": 0}, {"Lager": False, "Stout": False}))
+
+        # A product counted and marked in stock keeps its count.
+        Product.objects.filter(pk=self.stout.pk).update(stock=7, stock_status=True)
+        migration.derive_stock_status(django_apps, None)
+        self.assertEqual(self.stock(), ({"Lager": 0, "Stout": 7}, {"Lager": False, "Stout": True}))
+
+
+class PricingTest(SimpleTestCase):
+    """
+    Delivery is free from 25 items, and free cases go up at 25, 40 and 50 items.
+    """
+
+    def test_rule_boundaries(self):
+        # (quantity, delivery charge, free cases)
+        cases = [
+            (0, "19.99", 0),
+            (1, "19.99", 0),
+            (24, "19.99", 0),
+            (25, "0.00", 1),
+            (39, "0.00", 1),
+            (40, "0.00", 2),
+            (49, "0.00", 2),
+            (50, "0.00", 3),
+            (500, "0.00", 3),
+        ]
+        for quantity, delivery_charge, free_cases in cases:
+            with self.subTest(quantity=quantity):
+                # Split over two lines, the rules go by the total quantity.
+                result = quote([(Decimal("2.50"), quantity // 2), (Decimal("4.00"), quantity - quantity // 2)])
+                subtotal = Decimal("2.50") * (quantity // 2) + Decimal("4.00") * (quantity - quantity // 2)
+                self.assertEqual(result.item_count, quantity)
+                self.assertEqual(result.subtotal, subtotal)
+                self.assertEqual(result.delivery_charge, Decimal(delivery_charge))
+                self.assertEqual(result.total, subtotal + Decimal(delivery_charge))
+                self.assertEqual(result.free_cases, free_cases)
+
+    def test_rules_follow_the_settings(self):
+        with override_settings(PRICING_DELIVERY_CHARGES=[(10, "0.00"), (0, "5")], PRICING_FREE_CASES=[]):
+            self.assertEqual(quote([(Decimal("1.00"), 9)]).delivery_charge, Decimal("5.00"))
+            self.assertEqual(quote([(Decimal("1.00"), 10)]).delivery_charge, Decimal("0.00"))
+            self.assertEqual(quote([(Decimal("1.00"), 100)]).free_cases, 0)
+        self.assertEqual(quote([(Decimal("1.00"), 10)]).delivery_charge, Decimal("19.99"))
+
+
+class SeedDataTest(TransactionTestCase):
+    def seed(self):
+        call_command(
+            "seed_data", products=20, users=10, orders=30, stores=3, seed=7, batch_size=8, stdout=io.StringIO()
+        )
+
+    def test_orders_are_consistent_with_their_carts(self):
+        self.seed()
+
+        self.assertEqual(Order.objects.count(), 30)
+        self.assertEqual(OrderTracking.objects.values("order").distinct().count(), 30)
+        for order in Order.objects.select_related("cart", "latest_tracking"):
+            self.assertEqual(order.total_price, quote_cart(order.cart).total)
+            self.assertEqual(order.order_status, order.latest_tracking.status)
+        self.assertFalse(Product.objects.filter(stock__lt=0).exists())
+
+    def test_ids_continue_after_the_seeded_rows(self):
+        self.seed()
+        self.seed()
+
+        self.assertEqual(Order.objects.count(), 60)
+        category = ProductCategory.objects.create(name="After seeding")
+        self.assertGreater(category.pk, ProductCategory.objects.exclude(pk=category.pk).latest("pk").pk)
+
+    def test_bulk_loaddata_installs_fixtures(self):
+        call_command("bulk_loaddata", "store", "product_categories", batch_size=3, stdout=io.StringIO())
+
+        self.assertEqual(Store.objects.count(), 8)
+        self.assertIsNotNone(Store.objects.get(pk=1).location)
+        self.assertTrue(ProductCategory.objects.exists())
+
+
+class SchemaTest(APITestCase):
+    def test_committed_schema_is_current(self):
+        # The generator's warnings are for whoever runs generate_schema.
+        with GENERATOR_STATS.silence():
+            schema = generate()
+        self.assertTrue(
+            schema == settings.API_SCHEMA_FILE.read_bytes(),
+            "The API changed since the schema was generated, run manage.py generate_schema and commit it.",
+        )
+
+    def test_schema_is_served_from_the_file_with_an_etag(self):
+        response = self.client.get("/api-docs/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, settings.API_SCHEMA_FILE.read_bytes())
+        self.assertIn("max-age", response["Cache-Control"])
+        revalidated = self.client.get("/api-docs/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(revalidated.status_code, 304)
+
+        as_json = self.client.get("/api-docs/", {"format": "json"})
+        self.assertNotEqual(as_json["ETag"], response["ETag"])
+        self.assertEqual(json.loads(as_json.content)["info"]["title"], "Kaveri API")
+
+
+class StaticFilesTest(APITestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        source, self.static_root, self.media_root = (Path(self.tmp.name) / name for name in ("source", "static", "media"))
+        source.mkdir()
+        self.media_root.mkdir()
+        (source / "site.css").write_text("body { color: #333; }\n" * 200)
+        (self.media_root / "photo.jpg").write_bytes(b"\xff\xd8\xff" + b"\0" * 1024)
+
+        overrides = override_settings(
+            STATIC_ROOT=str(self.static_root),
+            MEDIA_ROOT=str(self.media_root),
+            STATICFILES_DIRS=[str(source)],
+            STATICFILES_FINDERS=["django.contrib.staticfiles.finders.FileSystemFinder"],
+            SERVE_FILES=True,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        call_command("collectstatic", interactive=False, verbosity=0)
+        self.hashed_name = staticfiles_storage.stored_name("site.css")
+
+    def test_hashed_static_files_are_precompressed_and_cached_forever(self):
+        self.assertNotEqual(self.hashed_name, "site.css")
+        self.assertTrue((self.static_root / f"{self.hashed_name}.gz").is_file())
+
+        response = self.client.get(f"/static/{self.hashed_name}", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), (self.static_root / self.hashed_name).read_bytes())
+
+        plain = self.client.get("/static/site.css", HTTP_ACCEPT_ENCODING="gzip;q=0")
+        self.assertNotIn("Content-Encoding", plain)
+        self.assertNotIn("immutable", plain["Cache-Control"])
+
+        revalidated = self.client.get(f"/static/{self.hashed_name}", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(self.client.get("/static/../source/site.css").status_code, 404)
+
+    def test_media_is_a_file_response_or_handed_to_nginx(self):
+        response = self.client.get("/media/photo.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+
+        with override_settings(FILE_ACCEL_REDIRECT_PREFIX="/protected/"):
+            response = self.client.get("/media/photo.jpg")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected/media/photo.jpg")
+        self.assertEqual(response.content, b"")
+
+    def test_nothing_is_served_unless_turned_on(self):
+        with override_settings(SERVE_FILES=False):
+            self.assertEqual(self.client.get(f"/static/{self.hashed_name}").status_code, 404)
+            self.assertEqual(self.client.get("/media/photo.jpg").status_code, 404)
+
+    def test_static_tag_links_plain_names_without_a_manifest(self):
+        uncollected = Path(self.tmp.name) / "uncollected"
+        uncollected.mkdir()
+        with override_settings(STATIC_ROOT=str(uncollected), DEBUG=False):
+            rendered = Template("{% load static %}{% static 'site.css' %}").render(Context())
+        self.assertEqual(rendered, "/static/site.css")
+
+
+@override_settings(
+    STORAGES={**settings.STORAGES, "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"}},
+    MEDIA_IMAGE_VARIANTS={"thumbnail": 40, "medium": 120},
+)
+class MediaStorageTest(APITestCase):
+    def upload(self, name, size=(300, 150)):
+        buffer = io.BytesIO()
+        PILImage.new("RGB", size, "teal").save(buffer, format="PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    def test_variants_are_rendered_after_commit_and_served_without_storage_lookups(self):
+        category = ProductCategory.objects.create(name="Porter")
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name="Porter", description="", price=Decimal("9.00"), category=category, stock=5, image=self.upload("porter.png")
+            )
+        product.refresh_from_db()
+
+        self.assertEqual(set(product.image_variants), {"thumbnail", "medium"})
+        with default_storage.open(product.image_variants["thumbnail"]) as file:
+            self.assertEqual(PILImage.open(file).size, (40, 20))
+
+        with mock.patch.object(InMemoryStorage, "exists") as exists:
+            response = self.client.get(f"/api/v1/products/{product.pk}/")
+        exists.assert_not_called()
+        self.assertTrue(response.data["image_variants"]["medium"].endswith(".medium.webp"))
+
+        # Saving without touching the image doesn't render the variants again.
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.save()
+        self.assertEqual(callbacks, [])
+
+    def test_copy_media_copies_a_directory_tree_once(self):
+        with tempfile.TemporaryDirectory() as source:
+            (Path(source) / "products").mkdir()
+            (Path(source) / "products" / "ale.png").write_bytes(b"ale")
+            (Path(source) / "notes.txt").write_bytes(b"notes")
+
+            out = io.StringIO()
+            call_command("copy_media", source=source, workers=4, stdout=out)
+            self.assertIn("2 files", out.getvalue())
+            with default_storage.open("products/ale.png") as file:
+                self.assertEqual(file.read(), b"ale")
+
+            out = io.StringIO()
+            call_command("copy_media", source=source, stdout=out)
+            self.assertIn("0 files", out.getvalue())
+            self.assertIn("2 already there", out.getvalue())
+
+
+class MetricsTest(APITestCase):
+    def test_cart_actions_are_counted_and_exposed_to_internal_addresses_only(self):
+        user = User.objects.create_user(email="counter@example.com", username="counter", password=None)
+        category = ProductCategory.objects.create(name="Mild")
+        product = Product.objects.create(
+            name="Mild", description="", price=Decimal("7.00"), category=category, stock=10, image="products/mild.png"
+        )
+        carts_created = product_views.CARTS_CREATED.get(owner="user")
+        self.client.force_authenticate(user)
+
+        self.client.post("/api/v1/cart/add_to_cart/", {"product_id": product.id, "quantity": 2}, format="json")
+        self.client.post("/api/v1/cart/add_to_cart/", {"product_id": product.id, "quantity": 3}, format="json")
+        self.assertEqual(product_views.CARTS_CREATED.get(owner="user"), carts_created + 1)
+
+        self.assertEqual(self.client.get("/internal/metrics/").status_code, 404)
+        with override_settings(METRICS_REQUIRE_TOKEN=False):
+            response = self.client.get("/internal/metrics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        exposition = response.content.decode()
+        self.assertIn("# TYPE kaveri_cart_action_seconds histogram", exposition)
+        self.assertIn(f'kaveri_carts_created_total{{owner="user"}} {float(carts_created + 1)}', exposition)
+        self.assertIn('kaveri_cart_action_seconds_bucket{action="add_to_cart",le="+Inf"}', exposition)
+
+        with override_settings(METRICS_TOKEN="scrape"):
+            self.assertEqual(self.client.get("/internal/metrics/").status_code, 404)
+            self.assertEqual(self.client.get("/internal/metrics/", HTTP_AUTHORIZATION="Bearer scrape").status_code, 200)
+            # Only loopback by default, and no address at all is no match either.
+            for address in ("10.0.0.5", "203.0.113.7", ""):
+                response = self.client.get("/internal/metrics/", REMOTE_ADDR=address, HTTP_AUTHORIZATION="Bearer scrape")
+                self.assertEqual(response.status_code, 404, address)
+
+    def test_values_of_other_processes_are_added_up(self):
+        registry = metrics.Registry()
+        sent = registry.register(metrics.Counter("sent_total", "Sent.", ["kind"], registry=registry))
+        seconds = registry.register(metrics.Histogram("send_seconds", "Sending.", buckets=(0.1, 1), registry=registry))
+        busy = registry.register(metrics.Gauge("busy", "Busy workers.", registry=registry))
+        sent.inc(kind="order")
+        seconds.observe(0.5)
+        busy.set(1)
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            registry.flush()
+            # A worker that has exited since: its counts stay, its gauges go.
+            exited = json.loads((Path(directory) / f"{os.getpid()}.json").read_text())
+            (Path(directory) / "4194305.json").write_text(json.dumps(exited))
+            sent.inc(2, kind="order")
+
+            totals = registry.collect()
+        self.assertEqual(totals["sent_total"], {("order",): 4})
+        self.assertEqual(totals["send_seconds"], {(): [0, 2, 0, 1.0]})
+        self.assertEqual(totals["busy"], {(): 1})
+
+
+class TracingTest(APITestCase):
+    def setUp(self):
+        tracing.init(
+            dsn=None, environment="test", default_rate=0.0, route_rates={"product-list": 1.0}, capture_locally=True
+        )
+        self.addCleanup(sentry_sdk.init)
+        self.transport = sentry_sdk.get_client().transport
+        # As the test client does, so the request doesn't close the test transaction's connection.
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+
+    def get(self, path):
+        # Through the WSGI handler, which Sentry starts the transactions in.
+        environ = RequestFactory().get(path).environ
+        body = WSGIHandler()(environ, lambda status, headers, exc_info=None: None)
+        body.close()
+
+    def test_requests_are_sampled_by_url_name_and_captured_locally(self):
+        category = ProductCategory.objects.create(name="Bitter")
+        Product.objects.create(
+            name="Bitter", description="", price=Decimal("6.00"), category=category, stock=3, image="products/bitter.png"
+        )
+
+        self.get("/api/v1/products/")
+        self.get("/api-docs/")
+
+        [event] = self.transport.transactions()
+        self.assertEqual(event["transaction"], "/api/v1/products/")
+        ops = {span["op"] for span in event["spans"]}
+        self.assertIn("db", ops)
+        self.assertIn("serialize", ops)
+
+    def test_sampler_follows_the_callers_decision(self):
+        sampler = tracing.make_traces_sampler(0.25, {"create-order": 1.0})
+        self.assertEqual(sampler({"wsgi_environ": {"PATH_INFO": "/api/v1/order/"}}), 1.0)
+        self.assertEqual(sampler({"wsgi_environ": {"PATH_INFO": "/api/v1/stores/"}}), 0.25)
+        self.assertEqual(sampler({"wsgi_environ": {"PATH_INFO": "/api/v1/order/"}, "parent_sampled": False}), False)
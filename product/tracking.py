@@ -0,0 +1,66 @@
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from main.background import enqueue
+
+from .email import send_order_status_emails
+from .events import publish_tracking_events
+from .models import Order, OrderTracking
+
+Status = OrderTracking.Status
+
+# Statuses an order may move to from its current status.
+ALLOWED_TRANSITIONS = {
+    Status.PENDING: {Status.SHIPPED},
+    Status.SHIPPED: {Status.DELIVERED},
+    Status.DELIVERED: set(),
+}
+
+
+def can_transition(current_status, new_status) -> bool:
+    return new_status in ALLOWED_TRANSITIONS.get(current_status, set())
+
+
+def bulk_transition_orders(order_ids, new_status, updated_by):
+    """
+    Move orders to ``new_status`` with one bulk INSERT of tracking rows and one UPDATE.
+
+    Orders that can't make the transition (or don't exist) are left untouched.
+    Status emails for the updated orders are queued as a single batch once the
+    transaction commits.
+
+    Returns
+    -------
+    tuple[list[int], dict[int, Optional[str]]]
+        The updated order ids, and the rejected ones mapped to their current status.
+    """
+    order_ids = sorted(set(order_ids))
+    with transaction.atomic():
+        # Lock in id order so concurrent bulk updates can't deadlock.
+        current_statuses = dict(
+            Order.objects.select_for_update().filter(id__in=order_ids).order_by("id").values_list("id", "order_status")
+        )
+        updated = [
+            order_id for order_id, current in current_statuses.items() if can_transition(current, new_status)
+        ]
+
+        if updated:
+            trackings = OrderTracking.objects.bulk_create(
+                [OrderTracking(order_id=order_id, status=new_status, updated_by=updated_by) for order_id in updated]
+            )
+            # bulk_create() skips OrderTracking.save(), so point every order at its new entry here.
+            latest = OrderTracking.objects.filter(order=OuterRef("pk")).order_by("-updated_at", "-id")
+            Order.objects.filter(id__in=updated).update(
+                order_status=new_status,
+                latest_tracking=Subquery(latest.values("pk")[:1]),
+                status_updated_at=Subquery(latest.values("updated_at")[:1]),
+                updated_at=timezone.now(),
+            )
+            transaction.on_commit(lambda: enqueue(send_order_status_emails, updated))
+            # bulk_create() doesn't send post_save, publish the live tracking events here.
+            transaction.on_commit(lambda: publish_tracking_events(trackings))
+
+    updated_ids = set(updated)
+    rejected = {order_id: current_statuses.get(order_id) for order_id in order_ids if order_id not in updated_ids}
+    return updated, rejected
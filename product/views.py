@@ -1,11 +1,29 @@
-from rest_framework import viewsets, response, status, views
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from drf_spectacular.utils import extend_schema
+from rest_framework import mixins, viewsets, response, status, views
 from rest_framework.decorators import action
-from django.shortcuts import get_object_or_404
-from django.db import models
-from datetime import timedelta
+from rest_framework.generics import get_object_or_404
+from rest_framework.settings import api_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import models, transaction
+from datetime import datetime, time, timedelta
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date
+
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from main import metrics
+from main.background import enqueue
+from main.idempotency import idempotent
 
 from .models import (
     Product,
@@ -30,11 +48,54 @@ from .serializers import (
     ShippingSerializer,
     OrderSerializer,
     OrderStatsSerializer,
+    OrderSummarySerializer,
     OrderTrackingSerializer,
+    OrderStatusBulkUpdateSerializer,
     PaymentCreateSerializer,
     StoreSerializer,
+    NearestStoreSerializer,
+    NearestStoreQuerySerializer,
+    WishlistBulkAddSerializer,
 )
 from .email import send_order_status_email, send_payment_success_email
+from .events import get_broker
+from .inventory import InsufficientStock, commit_cart, reserve_cart
+from .exports import EXPORT_FORMATS, export_response
+from .tracking import bulk_transition_orders, can_transition
+from .webhooks import SIGNATURE_HEADER, TIMESTAMP_HEADER, InvalidWebhook, ingest
+
+CARTS_CREATED = metrics.counter("kaveri_carts_created_total", "Carts created, by owner (user or session).", ["owner"])
+CART_ACTION_SECONDS = metrics.histogram("kaveri_cart_action_seconds", "Time spent in the cart actions.", ["action"])
+ORDER_REQUESTS = metrics.counter("kaveri_order_requests_total", "Order placement requests by outcome.", ["result"])
+ORDER_SECONDS = metrics.histogram("kaveri_order_create_seconds", "Time spent placing an order.")
+PAYMENT_REQUESTS = metrics.counter("kaveri_payment_requests_total", "Payment recording requests by outcome.", ["result"])
+PAYMENTS_RECORDED = metrics.counter("kaveri_payments_recorded_total", "Payments recorded, by status.", ["status"])
+
+
+def get_wishlist(request, create=False):
+    """
+    The wishlist of the logged in user, or else of the anonymous session.
+    Returns None when there is none and ``create`` is False.
+    """
+    if request.user.is_authenticated:
+        # If the user is authenticated, get or create a wishlist for the user
+        wishlists = Wishlist.objects.filter(user=request.user)
+        owner = {"user": request.user}
+    else:
+        # If the user is not authenticated, use the session key to identify their wishlist
+        session_key = request.session.session_key
+        if not session_key:
+            if not create:
+                return None
+            request.session.create()
+            session_key = request.session.session_key
+        wishlists = Wishlist.objects.filter(session_key=session_key, user__isnull=True)
+        owner = {"session_key": session_key}
+
+    wishlist = wishlists.order_by("id").first()
+    if wishlist is None and create:
+        wishlist = Wishlist.objects.create(**owner)
+    return wishlist
 
 
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
@@ -54,22 +115,53 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         """
 
         product = get_object_or_404(Product, pk=pk)
+        get_wishlist(request, create=True).products.add(product)
 
-        if request.user.is_authenticated:
-            # If the user is authenticated, get or create a wishlist for the user
-            wishlist, created = Wishlist.objects.get_or_create(user=request.user)
-        else:
-            # If the user is not authenticated, use the session key to identify their wishlist
-            session_key = request.session.session_key
-            if not session_key:
-                request.session.create()
-                session_key = request.session.session_key
+        return response.Response({"status": "Product added to wishlist"}, status=status.HTTP_200_OK)
 
-            wishlist, created = Wishlist.objects.get_or_create(session_key=session_key)
 
-        wishlist.products.add(product)
+class WishlistViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """
+    List, add and remove the products on the user's (or anonymous session's) wishlist.
+    The list is served in one query, products joined with their category.
+    """
 
-        return response.Response({"status": "Product added to wishlist"}, status=status.HTTP_200_OK)
+    serializer_class = ProductSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        wishlist = get_wishlist(self.request)
+        if wishlist is None:
+            return Product.objects.none()
+        return wishlist.products.select_related("category").order_by("name")
+
+    def create(self, request):
+        product = get_object_or_404(Product, pk=request.data.get("product_id"))
+        get_wishlist(request, create=True).products.add(product)
+        return response.Response(self.get_serializer(product).data, status=status.HTTP_201_CREATED)
+
+    def destroy(self, request, pk=None):
+        if not pk.isdigit():
+            return response.Response({"detail": "Product not found."}, status=status.HTTP_404_NOT_FOUND)
+        wishlist = get_wishlist(request)
+        if wishlist is not None:
+            wishlist.products.remove(pk)
+        return response.Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Adds several products at once: ``{"product_ids": [...]}``.
+        """
+        serializer = WishlistBulkAddSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        product_ids = set(serializer.validated_data["product_ids"])
+
+        existing = set(Product.objects.filter(id__in=product_ids).values_list("id", flat=True))
+        get_wishlist(request, create=True).products.add(*existing)
+        return response.Response(
+            {"added": sorted(existing), "not_found": sorted(product_ids - existing)}, status=status.HTTP_200_OK
+        )
 
 
 class ProductCatgeoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -78,11 +170,33 @@ class ProductCatgeoryViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class ReviewViewSet(viewsets.ModelViewSet):
-    queryset = Review.objects.all()
+    """
+    Reviews are listed with their photos prefetched in one query. New reviews
+    wait for moderation; only approved ones are served to non-staff readers.
+    Reviews have no owner to check edits against, so only staff change or
+    delete them, and photos can only be added before moderation.
+    """
     serializer_class = ReviewSerializer
     filterset_fields = [
         "product",
     ]
+    ordering_fields = ["created_at", "rating"]
+    ordering = ["-created_at"]
+
+    def get_permissions(self):
+        if self.action in ("update", "partial_update", "destroy"):
+            return [IsAdminUser()]
+        return super().get_permissions()
+
+    def get_queryset(self):
+        queryset = Review.objects.prefetch_related("photos")
+        if self.request.user.is_staff:
+            return queryset
+        if self.action in ("list", "retrieve"):
+            return queryset.approved()
+        if self.action == "add_photo":
+            return queryset.filter(status=Review.Status.PENDING)
+        return queryset
 
     @action(detail=True, methods=["post"])
     def add_photo(self, request, pk=None):
@@ -91,7 +205,6 @@ class ReviewViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             photo = serializer.save()
             review.photos.add(photo)
-            review.save()
             return response.Response({"message": "Photo added successfully."}, status=status.HTTP_201_CREATED)
         else:
             return response.Response(
@@ -111,7 +224,11 @@ class CartViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user_id = self.request.user.is_authenticated
         if user_id:
-            return Cart.objects.filter(user=user_id, is_order_created=False).order_by('-created_at')[:1]
+            return (
+                Cart.objects.filter(user=user_id, is_order_created=False)
+                .prefetch_related("cartitem_set__product")
+                .order_by('-created_at')[:1]
+            )
         else:
             return Cart.objects.none()
 
@@ -139,9 +256,12 @@ class CartViewSet(viewsets.ModelViewSet):
                 self.request.session.create()  # Ensure a session is created if not already present
                 session_key = self.request.session.session_key
             cart, created = Cart.objects.get_or_create(session_key=session_key)
+        if created:
+            CARTS_CREATED.inc(owner="user" if self.request.user.is_authenticated else "session")
         return cart
 
     @action(detail=False, methods=["post"])
+    @CART_ACTION_SECONDS.timed(action="add_to_cart")
     def add_to_cart(self, request, pk=None):
         """
         Adds a product to the cart.
@@ -162,7 +282,27 @@ class CartViewSet(viewsets.ModelViewSet):
             {"message": "Item added to cart successfully", "total_quantity": cart_item.quantity}, status=status.HTTP_200_OK
         )
 
+    @action(detail=False, methods=["post"])
+    @CART_ACTION_SECONDS.timed(action="checkout")
+    def checkout(self, request, pk=None):
+        """
+        Reserves stock for the whole cart until the order is placed, or until the
+        reservation goes stale (``STOCK_RESERVATION_TTL``).
+        """
+        cart = self.get_or_create_cart()
+        try:
+            quantities = reserve_cart(cart)
+        except InsufficientStock as exc:
+            return response.Response(
+                {"detail": "Not enough stock", "product_ids": exc.product_ids}, status=status.HTTP_409_CONFLICT
+            )
+        expires = timezone.now() + settings.STOCK_RESERVATION_TTL
+        return response.Response(
+            {"cart": cart.id, "reserved": quantities, "expires": expires}, status=status.HTTP_200_OK
+        )
+
     @action(detail=True, methods=["post"])
+    @CART_ACTION_SECONDS.timed(action="remove_from_cart")
     def remove_from_cart(self, request, pk=None):
         """
         Removes a product from the cart.
@@ -179,6 +319,7 @@ class CartViewSet(viewsets.ModelViewSet):
         return response.Response({"message": "Item removed from cart successfully"}, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=["post"])
+    @CART_ACTION_SECONDS.timed(action="update_quantity")
     def update_quantity(self, request, pk=None):
         cart = self.get_or_create_cart()
         item_id = request.data.get("item_id")
@@ -225,34 +366,40 @@ class ShippingView(views.APIView):
 class OrderView(views.APIView):
     def post(self, request, *args, **kwargs):
         """Create an order from the cart and shipping details."""
+        with ORDER_SECONDS.time():
+            result = self.create_order(request)
+        ORDER_REQUESTS.inc(result={201: "created", 400: "invalid", 409: "out_of_stock"}.get(result.status_code, "error"))
+        return result
+
+    def create_order(self, request):
         cart_id = request.data.get("cart_id")
         shipping_id = request.data.get("shipping_id")
 
         try:
             cart = Cart.objects.get(id=cart_id)
             shipping = Shipping.objects.get(id=shipping_id)
-            from decimal import Decimal
-            total_price = cart.get_total_price() + Decimal(request.data.get("delivery_charge", 0.0))
-
-            order = Order.objects.create(
-                cart=cart,
-                shipping=shipping,
-                total_price=total_price,
-                delivery_charge=request.data.get("delivery_charge", 0.0),
-                order_status="Pending",
-            )
-            cart.is_order_created = True
-            cart.save()
+
+            with transaction.atomic():
+                # Takes the stock for good, whether or not the cart went through checkout first.
+                commit_cart(cart)
+                # Priced by Order.save() from the cart; a client-sent delivery_charge is ignored.
+                order = Order.objects.create(cart=cart, shipping=shipping, order_status="Pending")
+                cart.is_order_created = True
+                cart.save()
             serializer = OrderSerializer(order)
             return response.Response(serializer.data, status=status.HTTP_201_CREATED)
 
         except (Cart.DoesNotExist, Shipping.DoesNotExist):
             return response.Response({"detail": "Invalid cart or shipping ID"}, status=status.HTTP_400_BAD_REQUEST)
+        except InsufficientStock as exc:
+            return response.Response(
+                {"detail": "Not enough stock", "product_ids": exc.product_ids}, status=status.HTTP_409_CONFLICT
+            )
 
     def get(self, request, *args, **kwargs):
         """Get details of an order."""
         try:
-            order = Order.objects.get(id=kwargs["order_id"])
+            order = Order.objects.with_line_items().get(id=kwargs["order_id"])
             serializer = OrderSerializer(order)
             return response.Response(serializer.data, status=status.HTTP_200_OK)
         except Order.DoesNotExist:
@@ -305,16 +452,206 @@ class OrderStatsView(views.APIView):
 class OrderReadOnlyViewSet(viewsets.ReadOnlyModelViewSet):
     """
     A read-only viewset for viewing orders.
+
+    The list returns a summary per order (item count and totals are annotated),
+    line items are only rendered on the detail endpoint.
     """
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = Order.objects.all()
-        if self.request.user.is_authenticated:
-            queryset = queryset.filter(cart__user=self.request.user).order_by('-created_at')
-        return queryset
+        queryset = Order.objects.filter(cart__user=self.request.user).order_by('-created_at')
+        if self.action == "list":
+            return queryset.with_summary()
+        return queryset.with_line_items()
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return OrderSummarySerializer
+        return OrderSerializer
+
+
+class OrderExportView(views.APIView):
+    """
+    Staff-only streaming export of orders with their shipping, payment and line items.
+
+    Query parameters: ``start`` and ``end`` dates (inclusive, YYYY-MM-DD) and
+    ``file_format`` (``csv`` or ``ndjson``).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            start = parse_date(request.query_params.get("start", ""))
+            end = parse_date(request.query_params.get("end", ""))
+        except ValueError:  # Well formed but impossible, e.g. 2024-02-30.
+            start = end = None
+        file_format = request.query_params.get("file_format", "csv")
+
+        if start is None or end is None or start > end:
+            return response.Response(
+                {"error": "start and end dates (YYYY-MM-DD) are required."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        if file_format not in EXPORT_FORMATS:
+            return response.Response(
+                {"error": f"file_format must be one of {', '.join(EXPORT_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Half-open datetime range so the created_at index can be used.
+        orders = Order.objects.filter(
+            created_at__gte=timezone.make_aware(datetime.combine(start, time.min)),
+            created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+        )
+        return export_response(orders, file_format)
+
+
+class OrderStatusBulkUpdateView(views.APIView):
+    """
+    Staff-only bulk status transition, e.g. when the warehouse ships a batch of orders.
+    Orders that can't move to the requested status are reported back untouched.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = OrderStatusBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        updated, rejected = bulk_transition_orders(
+            serializer.validated_data["order_ids"], serializer.validated_data["status"], request.user.username
+        )
+        return response.Response(
+            {
+                "updated": updated,
+                "rejected": [{"id": order_id, "order_status": current} for order_id, current in rejected.items()],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+def user_orders(user):
+    """
+    Orders the user may follow: their own, or every order for staff.
+    """
+    if user.is_staff:
+        return Order.objects.all()
+    return Order.objects.filter(cart__user=user)
+
+
+class OrderStatusView(views.APIView):
+    """
+    Polling fallback for live tracking. Answers 304 Not Modified while the
+    client's ETag still matches the order's latest tracking entry.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, order_id):
+        order = (
+            user_orders(request.user)
+            .filter(id=order_id)
+            .values("id", "order_status", "latest_tracking_id", "status_updated_at", "created_at")
+            .first()
+        )
+        if order is None:
+            return response.Response({"detail": "Order not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        etag = f'"{order["id"]}-{order["latest_tracking_id"] or 0}"'
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date((order["status_updated_at"] or order["created_at"]).timestamp()),
+            "Cache-Control": "private, no-cache",
+        }
+        if etag in request.headers.get("If-None-Match", ""):
+            return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        data = {
+            "order": order["id"],
+            "order_status": order["order_status"],
+            "status_updated_at": order["status_updated_at"],
+        }
+        return response.Response(data, status=status.HTTP_200_OK, headers=headers)
+
+
+def _authenticate_event_stream(request):
+    """
+    Authenticates with the Authorization header, or a ``token`` query parameter
+    since browsers' EventSource can't send headers.
+    """
+    authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else request.GET.get("token", "").encode()
+    if not raw_token:
+        return None
+    try:
+        return authenticator.get_user(authenticator.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _get_watched_order(request, order_id):
+    user = _authenticate_event_stream(request)
+    if user is None:
+        return None, HttpResponse(status=status.HTTP_401_UNAUTHORIZED)
+    order = user_orders(user).filter(id=order_id).values("id").first()
+    if order is None:
+        return None, HttpResponse(status=status.HTTP_404_NOT_FOUND)
+    return order, None
+
+
+def _server_sent_event(event_type, data, event_id=None):
+    lines = [f"event: {event_type}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def order_events(request, order_id):
+    """
+    Server-sent events stream of an order's tracking updates (serve under ASGI).
+
+    Sends the current status first, then a ``status`` event per tracking insert.
+    The stream ends once the order is delivered or after
+    ``ORDER_EVENTS_MAX_STREAM_SECONDS``; EventSource reconnects by itself.
+    """
+    order, error = await sync_to_async(_get_watched_order)(request, order_id)
+    if error is not None:
+        return error
+
+    async def stream():
+        broker = get_broker()
+        queue = await broker.subscribe(order["id"])
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.ORDER_EVENTS_MAX_STREAM_SECONDS
+        try:
+            # Read the current status only once subscribed, so no update can slip in between.
+            current = await sync_to_async(
+                Order.objects.filter(id=order["id"]).values("order_status", "latest_tracking_id").get
+            )()
+            seen = current["latest_tracking_id"] or 0
+            yield f"retry: {settings.ORDER_EVENTS_HEARTBEAT * 1000}\n\n"
+            yield _server_sent_event(
+                "status", {"order": order["id"], "status": current["order_status"]}, current["latest_tracking_id"]
+            )
+            status_ = current["order_status"]
+            while status_ != OrderTracking.Status.DELIVERED and loop.time() < deadline:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=settings.ORDER_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event["tracking_id"] <= seen:
+                    continue  # Already part of the status sent first.
+                seen = event["tracking_id"]
+                status_ = event["status"]
+                yield _server_sent_event("status", event, event["tracking_id"])
+        finally:
+            await broker.unsubscribe(order["id"], queue)
+
+    event_stream = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    event_stream["Cache-Control"] = "no-cache"
+    event_stream["X-Accel-Buffering"] = "no"
+    return event_stream
 
 
 class OrderTrackingViewSet(viewsets.ModelViewSet):
@@ -326,49 +663,117 @@ class OrderTrackingViewSet(viewsets.ModelViewSet):
         Creates a new tracking entry for an order. This can be used by an admin
         to update the status of an order.
         """
-        order_id = request.data.get('order')
-        order = Order.objects.filter(id=order_id).first()
-
-        if not order:
+        order_id = str(request.data.get('order', ''))
+        if not order_id.isdigit() or not Order.objects.filter(id=order_id).exists():
             return response.Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
 
         serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            serializer.save()
-            send_order_status_email(order)
-            return response.Response(serializer.data, status=status.HTTP_201_CREATED)
-        return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            # Same rules and lock as bulk_transition_orders, OrderTracking.save() moves the order's status.
+            order = Order.objects.select_for_update().get(id=order_id)
+            new_status = serializer.validated_data["status"]
+            if not can_transition(order.order_status, new_status):
+                return response.Response(
+                    {"error": f"An order can't go from {order.order_status} to {new_status}."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            tracking = serializer.save(order=order)
+            transaction.on_commit(lambda: enqueue(send_order_status_email, tracking.order))
+        return response.Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def list(self, request, *args, **kwargs):
         """
         Retrieves the order tracking history for a specific order.
         """
         order_id = request.query_params.get('order_id')
-        if not order_id:
+        if not order_id or not order_id.isdigit():
             return response.Response({"error": "Order ID is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        order = Order.objects.filter(id=order_id).first()
-        if not order:
+        # Newest first, straight off the (order, updated_at) index.
+        tracking_entries = list(OrderTracking.objects.filter(order_id=order_id))
+        if not tracking_entries and not Order.objects.filter(id=order_id).exists():
             return response.Response({"error": "Order not found."}, status=status.HTTP_404_NOT_FOUND)
 
-        tracking_entries = OrderTracking.objects.filter(order=order)
         serializer = self.get_serializer(tracking_entries, many=True)
         return response.Response(serializer.data, status=status.HTTP_200_OK)
 
 
 class PaymentViewSet(viewsets.ModelViewSet):
-    queryset = Payment.objects.all()
+    """
+    Records payments idempotently: replaying a gateway transaction returns the
+    payment already recorded for it (200) instead of a duplicate row, and
+    requests sent with an ``Idempotency-Key`` get the stored response back. A
+    different payment for an already paid order is a 409.
+
+    Customers record a pending payment of the order's total, only staff set the
+    status and amount; the gateway completes payments through the webhook.
+    """
     serializer_class = PaymentCreateSerializer
+    permission_classes = [IsAuthenticated]
+    http_method_names = ["get", "post", "head", "options"]
 
+    def get_queryset(self):
+        return Payment.objects.filter(order__in=user_orders(self.request.user)).select_related("order")
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            payment = serializer.save()
-            send_payment_success_email(payment)
-            return response.Response(serializer.data, status=status.HTTP_201_CREATED)
-        return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if not serializer.is_valid():
+            PAYMENT_REQUESTS.inc(result="invalid")
+            return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        payment = serializer.save()
+        if not serializer.created:
+            data = serializer.validated_data
+            recorded = (payment.order_id, payment.payment_method, payment.transaction_id, payment.amount)
+            if recorded != (data["order"].id, data["payment_method"], data["transaction_id"], data["amount"]):
+                PAYMENT_REQUESTS.inc(result="conflict")
+                return response.Response(
+                    {"detail": "A different payment was already recorded for this order or transaction."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            PAYMENT_REQUESTS.inc(result="replayed")
+            return response.Response(serializer.data, status=status.HTTP_200_OK)
+
+        PAYMENT_REQUESTS.inc(result="created")
+        PAYMENTS_RECORDED.inc(status=payment.payment_status)
+        if payment.payment_status == Payment.PaymentStatus.COMPLETED:
+            transaction.on_commit(lambda: enqueue(send_payment_success_email, payment))
+        return response.Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class PaymentWebhookView(views.APIView):
+    """
+    Receives payment gateway webhooks. The signed event is appended to the
+    event log and acknowledged straight away; ``process_payment_events``
+    applies it to the payment.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        try:
+            ingest(request.body, request.headers.get(TIMESTAMP_HEADER), request.headers.get(SIGNATURE_HEADER))
+        except InvalidWebhook as exc:
+            return response.Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return response.Response({"received": True}, status=status.HTTP_200_OK)
 
 
 class StoreViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Store.objects.all()  # Query for all stores
     serializer_class = StoreSerializer  # Use the StoreSerializer
+
+    @extend_schema(parameters=[NearestStoreQuerySerializer], responses=NearestStoreSerializer(many=True))
+    @action(detail=False, methods=["get"])
+    def nearest(self, request):
+        """
+        The ``k`` stores closest to ``?lat=&lon=``, nearest first.
+        """
+        query = NearestStoreQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        point = Point(query.validated_data["lon"], query.validated_data["lat"], srid=4326)
+        stores = Store.objects.nearest(point, query.validated_data["k"])
+        return response.Response(NearestStoreSerializer(stores, many=True).data)
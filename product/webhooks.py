@@ -0,0 +1,260 @@
+"""
+Payment gateway webhooks.
+
+Deliveries are verified and appended to ``PaymentEvent`` verbatim, so the webhook
+answers after a single INSERT however hard the gateway is bursting. The
+``process_payment_events`` worker then applies pending events to ``Payment`` in
+batches, in arrival order.
+
+Deliveries are signed with HMAC-SHA256 over ``"<timestamp>.<body>"`` using
+``PAYMENT_WEBHOOK_SECRET``, sent in the ``X-Webhook-Timestamp`` and
+``X-Webhook-Signature`` headers. Event bodies look like::
+
+    {"id": "evt_1", "type": "payment.succeeded",
+     "data": {"order": 1, "payment_method": "Credit Card", "transaction_id": "txn_1", "amount": "60.00"}}
+"""
+
+import hashlib
+import hmac
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from main.background import enqueue
+
+from .email import send_payment_success_emails
+from .models import Order, Payment, PaymentEvent
+
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+PaymentStatus = Payment.PaymentStatus
+
+# Payment status each event type moves a payment to. Other event types are stored and marked processed.
+EVENT_STATUSES = {
+    "payment.pending": PaymentStatus.PENDING,
+    "payment.succeeded": PaymentStatus.COMPLETED,
+    "payment.failed": PaymentStatus.FAILED,
+}
+
+# Settled payments aren't changed by late or out of order deliveries.
+FINAL_STATUSES = {PaymentStatus.COMPLETED, PaymentStatus.FAILED}
+
+PROCESS_BATCH_SIZE = 500
+
+
+class InvalidWebhook(Exception):
+    pass
+
+
+def sign(body: bytes, timestamp: int, secret: str = None) -> str:
+    secret = secret or settings.PAYMENT_WEBHOOK_SECRET
+    return hmac.new(secret.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+
+
+def verify(body: bytes, timestamp, signature):
+    if not settings.PAYMENT_WEBHOOK_SECRET:
+        raise InvalidWebhook("Payment webhooks are not configured.")
+    try:
+        timestamp = int(timestamp)
+    except (TypeError, ValueError):
+        raise InvalidWebhook(f"Missing or malformed {TIMESTAMP_HEADER}.")
+    if abs(time.time() - timestamp) > settings.PAYMENT_WEBHOOK_TOLERANCE:
+        raise InvalidWebhook("Webhook timestamp is too old.")
+    if not signature or not hmac.compare_digest(sign(body, timestamp), signature):
+        raise InvalidWebhook("Invalid webhook signature.")
+
+
+def parse_event(body: bytes) -> PaymentEvent:
+    try:
+        payload = json.loads(body)
+        data = payload["data"]
+        event = PaymentEvent(
+            event_id=str(payload["id"]),
+            event_type=str(payload["type"]),
+            payment_method=str(data["payment_method"]),
+            transaction_id=str(data["transaction_id"]),
+            payload=payload,
+        )
+        event.clean_fields(exclude=["received_at"])
+    except (ValueError, KeyError, TypeError, ValidationError) as exc:
+        raise InvalidWebhook("Malformed payment event.") from exc
+    return event
+
+
+def ingest(body: bytes, timestamp, signature) -> PaymentEvent:
+    """
+    Verify a webhook delivery and append it to the event log. Redeliveries of an
+    event already stored are accepted and ignored.
+    """
+    verify(body, timestamp, signature)
+    event = parse_event(body)
+    PaymentEvent.objects.bulk_create([event], ignore_conflicts=True)
+    return event
+
+
+def _event_order_id(event):
+    try:
+        return int(event.payload["data"]["order"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _event_amount(event):
+    try:
+        amount = Decimal(str(event.payload["data"]["amount"]))
+        # Amounts the column can't hold would fail the insert.
+        return Payment._meta.get_field("amount").clean(amount, None)
+    except (KeyError, InvalidOperation, ValidationError):
+        return None
+
+
+def _current_payments(events):
+    """
+    The payments the events are about by (payment_method, transaction_id), and the
+    orders of the events a new payment can still be recorded for.
+    """
+    keys = {(event.payment_method, event.transaction_id) for event in events}
+    payments = {
+        (payment.payment_method, payment.transaction_id): payment
+        for payment in Payment.objects.filter(transaction_id__in={transaction_id for _, transaction_id in keys})
+        if (payment.payment_method, payment.transaction_id) in keys
+    }
+    payable_orders = set(
+        Order.objects.filter(id__in={_event_order_id(event) for event in events}, payment__isnull=True).values_list(
+            "id", flat=True
+        )
+    )
+    return payments, payable_orders
+
+
+def _apply(event, payments, payable_orders):
+    """
+    Apply an event to the payments in memory.
+
+    Returns
+    -------
+    Optional[tuple[Payment, bool]]
+        The changed payment and whether it is new, or None when nothing changes.
+    """
+    new_status = EVENT_STATUSES.get(event.event_type)
+    if new_status is None:
+        return None
+    key = (event.payment_method, event.transaction_id)
+    payment = payments.get(key)
+
+    if payment is None:
+        order_id, amount = _event_order_id(event), _event_amount(event)
+        if order_id not in payable_orders or amount is None:
+            event.error = "Event has no valid amount, or its order doesn't exist or is already paid."
+            return None
+        payable_orders.discard(order_id)
+        payment = payments[key] = Payment(
+            order_id=order_id,
+            payment_method=event.payment_method,
+            transaction_id=event.transaction_id,
+            amount=amount,
+            payment_status=new_status,
+        )
+        return payment, True
+    if payment.payment_status in FINAL_STATUSES or payment.payment_status == new_status:
+        return None
+    payment.payment_status = new_status
+    return payment, False
+
+
+def _apply_one_by_one(events):
+    """
+    Apply the events each in its own savepoint, recording the ones the database
+    rejects in their ``error``. Returns the keys of the payments completed.
+    """
+    payments, payable_orders = _current_payments(events)
+    completed = set()
+    for event in events:
+        event.error = ""
+        change = _apply(event, payments, payable_orders)
+        if change is None:
+            continue
+        payment, new = change
+        key = (payment.payment_method, payment.transaction_id)
+        try:
+            with transaction.atomic():
+                if new:
+                    payment.save(force_insert=True)
+                else:
+                    payment.save(update_fields=["payment_status"])
+        except (DataError, IntegrityError) as exc:
+            event.error = f"The database rejected the event: {exc}"
+            # Later events must see what was actually stored.
+            if new:
+                del payments[key]
+                payable_orders.add(payment.order_id)
+            else:
+                payment.refresh_from_db(fields=["payment_status"])
+            continue
+        if payment.payment_status == PaymentStatus.COMPLETED:
+            completed.add(key)
+    return completed
+
+
+def process_pending_events(batch_size=PROCESS_BATCH_SIZE) -> int:
+    """
+    Apply the oldest pending events to their payments in one transaction.
+
+    Payments are created and updated with one bulk statement each, and confirmation
+    emails for newly completed payments are queued as one batch after commit.
+    Events that can't be applied are marked processed with an ``error``. Should the
+    database reject the bulk statements, the events are applied one by one instead,
+    so a bad event can't hold up the others.
+
+    Returns
+    -------
+    int
+        The number of events processed; 0 once the queue is empty.
+    """
+    with transaction.atomic():
+        # Rows are locked in arrival order, so a second worker waits instead of applying later events first.
+        events = list(
+            PaymentEvent.objects.select_for_update().filter(processed_at__isnull=True).order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        payments, payable_orders = _current_payments(events)
+        created, updated, completed = {}, {}, set()
+        for event in events:
+            change = _apply(event, payments, payable_orders)
+            if change is None:
+                continue
+            payment, new = change
+            key = (payment.payment_method, payment.transaction_id)
+            if new:
+                created[key] = payment
+            elif key not in created:
+                updated[key] = payment
+            if payment.payment_status == PaymentStatus.COMPLETED:
+                completed.add(key)
+
+        try:
+            with transaction.atomic():
+                Payment.objects.bulk_create(created.values())
+                Payment.objects.bulk_update(updated.values(), ["payment_status"])
+        except (DataError, IntegrityError):
+            completed = _apply_one_by_one(events)
+            payments, _ = _current_payments(events)
+
+        now = timezone.now()
+        for event in events:
+            event.processed_at = now
+        PaymentEvent.objects.bulk_update(events, ["processed_at", "error"])
+
+        completed_ids = [payments[key].id for key in completed]
+        if completed_ids:
+            transaction.on_commit(lambda: enqueue(send_payment_success_emails, completed_ids))
+
+    return len(events)
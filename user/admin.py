@@ -9,6 +9,9 @@ class BeerClubMemberAdmin(admin.ModelAdmin):
     search_fields = ("first_name", "last_name", "email")
     list_filter = ("created_at",)
     ordering = ("-created_at",)
+    readonly_fields = ("created_at", "notified_at")
+    # Skip the unfiltered COUNT(*) on every changelist page, these tables grow large.
+    show_full_result_count = False
 
 
 class ContactMessageAdmin(admin.ModelAdmin):
@@ -16,6 +19,8 @@ class ContactMessageAdmin(admin.ModelAdmin):
     search_fields = ("name", "email")
     list_filter = ("created_at",)
     ordering = ("-created_at",)
+    readonly_fields = ("created_at", "notified_at")
+    show_full_result_count = False
 
 
 class ProfileInline(admin.StackedInline):
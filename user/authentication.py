@@ -0,0 +1,100 @@
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.utils import extend_schema_serializer
+from rest_framework import serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import User
+
+# User fields copied into every issued token. ``request.user`` is rebuilt from
+# these claims, anything else on the model is loaded lazily on first access.
+TOKEN_USER_CLAIMS = (
+    "email",
+    "username",
+    "first_name",
+    "last_name",
+    "full_name",
+    "is_verified",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+)
+
+
+def add_user_claims(token, user):
+    """
+    Copy the user fields listed in ``TOKEN_USER_CLAIMS`` into the token.
+    Access tokens derived from a refresh token inherit these claims.
+    """
+    for claim in TOKEN_USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+def get_tokens_for_user(user) -> RefreshToken:
+    """
+    Issue a refresh token (and through it an access token) carrying the user claims.
+    """
+    return add_user_claims(RefreshToken.for_user(user), user)
+
+
+def user_from_token(validated_token) -> User:
+    """
+    Build a ``User`` instance from the token claims without a database query.
+
+    Fields that are not part of the token stay deferred, so Django only loads
+    them (one query per field) if a view actually reads them, e.g. the password
+    hash in ``ChangePasswordSerializer``. Saving such an instance only writes
+    the loaded fields, minus ``User.PRIVILEGE_FIELDS``: the claims may be older
+    than the row.
+    """
+    claims = {claim: validated_token[claim] for claim in TOKEN_USER_CLAIMS}
+    claims[User._meta.pk.attname] = validated_token[api_settings.USER_ID_CLAIM]
+
+    field_names = [field.attname for field in User._meta.concrete_fields if field.attname in claims]
+    user = User.from_db(router.db_for_read(User), field_names, [claims[name] for name in field_names])
+    user.claims_from_token = True
+    return user
+
+
+@extend_schema_serializer(component_name="TokenRefresh")
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that reloads the user, so access tokens never outlive a deactivation
+    or carry privileges the user no longer has: inactive or deleted users get no
+    new token, and the claims are stamped again from the row.
+    """
+
+    refresh = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(_("No active account found for the given token."), code="no_active_account")
+        add_user_claims(refresh, user)
+        return super().validate({**attrs, "refresh": str(refresh)})
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the user claims of the access token
+    instead of loading the ``User`` row on every request.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        if any(claim not in validated_token for claim in TOKEN_USER_CLAIMS):
+            # Tokens issued before the claims were added still need the lookup.
+            return super().get_user(validated_token)
+
+        user = user_from_token(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
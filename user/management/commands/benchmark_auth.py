@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from user.authentication import StatelessJWTAuthentication, get_tokens_for_user
+from user.models import User
+from user.views import ProfileView
+
+
+class Command(BaseCommand):
+    help = "Measure the per-request overhead of JWT authentication against the profile endpoint."
+
+    backends = (
+        ("db-lookup", JWTAuthentication),
+        ("stateless", StatelessJWTAuthentication),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Authenticated requests per backend.")
+
+    def handle(self, *args, **options):
+        total = options["requests"]
+        factory = APIRequestFactory()
+
+        # The benchmark user only lives inside this transaction.
+        with transaction.atomic():
+            user = User.objects.create_user(
+                email="benchmark-auth@example.com", username="benchmark-auth", password=None, is_verified=True
+            )
+            header = f"Bearer {get_tokens_for_user(user).access_token}"
+
+            for name, backend in self.backends:
+                view = ProfileView.as_view(authentication_classes=[backend])
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    for _ in range(total):
+                        view(factory.get("/api/v1/profile/", HTTP_AUTHORIZATION=header))
+                    elapsed = time.perf_counter() - started
+
+                self.stdout.write(
+                    f"{name:<10} {elapsed / total * 1e6:8.1f} us/request"
+                    f" {len(queries) / total:5.2f} queries/request"
+                    f" {total / elapsed:9.0f} requests/s"
+                )
+
+            transaction.set_rollback(True)
@@ -0,0 +1,58 @@
+import os
+import time
+
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Report password checks per second on one core for each hasher configuration, "
+        "to pick DJANGO_PASSWORD_* costs that fit the login latency budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "configs",
+            nargs="*",
+            default=["pbkdf2:260000", "pbkdf2:600000", "pbkdf2:1000000", "argon2:2:102400:8", "argon2:3:65536:4"],
+            help="pbkdf2:<iterations> or argon2:<time_cost>:<memory_cost>:<parallelism>",
+        )
+        parser.add_argument("--checks", type=int, default=20, help="Password checks timed per configuration.")
+
+    def get_hasher(self, config):
+        name, *costs = config.split(":")
+        try:
+            costs = [int(cost) for cost in costs]
+            if name == "pbkdf2":
+                hasher = PBKDF2PasswordHasher()
+                (hasher.iterations,) = costs
+            elif name == "argon2":
+                hasher = Argon2PasswordHasher()
+                hasher.time_cost, hasher.memory_cost, hasher.parallelism = costs
+            else:
+                raise ValueError
+        except ValueError:
+            raise CommandError(f"Invalid hasher configuration: {config}")
+        return hasher
+
+    def handle(self, *args, **options):
+        checks = options["checks"]
+        cores = os.cpu_count() or 1
+        self.stdout.write(f"{'configuration':<24} {'ms/check':>9} {'logins/s/core':>14} {'logins/s ({} cores)'.format(cores):>20}")
+
+        for config in options["configs"]:
+            hasher = self.get_hasher(config)
+            try:
+                encoded = hasher.encode("benchmark-password", hasher.salt())
+            except ValueError as exc:
+                # Raised when the hasher library (e.g. argon2-cffi) is not installed.
+                self.stderr.write(f"{config:<24} skipped: {exc}")
+                continue
+
+            started = time.perf_counter()
+            for _ in range(checks):
+                hasher.verify("benchmark-password", encoded)
+            per_check = (time.perf_counter() - started) / checks
+
+            self.stdout.write(f"{config:<24} {per_check * 1000:9.1f} {1 / per_check:14.1f} {cores / per_check:20.1f}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from user.models import Recovery
+
+
+class Command(BaseCommand):
+    help = "Delete expired password recovery tokens in a single DELETE statement."
+
+    def handle(self, *args, **options):
+        deleted, _ = Recovery.objects.expired().delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired recoveries"))
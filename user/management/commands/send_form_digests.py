@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from user.submissions import send_form_digests
+
+
+class Command(BaseCommand):
+    help = "Email staff a digest of the beer club signups and contact messages received since the last one."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=1000, help="Most submissions per form in one digest.")
+
+    def handle(self, *args, **options):
+        sent = send_form_digests(options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} submissions in digests"))
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:42
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_tokens(apps, schema_editor):
+    Recovery = apps.get_model("user", "Recovery")
+    for recovery in Recovery.objects.all():
+        recovery.token_digest = hashlib.sha256(recovery.token.encode()).hexdigest()
+        recovery.save(update_fields=["token_digest"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0007_alter_contactmessage_phone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recovery',
+            name='token_digest',
+            field=models.CharField(editable=False, max_length=64, null=True, verbose_name='token digest'),
+        ),
+        migrations.RunPython(hash_existing_tokens, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='recovery',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='recovery',
+            name='token_digest',
+            field=models.CharField(editable=False, max_length=64, unique=True, verbose_name='token digest'),
+        ),
+        migrations.AlterField(
+            model_name='recovery',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='created at'),
+        ),
+    ]
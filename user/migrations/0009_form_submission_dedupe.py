@@ -0,0 +1,95 @@
+# Generated by Django 4.2.17 on 2026-10-19 05:59
+
+import hashlib
+
+from django.db import migrations, models
+from django.utils import timezone
+
+HASHED_FIELDS = {
+    "BeerClubMember": ("email",),
+    "ContactMessage": ("email", "message"),
+}
+
+
+def content_hash(row, fields):
+    content = "\x1f".join(" ".join(str(getattr(row, field) or "").split()).lower() for field in fields)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def hash_and_dedupe(apps, schema_editor):
+    now = timezone.now()
+    for model_name, fields in HASHED_FIELDS.items():
+        model = apps.get_model("user", model_name)
+        seen = set()
+        duplicates = []
+        rows = []
+        for row in model.objects.order_by("id").iterator():
+            row.content_hash = content_hash(row, fields)
+            if row.content_hash in seen:
+                duplicates.append(row.id)
+            else:
+                seen.add(row.content_hash)
+                # Submissions from before digests existed aren't sent out again.
+                row.notified_at = now
+                rows.append(row)
+        model.objects.filter(id__in=duplicates).delete()
+        model.objects.bulk_update(rows, ["content_hash", "notified_at"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0008_recovery_token_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beerclubmember',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='beerclubmember',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='contactmessage',
+            name='notified_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(hash_and_dedupe, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='beerclubmember',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='contactmessage',
+            name='content_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='beerclubmember',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='contactmessage',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='beerclubmember',
+            index=models.Index(condition=models.Q(('notified_at__isnull', True)), fields=['id'], name='beerclubmember_unnotified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(condition=models.Q(('notified_at__isnull', True)), fields=['id'], name='contactmessage_unnotified_idx'),
+        ),
+    ]
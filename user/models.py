@@ -1,5 +1,9 @@
+import hashlib
+import secrets
+
 from django.contrib.auth.models import AbstractUser, Group, Permission
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.core.mail import send_mail
 from django.conf import settings
@@ -21,6 +25,9 @@ class User(AbstractUser):
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
+    # Copied into tokens, but never written back from an instance built out of token claims
+    # (``claims_from_token``), whose values may be older than the row's.
+    PRIVILEGE_FIELDS = ("is_active", "is_staff", "is_superuser")
 
     def get_full_name(self):
         return " ".join([name for name in [self.first_name, self.last_name] if name]) or self.email
@@ -31,11 +38,31 @@ class User(AbstractUser):
 
         if not self.pk:
             self.full_name = self.get_full_name()
+        if getattr(self, "claims_from_token", False) and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.attname
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname in self.__dict__ and field.attname not in self.PRIVILEGE_FIELDS
+            ]
         super().save(*args, **kwargs)
         # Send email when is_verified is set to True
         # if is_new_verified:
         #     self.send_verification_email()
 
+    def send_recovery_email(self):
+        """
+        Issue a password recovery token and email it to the user.
+        """
+        token = Recovery.issue(self)
+        hours = int(settings.PASSWORD_RECOVERY_TOKEN_TTL.total_seconds() // 3600)
+        send_mail(
+            "Reset your password",
+            f"Use this code to choose a new password for {self.username}, within {hours} hours:\n\n{token}\n\n"
+            "If you didn't ask for it, you can ignore this email.",
+            settings.DEFAULT_FROM_EMAIL,
+            [self.email],
+        )
+
     def send_verification_email(self):
 
         subject = "Your Account Has Been Verified"
@@ -178,8 +205,24 @@ class Profile(models.Model):
         return self.business_name or f"Profile of {self.user.email}"
 
 
+class RecoveryQuerySet(models.QuerySet):
+    def _expiry_cutoff(self):
+        return timezone.now() - settings.PASSWORD_RECOVERY_TOKEN_TTL
+
+    def valid(self):
+        return self.filter(created_at__gte=self._expiry_cutoff())
+
+    def expired(self):
+        return self.filter(created_at__lt=self._expiry_cutoff())
+
+
 class Recovery(models.Model):
-    """Password recovery"""
+    """Password recovery
+
+    Only the SHA-256 digest of the token is stored. Tokens are random and
+    long enough that an unsalted digest can't be brute forced, and the digest
+    gives a unique index to look the token up in one query.
+    """
 
     user = models.ForeignKey(
         User,
@@ -187,8 +230,10 @@ class Recovery(models.Model):
         on_delete=models.CASCADE,
     )
 
-    created_at = models.DateTimeField(verbose_name=_("created at"), auto_now_add=True)
-    token = models.CharField(verbose_name=_("token"), max_length=32, editable=False)
+    created_at = models.DateTimeField(verbose_name=_("created at"), auto_now_add=True, db_index=True)
+    token_digest = models.CharField(verbose_name=_("token digest"), max_length=64, unique=True, editable=False)
+
+    objects = RecoveryQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("Recovery")
@@ -197,26 +242,80 @@ class Recovery(models.Model):
     def __str__(self):
         return self.user.username
 
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user) -> str:
+        """
+        Replace any pending recovery of the user and return the new plain token.
+        """
+        token = secrets.token_urlsafe(24)
+        cls.objects.filter(user=user).delete()
+        cls.objects.create(user=user, token_digest=cls.digest(token))
+        return token
+
+
+class FormSubmission(models.Model):
+    """
+    A public form submission, stored once per distinct content.
+
+    ``content_hash`` is the SHA-256 of the normalized ``hashed_fields``; its unique
+    index makes repeated submissions no-ops when they are bulk inserted with
+    ``ignore_conflicts``. ``notified_at`` stays empty until the submission went
+    out in a staff digest.
+    """
+
+    hashed_fields = ()
+
+    content_hash = models.CharField(max_length=64, unique=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    notified_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def compute_content_hash(self) -> str:
+        content = "\x1f".join(" ".join(str(getattr(self, field) or "").split()).lower() for field in self.hashed_fields)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.content_hash = self.compute_content_hash()
+        super().save(*args, **kwargs)
+
+
+class BeerClubMember(FormSubmission):
+    hashed_fields = ("email",)
 
-class BeerClubMember(models.Model):
     first_name = models.CharField(max_length=100)
     last_name = models.CharField(max_length=100)
     email = models.EmailField()
     phone = models.CharField(max_length=15, blank=True, null=True)
     address = models.CharField(max_length=255, blank=True, null=True)
     message = models.TextField(blank=True, null=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(notified_at__isnull=True), name="beerclubmember_unnotified_idx"),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
 
-class ContactMessage(models.Model):
+class ContactMessage(FormSubmission):
+    hashed_fields = ("email", "message")
+
     name = models.CharField(max_length=200)
     email = models.EmailField()
     phone = models.CharField(max_length=15)
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(notified_at__isnull=True), name="contactmessage_unnotified_idx"),
+        ]
 
     def __str__(self):
         return f"Message from {self.name} ({self.email})"
@@ -1,8 +1,11 @@
 from django.contrib.auth.password_validation import validate_password
 from django.db import transaction
+from django.utils.crypto import constant_time_compare
 
 from rest_framework import serializers
 
+from main.background import enqueue
+
 from .models import User, Recovery, BeerClubMember, ContactMessage, Profile
 
 
@@ -75,29 +78,46 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(required=True, write_only=True)
 
 
+class RecoverPasswordSerializer(serializers.Serializer):
+    email = serializers.EmailField(write_only=True)
+
+    def save(self):
+        user = User.objects.filter(email__iexact=self.validated_data["email"], is_active=True).first()
+        if user is not None:
+            enqueue(User.send_recovery_email, user)
+        return user
+
+
 class ChangeRecoverPasswordSerializer(serializers.Serializer):
-    username = serializers.CharField()
-    token = serializers.CharField()
-    new_password = serializers.CharField()
+    username = serializers.CharField(write_only=True)
+    token = serializers.CharField(write_only=True)
+    new_password = serializers.CharField(write_only=True)
 
     def validate_new_password(self, new_password):
         validate_password(new_password)
         return new_password
 
     def validate(self, data):
-        username = data["username"]
-        token = data["token"]
-        data["user"] = user = User.objects.filter(username__iexact=username).first()
-
-        recovery = Recovery.objects.filter(user=user).first()
-        if recovery is None:
+        recovery = (
+            Recovery.objects.valid()
+            .select_related("user")
+            .filter(token_digest=Recovery.digest(data["token"]))
+            .first()
+        )
+        if recovery is None or not constant_time_compare(recovery.user.username.lower(), data["username"].lower()):
             raise serializers.ValidationError("Could not authenticate")
 
-        if recovery.token != token:
-            return serializers.ValidationError("Could not authenticate")
-        recovery.delete()
+        data["user"] = recovery.user
         return data
 
+    def save(self):
+        user = self.validated_data["user"]
+        user.set_password(self.validated_data["new_password"])
+        with transaction.atomic():
+            user.save(update_fields=["password"])
+            Recovery.objects.filter(user=user).delete()
+        return user
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -130,7 +150,7 @@ class ChangePasswordSerializer(serializers.Serializer):
         self.is_valid(raise_exception=True)
         user = self.context["request"].user
         user.set_password(self.validated_data["new_password"])
-        user.save()
+        user.save(update_fields=["password"])
 
 
 # TODO: Make this global response throught the code
@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with ``request`` and ``user`` when a login view issues JWTs. These logins don't go
+# through django.contrib.auth.login(), so user_logged_in never fires for them.
+token_obtained = Signal()
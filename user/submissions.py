@@ -0,0 +1,72 @@
+"""
+Storage and staff digests for the public contact and beer club forms.
+
+Submissions are written in the request, with one INSERT that the ``content_hash``
+unique index turns into a no-op for repeats. Staff hear about new submissions
+through ``send_form_digests``, one email per form for everything not yet sent,
+rather than an email each.
+"""
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+
+from .models import BeerClubMember, ContactMessage, User
+
+
+def store_submission(instance):
+    """
+    Insert a form submission, unless one with the same content is stored already.
+    """
+    instance.content_hash = instance.compute_content_hash()
+    type(instance).objects.bulk_create([instance], ignore_conflicts=True)
+
+
+def _digest(subject, submissions, describe, recipients):
+    lines = [describe(submission) for submission in submissions]
+    body = f"{len(lines)} new submissions:\n\n" + "\n\n".join(lines)
+    return EmailMessage(subject, body, settings.DEFAULT_FROM_EMAIL, recipients)
+
+
+def _describe_signup(member):
+    return f"{member.first_name} {member.last_name} <{member.email}> {member.phone or ''}\n{member.message or ''}".strip()
+
+
+def _describe_message(message):
+    return f"{message.name} <{message.email}> {message.phone}\n{message.message}"
+
+
+DIGESTS = (
+    (BeerClubMember, "New beer club signups", _describe_signup),
+    (ContactMessage, "New contact messages", _describe_message),
+)
+
+
+def send_form_digests(limit=1000):
+    """
+    Email staff one digest per form with the submissions not yet sent out,
+    over a single connection, and mark them notified.
+
+    Returns
+    -------
+    int
+        The number of submissions included.
+    """
+    recipients = list(User.objects.filter(is_staff=True, is_active=True).values_list("email", flat=True))
+    if not recipients:
+        return 0
+
+    messages, sent = [], []
+    for model, subject, describe in DIGESTS:
+        submissions = list(model.objects.filter(notified_at__isnull=True).order_by("id")[:limit])
+        if submissions:
+            messages.append(_digest(subject, submissions, describe, recipients))
+            sent.append((model, [submission.id for submission in submissions]))
+    if not messages:
+        return 0
+
+    get_connection().send_messages(messages)
+    now = timezone.now()
+    for model, ids in sent:
+        model.objects.filter(id__in=ids).update(notified_at=now)
+    return sum(len(ids) for _, ids in sent)
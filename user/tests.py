@@ -1,3 +1,188 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import get_tokens_for_user, user_from_token
+from .models import ContactMessage, Recovery, User
+from .submissions import send_form_digests
+from .throttling import IPRateThrottle
+
+
+class FormSubmissionTest(APITestCase):
+    """
+    Repeated form submissions are stored once, and staff get one digest for them.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        User.objects.create_user(email="staff@example.com", username="staff", password=None, is_staff=True)
+
+    def test_duplicates_dropped_and_digested(self):
+        payload = {"name": "Visitor", "email": "visitor@example.com", "phone": "5550100", "message": "Do you ship?"}
+        for message in (payload["message"], "  do you   SHIP? ", "Another question"):
+            response = self.client.post("/api/v1/contact-us/signup/", {**payload, "message": message}, format="json")
+            self.assertEqual(response.status_code, 201)
+
+        self.assertEqual(ContactMessage.objects.count(), 2)
+        self.assertEqual(send_form_digests(), 2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["staff@example.com"])
+        self.assertEqual(send_form_digests(), 0)
+
+
+class PasswordRecoveryTest(APITestCase):
+    """
+    Recovery codes are issued by email and work once.
+    """
+
+    def setUp(self):
+        caches["default"].clear()
+        self.user = User.objects.create_user(email="forgetful@example.com", username="forgetful", password="Old-pass-123")
+
+    def test_recover_and_change_password(self):
+        response = self.client.post("/recover_password", {"email": "nobody@example.com"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+
+        answer = response.data
+        for _ in range(2):
+            response = self.client.post("/recover_password", {"email": "Forgetful@example.com"}, format="json")
+            self.assertEqual(response.data, answer)
+        # Only the latest code is valid.
+        self.assertEqual(Recovery.objects.filter(user=self.user).count(), 1)
+        first, latest = (message.body.split("\n\n")[1] for message in mail.outbox)
+
+        change = {"username": "forgetful", "new_password": "New-pass-456"}
+        response = self.client.post("/change_recover_password", {**change, "token": first}, format="json")
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/change_recover_password", {**change, "token": latest}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("New-pass-456"))
+        response = self.client.post("/change_recover_password", {**change, "token": latest}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class StatelessJWTTest(APITestCase):
+    """
+    Token claims stand in for the user row, but never outlive a change to its privileges.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="staffer@example.com", username="staffer", password="Old-pass-123", is_staff=True
+        )
+        self.refresh = get_tokens_for_user(self.user)
+
+    def test_refresh_reloads_the_user(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        response = self.client.post("/api/token/refresh/", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AccessToken(response.data["access"])["is_staff"])
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.client.post("/api/token/refresh/", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+    def test_saving_a_user_built_from_claims_keeps_the_rows_privileges(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=False)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+        response = self.client.post(
+            "/change_password", {"old_password": "Old-pass-123", "new_password": "New-pass-456!x"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        user = user_from_token(self.refresh.access_token)
+        user.first_name = "Renamed"
+        user.save()
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_staff)
+        self.assertEqual(self.user.first_name, "Renamed")
+        self.assertTrue(self.user.check_password("New-pass-456!x"))
+
+
+class IPRateThrottleTest(APITestCase):
+    """
+    Buckets follow the client address, which a spoofed X-Forwarded-For doesn't change.
+    """
+
+    class TwoPerMinute(IPRateThrottle):
+        scope = "test"
+        rate = "2/min"
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def allowed(self, **headers):
+        request = Request(APIRequestFactory().post("/api/token/", REMOTE_ADDR="198.51.100.9", **headers))
+        return self.TwoPerMinute().allow_request(request, None)
+
+    def test_bucket_runs_out_however_the_forwarded_header_rotates(self):
+        self.assertTrue(self.allowed(HTTP_X_FORWARDED_FOR="203.0.113.1"))
+        self.assertTrue(self.allowed(HTTP_X_FORWARDED_FOR="203.0.113.2"))
+        self.assertFalse(self.allowed(HTTP_X_FORWARDED_FOR="203.0.113.3"))
+        self.assertFalse(self.allowed())
+
+    def test_behind_a_proxy_the_address_it_saw_counts(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            self.assertTrue(self.allowed(HTTP_X_FORWARDED_FOR="10.9.9.9, 203.0.113.1"))
+            self.assertTrue(self.allowed(HTTP_X_FORWARDED_FOR="10.9.9.8, 203.0.113.1"))
+            self.assertFalse(self.allowed(HTTP_X_FORWARDED_FOR="10.9.9.7, 203.0.113.1"))
+            self.assertTrue(self.allowed(HTTP_X_FORWARDED_FOR="203.0.113.2"))
+
+
+class ImportUsersTest(APITestCase):
+    def test_rows_too_long_for_a_column_are_skipped_and_reported(self):
+        rows = [
+            {"email": "short@example.com", "password": "Imported-pass-1", "first_name": "Ann"},
+            {"email": "long@example.com", "password": "Imported-pass-2", "first_name": "A" * 151},
+            {"email": "zip@example.com", "password": "Imported-pass-3", "business_zip": "9" * 40},
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as file:
+            file.write("\n".join(json.dumps(row) for row in rows))
+            file.flush()
+            err = io.StringIO()
+            call_command("import_users", file.name, workers=1, stdout=io.StringIO(), stderr=err)
+
+        self.assertEqual(list(User.objects.values_list("email", flat=True)), ["short@example.com"])
+        self.assertIn("Skipped long@example.com: too long for first_name", err.getvalue())
+        self.assertIn("Skipped zip@example.com: too long for business_zip", err.getvalue())
+
+    def test_rows_conflicting_with_existing_users_are_skipped(self):
+        local_part = "a" * 140
+        rows = [
+            {"email": "new@example.com", "password": "Imported-pass-1"},
+            {"email": "taken@example.com", "password": "Imported-pass-2"},
+            {"email": f"{local_part}@example.com", "password": "Imported-pass-3"},
+        ]
+
+        def register_meanwhile(password, user):
+            # The email is registered after the command looked up the taken ones.
+            if user.email == "taken@example.com":
+                User.objects.create(username="owner", email=user.email)
+
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as file:
+            file.write("\n".join(json.dumps(row) for row in rows))
+            file.flush()
+            out, err = io.StringIO(), io.StringIO()
+            with mock.patch("user.management.commands.import_users.validate_password", register_meanwhile):
+                call_command("import_users", file.name, workers=1, stdout=out, stderr=err)
+
+        self.assertEqual(
+            sorted(User.objects.values_list("username", flat=True)), ["new@example.com", "owner"]
+        )
+        self.assertIn("Skipped taken@example.com: ", err.getvalue())
+        self.assertIn(f"Skipped {local_part}@example.com: too long for username", err.getvalue())
+        self.assertIn("Imported 1 users (2 skipped)", out.getvalue())
@@ -0,0 +1,120 @@
+import hashlib
+import logging
+
+from django.core.cache import caches
+from rest_framework.throttling import SimpleRateThrottle
+
+from main import metrics
+
+logger = logging.getLogger(__name__)
+
+REJECTED_REQUESTS = metrics.counter("kaveri_throttle_rejected_requests_total", "Requests rejected by throttles.", ["scope"])
+
+
+def rejected_requests() -> dict:
+    """
+    Returns the number of requests rejected by each throttle scope in this process.
+    """
+    return {scope: count for (scope,), count in REJECTED_REQUESTS.values.items()}
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Token bucket throttle using the DRF rate format (``"10/min"``).
+
+    Each bucket holds up to ``num_requests`` tokens and refills continuously at
+    ``num_requests / duration`` tokens per second, so short bursts are allowed
+    while the sustained rate stays bounded. Buckets live in the shared ``default``
+    cache; when that backend is unavailable the process-local ``local`` cache is
+    used instead, which keeps the throttle working per worker.
+
+    The read-modify-write on the shared cache is not atomic, so concurrent
+    workers may let a few extra requests through during a burst.
+    """
+
+    cache = caches["default"]
+    fallback_cache = caches["local"]
+    cache_format = "throttle_%(scope)s_%(ident)s"
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        try:
+            allowed = self.take_token(self.cache)
+        except Exception:
+            logger.warning("Throttle cache unavailable, using the local fallback", exc_info=True)
+            allowed = self.take_token(self.fallback_cache)
+
+        if not allowed:
+            REJECTED_REQUESTS.inc(scope=self.scope)
+            logger.info("Throttled %s request for %s", self.scope, self.key)
+        return allowed
+
+    def take_token(self, cache):
+        refill_rate = self.num_requests / self.duration
+        bucket = cache.get(self.key)
+        metrics.CACHE_LOOKUPS.inc(cache="throttle", result="miss" if bucket is None else "hit")
+        tokens, updated_at = bucket or (self.num_requests, self.now)
+        self.tokens = min(self.num_requests, tokens + (self.now - updated_at) * refill_rate)
+
+        allowed = self.tokens >= 1
+        if allowed:
+            self.tokens -= 1
+        cache.set(self.key, (self.tokens, self.now), self.duration)
+        return allowed
+
+    def wait(self):
+        """
+        Seconds until the next token is available.
+        """
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class IPRateThrottle(TokenBucketThrottle):
+    """
+    One bucket per client IP address.
+    """
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class AccountRateThrottle(TokenBucketThrottle):
+    """
+    One bucket per account, identified by the email posted to the view.
+    """
+
+    account_field = "email"
+
+    def get_cache_key(self, request, view):
+        account = request.data.get(self.account_field)
+        if not isinstance(account, str) or not account.strip():
+            return None
+        ident = hashlib.sha256(account.strip().lower().encode()).hexdigest()
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class LoginRateThrottle(IPRateThrottle):
+    scope = "login"
+
+
+class LoginAccountRateThrottle(AccountRateThrottle):
+    scope = "login-account"
+
+
+class RecoveryAccountRateThrottle(AccountRateThrottle):
+    scope = "recovery-account"
+
+
+class RegistrationRateThrottle(IPRateThrottle):
+    scope = "registration"
+
+
+class FormSubmissionRateThrottle(IPRateThrottle):
+    scope = "form-submission"
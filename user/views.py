@@ -1,18 +1,16 @@
-from datetime import timedelta
-
-from django.utils import timezone
 from django.contrib.auth import authenticate
 from django.http import JsonResponse
 from drf_spectacular.utils import extend_schema
 from rest_framework import views, response, status, viewsets, permissions
-from rest_framework.decorators import api_view
-from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view, throttle_classes
+from rest_framework_simplejwt.utils import datetime_from_epoch
 
 from .serializers import (
     LoginSerializer,
     RegisterSerializer,
     CustomResponseSerializer,
     ChangeRecoverPasswordSerializer,
+    RecoverPasswordSerializer,
     ChangePasswordSerializer,
     BeerClubMemberSerializer,
     ContactMessageSerializer,
@@ -22,7 +20,17 @@ from .serializers import (
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from .models import User
+from .authentication import add_user_claims, get_tokens_for_user
+from .models import BeerClubMember, ContactMessage, User
+from .signals import token_obtained
+from .submissions import store_submission
+from .throttling import (
+    FormSubmissionRateThrottle,
+    LoginAccountRateThrottle,
+    LoginRateThrottle,
+    RecoveryAccountRateThrottle,
+    RegistrationRateThrottle,
+)
 
 
 def bad_request(message):
@@ -31,6 +39,7 @@ def bad_request(message):
 
 @extend_schema(request=RegisterSerializer, responses=CustomResponseSerializer)
 class RegistrationView(views.APIView):
+    throttle_classes = [RegistrationRateThrottle]
 
     def post(self, request, version=None):
         serializer = RegisterSerializer(data=request.data)
@@ -50,35 +59,49 @@ class RegistrationView(views.APIView):
 
 @extend_schema(request=LoginSerializer, responses=CustomResponseSerializer)
 class LoginView(views.APIView):
+    # Throttles run before the handler, so rejected attempts never reach the password hasher
+    throttle_classes = [LoginRateThrottle, LoginAccountRateThrottle]
 
     def post(self, request):
         email = request.data.get("email", None)
         password = request.data.get("password", None)
-        user = authenticate(username=email, password=password)
+        user = authenticate(request, username=email, password=password)
+        if user is None:
+            return bad_request("Invalid username or password")
         if not user.is_verified:
             return bad_request("Your aren't verified")
-        if user is not None:
-            api_key, created = Token.objects.get_or_create(user=user)
-            if not created:
-                api_key.created = timezone.now()
-                api_key.save()
-
-            data = {
-                "token": api_key.key,
-                "username": email,
-                "first": user.first_name,
-                "last": user.last_name,
-                "expires": api_key.created + timedelta(7),
-                "id": user.id,
-            }
 
-            response_data = {"success": True, "message": "User Logged Successfully", "errors": "", "response_body": data}
+        # Same JWT pair as ``UserLoginView``; issuing it needs no database write.
+        refresh = get_tokens_for_user(user)
+        access = refresh.access_token
+        token_obtained.send(sender=self.__class__, request=request, user=user)
+
+        data = {
+            "token": str(access),
+            "refresh": str(refresh),
+            "username": email,
+            "first": user.first_name,
+            "last": user.last_name,
+            "expires": datetime_from_epoch(access["exp"]),
+            "id": user.id,
+        }
 
-            response_serializer = CustomResponseSerializer(response_data)
-            return response.Response(response_serializer.data, status=status.HTTP_200_OK)
+        response_data = {"success": True, "message": "User Logged Successfully", "errors": "", "response_body": data}
 
-        else:
-            return bad_request("Invalid username or password")
+        response_serializer = CustomResponseSerializer(response_data)
+        return response.Response(response_serializer.data, status=status.HTTP_200_OK)
+
+
+class RecoverPasswordView(views.APIView):
+    throttle_classes = [LoginRateThrottle, RecoveryAccountRateThrottle]
+
+    @extend_schema(request=RecoverPasswordSerializer, responses=None)
+    def post(self, request, version=None):
+        serializer = RecoverPasswordSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        # The same answer whether or not the email has an account.
+        return response.Response({"detail": "If the email has an account, a recovery code was sent to it."})
 
 
 class ChangeRecoverPasswordView(views.APIView):
@@ -100,28 +123,37 @@ class ChangePasswordView(views.APIView):
 
 
 @api_view(["POST"])
+@throttle_classes([FormSubmissionRateThrottle])
 def beer_club_signup(request):
     if request.method == "POST":
         serializer = BeerClubMemberSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            return response.Response(serializer.data, status=status.HTTP_201_CREATED)
+            # Repeat signups are dropped by the content hash.
+            store_submission(BeerClubMember(**serializer.validated_data))
+            return response.Response(serializer.validated_data, status=status.HTTP_201_CREATED)
         return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(["POST"])
+@throttle_classes([FormSubmissionRateThrottle])
 def contact_message_create(request):
     if request.method == "POST":
         serializer = ContactMessageSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            return response.Response(serializer.data, status=status.HTTP_201_CREATED)
+            # Repeated messages are dropped by the content hash.
+            store_submission(ContactMessage(**serializer.validated_data))
+            return response.Response(serializer.validated_data, status=status.HTTP_201_CREATED)
         return response.Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
+        token_obtained.send(sender=self.__class__, request=self.context.get("request"), user=self.user)
         data.update(
             {
                 'user_id': self.user.id,
@@ -135,6 +167,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 class UserLoginView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
+    throttle_classes = [LoginRateThrottle, LoginAccountRateThrottle]
 
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):